@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import cv2
+import numpy as np
+
+from Screen_Frame import Frame
+
+"""
+File:Compass_Locator.py
+
+Description:
+  Finds the compass and the nav point within it by shape rather than by template matching, so it does not
+  depend on the compass scale being calibrated. The compass is a thin bright ring of the HUD colour, the
+  nav point is a small cyan (ahead) or white (behind) ring inside it.
+"""
+
+
+class CompassLocator:
+    def __init__(self):
+        self.min_radius_pct = 0.04  # Min compass radius as a fraction of the 'compass' region height
+        self.max_radius_pct = 0.16  # Max compass radius as a fraction of the 'compass' region height
+        self.min_ring_score = 0.5  # Min fraction of the circle on the ring, less the fill either side of it
+        self.max_candidates = 50  # Circles from the Hough transform to score
+        self.navpoint_radius_pct = 0.15  # Nav point radius as a fraction of the compass radius
+        # The nav point colours, cyan when ahead and white when behind
+        self.navpoint_cyan_range = [np.array([70, 40, 120]), np.array([110, 255, 255])]
+        self.navpoint_white_range = [np.array([0, 0, 150]), np.array([180, 90, 255])]
+        self.navpoint_ahead_cyan = 0.1  # Min fraction of the nav point pixels that are cyan for it to be ahead
+        self._angles = np.linspace(0, 2 * np.pi, 90, endpoint=False)
+
+    def ring_image(self, frame: Frame, min_radius: float):
+        """ Returns an image of the thin bright lines of the HUD (saturation x value, top hat filtered) and its
+        Otsu threshold mask. The HUD is saturated and bright, where the lit cockpit is less saturated. """
+        hsv = frame.get('HSV', swap_rb=False)
+        sat_val = cv2.multiply(hsv[..., 1], hsv[..., 2], scale=1 / 255)
+        k = max(5, int(min_radius * 0.25) | 1)
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (k, k))
+        lines = cv2.morphologyEx(sat_val, cv2.MORPH_TOPHAT, kernel)
+        _, mask = cv2.threshold(lines, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        return lines, mask
+
+    def _sample(self, mask, cx, cy, radius):
+        """ Samples the mask around circles. cx, cy and radius are arrays of the same length (one per circle).
+        Returns a bool array of (circles, angles). """
+        xs = np.rint(cx[:, None] + radius[:, None] * np.cos(self._angles)).astype(int)
+        ys = np.rint(cy[:, None] + radius[:, None] * np.sin(self._angles)).astype(int)
+        xs = np.clip(xs, 0, mask.shape[1] - 1)
+        ys = np.clip(ys, 0, mask.shape[0] - 1)
+        return mask[ys, xs] > 0
+
+    def ring_scores(self, mask, circles):
+        """ Scores circles by how much of each is on the ring mask, less how much of the mask is just inside or
+        outside it (so filled areas and clutter score low).
+        @param circles: Array of (x, y, radius).
+        Returns an array of scores (-1.0 - 1.0). """
+        cx, cy, radius = circles[:, 0], circles[:, 1], circles[:, 2]
+        ring = self._sample(mask, cx, cy, radius - 1.5) | self._sample(mask, cx, cy, radius) | \
+            self._sample(mask, cx, cy, radius + 1.5)
+        inner = self._sample(mask, cx, cy, radius * 0.8).mean(axis=1)
+        outer = self._sample(mask, cx, cy, radius * 1.25).mean(axis=1)
+        return ring.mean(axis=1) - np.maximum(inner, outer)
+
+    @staticmethod
+    def fit_circle(mask, cx, cy, radius, band=3.0):
+        """ Least squares (Kasa) fit of a circle to the mask pixels within a band of the given circle.
+        Returns the fitted (x, y, radius), or the given circle if there are too few pixels. """
+        ys, xs = np.nonzero(mask)
+        dist = np.hypot(xs - cx, ys - cy)
+        sel = np.abs(dist - radius) <= band
+        if np.count_nonzero(sel) < 20:
+            return cx, cy, radius
+        x = xs[sel].astype(np.float64)
+        y = ys[sel].astype(np.float64)
+        a = np.column_stack([x, y, np.ones_like(x)])
+        b = x * x + y * y
+        (c0, c1, c2), _, _, _ = np.linalg.lstsq(a, b, rcond=None)
+        fx = c0 / 2
+        fy = c1 / 2
+        return float(fx), float(fy), float(np.sqrt(max(c2 + fx * fx + fy * fy, 0.0)))
+
+    def locate_compass(self, frame: Frame, min_radius: float = None, max_radius: float = None):
+        """ Find the compass ring in the region.
+        The default radii assume the frame is the 'compass' screen region, where the compass is a small part of
+        the region (4% - 16% of its height, i.e. about 15 - 60 pixels at 1080p). Pass the radii for a frame
+        cropped to the compass itself.
+        @param frame: The compass region.
+        @param min_radius: Min radius in pixels. If None, from min_radius_pct of the region height.
+        @param max_radius: Max radius in pixels. If None, from max_radius_pct of the region height.
+        @return: (x, y, radius, score) of the compass in the region (to sub-pixel), or None if not found.
+        """
+        if min_radius is None:
+            min_radius = frame.height * self.min_radius_pct
+        if max_radius is None:
+            max_radius = frame.height * self.max_radius_pct
+
+        lines, mask = self.ring_image(frame, min_radius)
+        circles = cv2.HoughCircles(cv2.GaussianBlur(lines, (5, 5), 1.5), cv2.HOUGH_GRADIENT, dp=1, minDist=3,
+                                   param1=60, param2=12, minRadius=int(min_radius), maxRadius=int(max_radius))
+        if circles is None:
+            return None
+
+        circles = circles[0][:self.max_candidates]
+        scores = self.ring_scores(mask, circles)
+        best = int(np.argmax(scores))
+        if scores[best] < self.min_ring_score:
+            return None
+
+        x, y, radius = self.fit_circle(mask, *circles[best])
+        return x, y, radius, float(scores[best])
+
+    def locate_navpoint(self, frame: Frame, cx: float, cy: float, radius: float):
+        """ Find the nav point inside the compass.
+        @param frame: The compass region.
+        @param cx: The compass x in the region.
+        @param cy: The compass y in the region.
+        @param radius: The compass radius.
+        @return: (x, y, z) of the nav point in the region, where z is 1.0 ahead and -1.0 behind, or None.
+        """
+        hsv = frame.get('HSV', swap_rb=False)
+        disc = np.zeros(hsv.shape[:2], dtype=np.uint8)
+        cv2.circle(disc, (int(round(cx)), int(round(cy))), int(radius * 0.9), 255, -1)
+        cyan = cv2.inRange(hsv, self.navpoint_cyan_range[0], self.navpoint_cyan_range[1])
+        white = cv2.inRange(hsv, self.navpoint_white_range[0], self.navpoint_white_range[1])
+        mask = cv2.bitwise_and(cv2.bitwise_or(cyan, white), disc)
+
+        # Take the blob closest in size to the nav point
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        nav_radius = radius * self.navpoint_radius_pct
+        best = None
+        for cnt in contours:
+            (x, y), blob_radius = cv2.minEnclosingCircle(cnt)
+            if not (nav_radius * 0.5 <= blob_radius <= nav_radius * 2.0):
+                continue
+            err = abs(blob_radius - nav_radius)
+            if best is None or err < best[0]:
+                best = (err, x, y, cnt)
+        if best is None:
+            return None
+
+        # Ahead if enough of the nav point is cyan. Over the lit cockpit the cyan ring blends toward white, so
+        # only part of an ahead nav point is cyan, where none of a behind (white) one is
+        _, x, y, cnt = best
+        blob = np.zeros_like(mask)
+        cv2.drawContours(blob, [cnt], -1, 255, -1)
+        blob = cv2.bitwise_and(blob, mask)
+        cyan_frac = np.count_nonzero(cv2.bitwise_and(blob, cyan)) / max(np.count_nonzero(blob), 1)
+        ahead = cyan_frac >= self.navpoint_ahead_cyan
+        return x, y, 1.0 if ahead else -1.0
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+
+import cv2
+
+from EDlogger import logger
+
+"""
+File:CvViewer.py
+
+Description:
+  Shows the cv_view debug images in OpenCV windows from a thread of its own, so the AP only hands over the
+  image and does not wait on cv2.imshow/cv2.waitKey.
+"""
+
+
+class CvViewer:
+    """ Shows debug images in OpenCV windows on a viewer thread. Each window holds only the latest image, if the
+    viewer is behind the older images are dropped. The HighGUI windows are created, updated and destroyed on the
+    viewer thread only, as OpenCV requires.
+    """
+
+    def __init__(self, refresh_ms: int = 30):
+        """
+        @param refresh_ms: The max time between window updates, in ms.
+        """
+        self.refresh_ms = refresh_ms
+        self.shown_count = 0  # Images shown
+        self.dropped_count = 0  # Images replaced by a newer one before they were shown
+        self._pending = {}  # The latest (image, position) by window name
+        self._positions = {}  # The position of each open window, set on the viewer thread
+        self._close = False
+        self._stop = False
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._thread = None
+
+    def show(self, name: str, image, x: int = None, y: int = None):
+        """ Show an image in a window, replacing the image waiting to be shown (if any).
+        The image is copied, as the caller may reuse its buffer (i.e. the RegionFilter buffers) before it is shown.
+        @param name: The window name.
+        @param image: The image to show.
+        @param x: The window left position, or None to leave it where it is.
+        @param y: The window top position.
+        """
+        image = image.copy()
+        with self._lock:
+            if name in self._pending:
+                self.dropped_count = self.dropped_count + 1
+            self._pending[name] = (image, None if x is None else (int(x), int(y)))
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(target=self._view_loop, name="CvViewer", daemon=True)
+                self._thread.start()
+        self._event.set()
+
+    def close_all(self):
+        """ Closes all the windows. """
+        with self._lock:
+            self._pending.clear()
+            self._close = True
+        self._event.set()
+
+    def stop(self):
+        """ Closes all the windows and stops the viewer thread. """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            self._pending.clear()
+            self._stop = True
+        self._event.set()
+        if thread is not None:
+            thread.join(1.0)
+
+    def _view_loop(self):
+        while True:
+            self._event.wait(self.refresh_ms / 1000)
+            self._event.clear()
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                close = self._close or self._stop
+                stop = self._stop
+                self._close = False
+
+            try:
+                if close:
+                    cv2.destroyAllWindows()
+                    self._positions.clear()
+                for name, (image, pos) in pending.items():
+                    cv2.imshow(name, image)
+                    if pos is not None and self._positions.get(name) != pos:
+                        cv2.moveWindow(name, pos[0], pos[1])
+                        self._positions[name] = pos
+                    self.shown_count = self.shown_count + 1
+                # Process the window events, also redraws the windows
+                cv2.waitKey(1)
+            except Exception as e:
+                logger.error(f"CV view failed: {e}")
+
+            if stop:
+                break
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from EDlogger import logger
+
+"""
+File:DebugSink.py
+
+Description:
+  Writes debug images to disk on a background thread. Images are written to named channels (i.e. 'ocr',
+  'nav_panel') and are only kept if the channel's level is high enough, so the AP pays nothing for debug
+  images that are turned off.
+
+  Levels:
+    0 - Off.
+    1 - Key images, i.e. the image when a match or OCR fails.
+    2 - Every step, i.e. each stage of the OCR image processing.
+"""
+
+DEBUG_OFF = 0
+DEBUG_KEY = 1
+DEBUG_STEPS = 2
+
+
+class DebugSink:
+    """ A bounded queue of debug images written by a background thread. If the writer falls behind, images are
+    dropped. The files written are kept within a disk quota by deleting the oldest.
+    """
+
+    def __init__(self, folder: str = './debug-output/images', level: int = DEBUG_OFF, channel_levels=None,
+                 quota_mb: float = 200.0, queue_size: int = 20):
+        """
+        @param folder: The folder to write to. Each channel is a sub folder.
+        @param level: The level of channels not in channel_levels.
+        @param channel_levels: The level by channel name (i.e. {'ocr': 2}).
+        @param quota_mb: The max size of the files written, in MB.
+        @param queue_size: The number of images waiting to be written before images are dropped.
+        """
+        self.folder = folder
+        self.level = level
+        self.channel_levels = dict(channel_levels) if channel_levels else {}
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+
+        self.write_count = 0  # Images written
+        self.dropped_count = 0  # Images dropped because the writer was behind
+        self.deleted_count = 0  # Files deleted to stay within the quota
+        self._queue = queue.Queue(queue_size)
+        self._files = OrderedDict()  # Size of the files written by path, oldest first
+        self._total_bytes = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def set_level(self, level: int, channel: str = None):
+        """ Sets the level of a channel, or the default level if channel is None. """
+        if channel is None:
+            self.level = level
+        else:
+            self.channel_levels[channel] = level
+
+    def enabled(self, channel: str, level: int = DEBUG_KEY) -> bool:
+        """ Returns True if images of this level are kept for the channel. Use to skip preparing a debug image
+        (i.e. drawing on a copy) that would not be written. """
+        return self.channel_levels.get(channel, self.level) >= level
+
+    def write(self, channel: str, name: str, image, level: int = DEBUG_KEY, timestamp: bool = False):
+        """ Queues an image to be written as '<folder>/<channel>/<name>.png', if the channel is enabled for the
+        level. Images of the same name are overwritten, unless timestamp is True.
+        @param channel: The channel name (i.e. 'ocr').
+        @param name: The file name without the extension.
+        @param image: The image (a copy is taken, so the caller may reuse it).
+        @param level: The level of the image (DEBUG_KEY or DEBUG_STEPS).
+        @param timestamp: True to add the date and time to the name, so earlier images are kept.
+        """
+        if image is None or not self.enabled(channel, level):
+            return
+
+        if timestamp:
+            name = f"{name} {datetime.now().strftime('%Y-%m-%d %H-%M-%S.%f')[:-3]}"
+        path = os.path.join(self.folder, channel, f"{name}.png")
+
+        self._start()
+        try:
+            self._queue.put_nowait((path, np.array(image, copy=True)))
+        except queue.Full:
+            self.dropped_count = self.dropped_count + 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name="DebugSink", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """ Writes the queued images and stops the writer thread. """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+
+    def flush(self):
+        """ Waits for the queued images to be written. """
+        if self._thread is not None:
+            self._queue.join()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                path, image = item
+                self._write_file(path, image)
+            except Exception as e:
+                logger.error(f"Debug sink write failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write_file(self, path: str, image):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not cv2.imwrite(path, image):
+            logger.warning(f"Debug sink could not write '{path}'.")
+            return
+        self.write_count = self.write_count + 1
+
+        # An overwritten file moves to the newest
+        self._total_bytes = self._total_bytes - self._files.pop(path, 0)
+        size = os.path.getsize(path)
+        self._files[path] = size
+        self._total_bytes = self._total_bytes + size
+
+        # Delete the oldest files until within the quota, always keeping the newest
+        while self._total_bytes > self.quota_bytes and len(self._files) > 1:
+            old_path, old_size = self._files.popitem(last=False)
+            self._total_bytes = self._total_bytes - old_size
+            try:
+                os.remove(old_path)
+                self.deleted_count = self.deleted_count + 1
+            except OSError:
+                pass
@@ -8,7 +8,9 @@
 # import cv2
 # import json
 # from pathlib import Path
+import argparse
 import subprocess
+from time import perf_counter
 
 import keyboard
 import webbrowser
@@ -34,10 +36,13 @@ from tktooltip import ToolTip  # In requirements.txt as 'tkinter-tooltip'.
 # from Screen_Regions import *
 # from EDKeys import *
 # from EDJournal import *
-from ED_AP import *
-from EDAPWaypointEditor import WaypointEditorTab
+# A spawned worker process (i.e. an OCR worker, see OCR_Worker) runs this module again as __mp_main__. The worker
+# needs nothing from it, so the app is not imported there (EDlogger would rename the log file in use).
+if __name__ != "__mp_main__":
+    from ED_AP import *
+    from EDAPWaypointEditor import WaypointEditorTab
 
-from EDlogger import logger
+    from EDlogger import logger
 
 
 """
@@ -80,7 +85,8 @@ def str_to_float(input_str: str) -> float:
 
 class APGui:
 
-    def __init__(self, root):
+    def __init__(self, root, frame_source=None, frame_source_path=None):
+        start_time = perf_counter()
         self.statusbar = None
         self.root = root
         root.title("EDAutopilot " + EDAP_VERSION)
@@ -135,7 +141,7 @@ class APGui:
         self.callback('log', f'Starting ED Autopilot {EDAP_VERSION}.')
 
         self.load_ocr_calibration_data()
-        self.ed_ap = EDAutopilot(cb=self.callback)
+        self.ed_ap = EDAutopilot(cb=self.callback, frame_source=frame_source, frame_source_path=frame_source_path)
         self.ed_ap.robigo.set_single_loop(self.ed_ap.config['Robigo_Single_Loop'])
         # self.calibrator = RegionCalibration(root, self.ed_ap, cb=self.callback)
 
@@ -254,6 +260,11 @@ class APGui:
         self.gui_loaded = True
         # Send a log entry which will flush out the buffer.
         self.callback('log', 'ED Autopilot loaded successfully.')
+        logger.info(f"ED Autopilot started in {perf_counter() - start_time:.2f} secs.")
+
+        # Load the OCR models in the background, instead of on first use
+        if self.ed_ap.config['OCRWarmUp']:
+            self.ed_ap.warm_up_ocr()
 
     # callback from the EDAP, to configure GUI items
     def callback(self, msg, body=None):
@@ -1471,8 +1482,15 @@ def main():
     #   if handle != None:
     #       win32gui.SetForegroundWindow(handle)  # put the window in foreground
 
+    # Frame source override, i.e. to run against recorded frames instead of the game
+    parser = argparse.ArgumentParser(description="EDAutopilot")
+    parser.add_argument('--frame-source', choices=['live', 'images', 'video', 'session'],
+                        help="Where frames come from, overrides the FrameSource config.")
+    parser.add_argument('--frame-source-path', help="The folder or file for the non-live frame sources.")
+    args, _ = parser.parse_known_args()
+
     root = tk.Tk()
-    app = APGui(root)
+    app = APGui(root, args.frame_source, args.frame_source_path)
 
     sv_ttk.set_theme("dark")
 
@@ -15,7 +15,6 @@ class EDGalaxyMap:
     """ Handles the Galaxy Map. """
     def __init__(self, ed_ap, screen, keys, cb, is_odyssey=True):
         self.ap = ed_ap
-        self.ocr = ed_ap.ocr
         self.is_odyssey = is_odyssey
         self.screen = screen
         self.keys = keys
@@ -29,6 +28,11 @@ class EDGalaxyMap:
 
         self.load_calibrated_regions()
 
+    @property
+    def ocr(self):
+        """ The AP's OCR, created on first use (or by the background warm up). """
+        return self.ap.ocr
+
     def load_calibrated_regions(self):
         calibration_file = 'configs/ocr_calibration.json'
         if os.path.exists(calibration_file):
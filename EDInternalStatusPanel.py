@@ -13,6 +13,7 @@ from OCR import OCR
 from Screen import Screen, crop_image_by_pct
 from Screen_Regions import Quad
 from StatusParser import StatusParser
+from DebugSink import DEBUG_STEPS
 from EDlogger import logger
 
 
@@ -21,7 +22,6 @@ class EDInternalStatusPanel:
 
     def __init__(self, ed_ap, screen, keys, cb):
         self.ap = ed_ap
-        self.ocr = ed_ap.ocr
         self.screen = screen
         self.keys = keys
         self.ap_ckb = cb
@@ -34,6 +34,8 @@ class EDInternalStatusPanel:
         self.inventory_tab_text = self.locale["INT_PNL_TAB_INVENTORY"]
         self.storage_tab_text = self.locale["INT_PNL_TAB_STORAGE"]
         self.status_tab_text = self.locale["INT_PNL_TAB_STATUS"]
+        self.tab_texts = [self.modules_tab_text, self.fire_groups_tab_text, self.ship_tab_text,
+                          self.inventory_tab_text, self.storage_tab_text, self.status_tab_text]
 
         # The rect is [L, T, R, B] top left x, y, and bottom right x, y in fraction of screen resolution
         # Nav Panel region covers the entire navigation panel.
@@ -53,6 +55,11 @@ class EDInternalStatusPanel:
 
         self.load_calibrated_regions()
 
+    @property
+    def ocr(self):
+        """ The AP's OCR, created on first use (or by the background warm up). """
+        return self.ap.ocr
+
     def load_calibrated_regions(self):
         calibration_file = 'configs/ocr_calibration.json'
         if os.path.exists(calibration_file):
@@ -84,7 +91,7 @@ class EDInternalStatusPanel:
         # Get the nav panel image based on the region
         image = self.screen.get_screen(self.panel_quad_pix.get_left(), self.panel_quad_pix.get_top(),
                                        self.panel_quad_pix.get_right(), self.panel_quad_pix.get_bottom(), rgb=False)
-        cv2.imwrite(f'test/status-panel/out/nav_panel_original.png', image)
+        self.ap.debug_sink.write('status_panel', 'nav_panel_original', image, DEBUG_STEPS)
 
         # Offset the panel co-ords to match the cropped image (i.e. starting at 0,0)
         panel_quad_pix_off = copy(self.panel_quad_pix)
@@ -96,7 +103,7 @@ class EDInternalStatusPanel:
         self._transform = trans
         self._rev_transform = rev_trans
         # Write the file
-        cv2.imwrite(f'test/status-panel/out/nav_panel_straight.png', straightened)
+        self.ap.debug_sink.write('status_panel', 'nav_panel_straight', straightened, DEBUG_STEPS)
 
         if self.ap.debug_overlay:
             self.ap.overlay.overlay_quad_pct('nav_panel_active', self.panel_quad_pct, (0, 255, 0), 2, 5)
@@ -117,7 +124,7 @@ class EDInternalStatusPanel:
         tab_bar_quad = Quad.from_rect(self.sub_reg['tab_bar']['rect'])
         # Crop the image to the extents of the quad
         tab_bar = crop_image_by_pct(self.panel, tab_bar_quad)
-        cv2.imwrite(f'test/status-panel/out/tab_bar.png', tab_bar)
+        self.ap.debug_sink.write('status_panel', 'tab_bar', tab_bar, DEBUG_STEPS)
 
         if self.ap.debug_overlay:
             # Transform the array of coordinates to the skew of the nav panel
@@ -143,7 +150,7 @@ class EDInternalStatusPanel:
         inventory_panel_quad = Quad.from_rect(self.sub_reg['inventory_panel']['rect'])
         # Crop the image to the extents of the quad
         inventory_panel = crop_image_by_pct(panel, inventory_panel_quad)
-        cv2.imwrite(f'test/status-panel/out/inventory_panel.png', inventory_panel)
+        self.ap.debug_sink.write('status_panel', 'inventory_panel', inventory_panel, DEBUG_STEPS)
 
         if self.ap.debug_overlay:
             # Transform the array of coordinates to the skew of the nav panel
@@ -166,8 +173,9 @@ class EDInternalStatusPanel:
         active, active_tab_name = self.is_panel_active()
         if active:
             # Store image
-            image = self.screen.get_screen_full()
-            cv2.imwrite(f'test/status-panel/int_panel_full.png', image)
+            if self.ap.debug_sink.enabled('status_panel'):
+                image = self.screen.get_screen_full()
+                self.ap.debug_sink.write('status_panel', 'int_panel_full', image)
             return active, active_tab_name
         else:
             print("Open Status Panel")
@@ -184,8 +192,9 @@ class EDInternalStatusPanel:
             active, active_tab_name = self.is_panel_active()
             if active:
                 # Store image
-                image = self.screen.get_screen_full()
-                cv2.imwrite(f'test/status-panel/internal_panel_full.png', image)
+                if self.ap.debug_sink.enabled('status_panel'):
+                    image = self.screen.get_screen_full()
+                    self.ap.debug_sink.write('status_panel', 'internal_panel_full', image)
                 return active, active_tab_name
             else:
                 return False, ""
@@ -234,25 +243,15 @@ class EDInternalStatusPanel:
                     self.ap.overlay.overlay_quad_pix('sts_panel_item', q_out, (0, 255, 0), 2)
                     self.ap.overlay.overlay_paint()
 
-                # Test OCR string
-                if self.modules_tab_text in str(ocr_textlist):
-                    tab_text = self.modules_tab_text
-                    break
-                if self.fire_groups_tab_text in str(ocr_textlist):
-                    tab_text = self.fire_groups_tab_text
-                    break
-                if self.ship_tab_text in str(ocr_textlist):
-                    tab_text = self.ship_tab_text
-                    break
-                if self.inventory_tab_text in str(ocr_textlist):
-                    tab_text = self.inventory_tab_text
-                    break
-                if self.storage_tab_text in str(ocr_textlist):
-                    tab_text = self.storage_tab_text
-                    break
-                if self.status_tab_text in str(ocr_textlist):
-                    tab_text = self.status_tab_text
-                    break
+                # Test OCR string against the labels
+                if ocr_textlist:
+                    label, sim = self.ocr.matcher('locale').best(ocr_textlist, 0.8)
+                    tab_text = next((t for t in self.tab_texts if t == label), "")
+                    if tab_text == "":
+                        # Else a label within the OCR text (i.e. with a tab icon or count read as text)
+                        tab_text = next((t for t in self.tab_texts if t in str(ocr_textlist)), "")
+                    if tab_text != "":
+                        break
             else:
                 logger.debug("is_right_panel_active: no image selected")
 
@@ -136,6 +136,7 @@ class EDJournal:
         self.current_log = self.get_latest_log()
         self.open_journal(self.current_log)
         self._prev_const_depot_details = None
+        self.recorder = None  # Optional SessionRecorder, records the journal lines read
 
         self.ship = {
             'time': (datetime.now() - datetime.fromtimestamp(getmtime(self.current_log))).seconds,
@@ -488,6 +489,8 @@ class EDJournal:
             if not line:
                 break
             else:
+                if self.recorder is not None:
+                    self.recorder.add_journal(line)
                 log = loads(line)
                 cnt = cnt + 1
                 current_jrnl = self.ship.copy()
@@ -32,6 +32,7 @@ class EDKeys:
         self.key_def_hold_time = 0.2  # Default hold time for a key press
         self.key_repeat_delay = 0.1  # Delay between key press repeats
         self.activate_window = False
+        self.recorder = None  # Optional SessionRecorder, records the keys sent
 
         self.keys_to_obtain = [
             'YawLeftButton',
@@ -296,6 +297,8 @@ class EDKeys:
         logger.debug('\tsend=' + key_binding + ',key:' + str(key) + ',key_name:' + key_name + ',hold:' + str(
             hold) + ',repeat:' + str(
             repeat) + ',repeat_delay:' + str(repeat_delay) + ',state:' + str(state))
+        if self.recorder is not None:
+            self.recorder.add_keys(key_binding, hold, repeat, state)
 
         for i in range(repeat):
             # Focus Elite window if configured.
@@ -10,7 +10,9 @@ import cv2
 import numpy as np
 
 from EDAP_data import GuiFocusExternalPanel
+from DebugSink import DEBUG_STEPS
 from EDlogger import logger
+from OCR_Matcher import text_similarity
 from Screen_Regions import Quad, Point
 from StatusParser import StatusParser
 from Screen import crop_image_by_pct
@@ -110,7 +112,6 @@ class EDNavigationPanel:
 
     def __init__(self, ed_ap, screen, keys, cb):
         self.ap = ed_ap
-        self.ocr = ed_ap.ocr
         self.screen = screen
         self.keys = keys
         self.ap_ckb = cb
@@ -121,6 +122,8 @@ class EDNavigationPanel:
         self.transactions_tab_text = self.locale["NAV_PNL_TAB_TRANSACTIONS"]
         self.contacts_tab_text = self.locale["NAV_PNL_TAB_CONTACTS"]
         self.target_tab_text = self.locale["NAV_PNL_TAB_TARGET"]
+        self.tab_texts = [self.navigation_tab_text, self.transactions_tab_text, self.contacts_tab_text,
+                          self.target_tab_text]
 
         # The rect is [L, T, R, B], top left x, y, and bottom right x, y in fraction of screen resolution
         # Nav Panel region covers the entire navigation panel.
@@ -139,6 +142,11 @@ class EDNavigationPanel:
 
         self.load_calibrated_regions()
 
+    @property
+    def ocr(self):
+        """ The AP's OCR, created on first use (or by the background warm up). """
+        return self.ap.ocr
+
     def load_calibrated_regions(self):
         calibration_file = 'configs/ocr_calibration.json'
         if os.path.exists(calibration_file):
@@ -170,7 +178,7 @@ class EDNavigationPanel:
         # Get the nav panel image based on the region
         image = self.screen.get_screen(self.panel_quad_pix.get_left(), self.panel_quad_pix.get_top(),
                                        self.panel_quad_pix.get_right(), self.panel_quad_pix.get_bottom(), rgb=False)
-        cv2.imwrite(f'test/nav-panel/out/nav_panel_original.png', image)
+        self.ap.debug_sink.write('nav_panel', 'nav_panel_original', image, DEBUG_STEPS)
 
         # Offset the panel co-ords to match the cropped image (i.e. starting at 0,0)
         panel_quad_pix_off = copy(self.panel_quad_pix)
@@ -182,7 +190,7 @@ class EDNavigationPanel:
         self._transform = trans
         self._rev_transform = rev_trans
         # Write the file
-        cv2.imwrite(f'test/nav-panel/out/nav_panel_straight.png', straightened)
+        self.ap.debug_sink.write('nav_panel', 'nav_panel_straight', straightened, DEBUG_STEPS)
 
         if self.ap.debug_overlay:
             self.ap.overlay.overlay_quad_pct('nav_panel_active', self.panel_quad_pct, (0, 255, 0), 2, 5)
@@ -203,7 +211,7 @@ class EDNavigationPanel:
         tab_bar_quad = Quad.from_rect(self.sub_reg['tab_bar']['rect'])
         # Crop the image to the extents of the quad
         tab_bar = crop_image_by_pct(self.panel, tab_bar_quad)
-        cv2.imwrite(f'test/nav-panel/out/tab_bar.png', tab_bar)
+        self.ap.debug_sink.write('nav_panel', 'tab_bar', tab_bar, DEBUG_STEPS)
 
         if self.ap.debug_overlay:
             # Transform the array of coordinates to the skew of the nav panel
@@ -229,7 +237,7 @@ class EDNavigationPanel:
         location_panel_quad = Quad.from_rect(self.sub_reg['location_panel']['rect'])
         # Crop the image to the extents of the quad
         location_panel = crop_image_by_pct(nav_panel, location_panel_quad)
-        cv2.imwrite(f'test/nav-panel/out/location_panel.png', location_panel)
+        self.ap.debug_sink.write('nav_panel', 'location_panel', location_panel, DEBUG_STEPS)
 
         if self.ap.debug_overlay:
             # Transform the array of coordinates to the skew of the nav panel
@@ -250,8 +258,9 @@ class EDNavigationPanel:
         active, active_tab_name = self.is_panel_active()
         if active:
             # Store image
-            image = self.screen.get_screen_full()
-            cv2.imwrite(f'test/nav-panel/nav_panel_full.png', image)
+            if self.ap.debug_sink.enabled('nav_panel'):
+                image = self.screen.get_screen_full()
+                self.ap.debug_sink.write('nav_panel', 'nav_panel_full', image)
             return active, active_tab_name
         else:
             print("Open Nav Panel")
@@ -267,8 +276,9 @@ class EDNavigationPanel:
             active, active_tab_name = self.is_panel_active()
             if active:
                 # Store image
-                image = self.screen.get_screen_full()
-                cv2.imwrite(f'test/nav-panel/nav_panel_full.png', image)
+                if self.ap.debug_sink.enabled('nav_panel'):
+                    image = self.screen.get_screen_full()
+                    self.ap.debug_sink.write('nav_panel', 'nav_panel_full', image)
                 return active, active_tab_name
             else:
                 return False, ""
@@ -315,19 +325,15 @@ class EDNavigationPanel:
                     self.ap.overlay.overlay_quad_pix('nav_panel_item', q_out, (0, 255, 0), 2)
                     self.ap.overlay.overlay_paint()
 
-                # Test OCR string
-                if self.navigation_tab_text in str(ocr_textlist):
-                    tab_text = self.navigation_tab_text
-                    break
-                if self.transactions_tab_text in str(ocr_textlist):
-                    tab_text = self.transactions_tab_text
-                    break
-                if self.contacts_tab_text in str(ocr_textlist):
-                    tab_text = self.contacts_tab_text
-                    break
-                if self.target_tab_text in str(ocr_textlist):
-                    tab_text = self.target_tab_text
-                    break
+                # Test OCR string against the labels
+                if ocr_textlist:
+                    label, sim = self.ocr.matcher('locale').best(ocr_textlist, 0.8)
+                    tab_text = next((t for t in self.tab_texts if t == label), "")
+                    if tab_text == "":
+                        # Else a label within the OCR text (i.e. with a tab icon or count read as text)
+                        tab_text = next((t for t in self.tab_texts if t in str(ocr_textlist)), "")
+                    if tab_text != "":
+                        break
 
             # Wait and retry
             sleep(1)
@@ -463,7 +469,7 @@ class EDNavigationPanel:
                 return False
 
             # OCR the selected item
-            ocr_textlist = self.ocr.image_simple_ocr(img_selected)
+            ocr_textlist = self.ocr.image_line_ocr(img_selected)
             if ocr_textlist is not None:
                 # Check if list has not changed (we are at the top)
                 if ocr_textlist == ocr_textlist_last:
@@ -478,7 +484,133 @@ class EDNavigationPanel:
                     self.keys.send("UI_Up", state=0)  # got to top row
                     return True
 
+    def read_location_list(self) -> (list | None, int):
+        """ Reads all the visible rows of the location list in one OCR call.
+        @return: The list of (text, confidence, Quad) for each row from the top, with the Quad in percent of the
+        location panel, and the index of the selected row (-1 if no row is selected). None if the panel could
+        not be captured.
+        """
+        loc_panel = self.capture_location_panel()
+        if loc_panel is None:
+            return None, -1
+
+        # Find the selected item/menu (solid orange)
+        img_selected, quad = self.ocr.get_highlighted_item_in_image(loc_panel, self.sub_reg_size['nav_pnl_location']['width'], self.sub_reg_size['nav_pnl_location']['height'])
+        rows = self.ocr.image_list_ocr(loc_panel, 'nav panel list')
+
+        # The selected row is the row within the highlight. If the dark text on the highlight was not read, add
+        # the row so the rows below it are counted correctly.
+        sel_index = -1
+        if img_selected is not None:
+            y_sel = (quad.get_top() + quad.get_bottom()) / 2
+            for i, (text, score, q) in enumerate(rows):
+                if q.get_top() <= y_sel <= q.get_bottom():
+                    sel_index = i
+                    break
+            else:
+                sel_index = len([r for r in rows if (r[2].get_top() + r[2].get_bottom()) / 2 < y_sel])
+                rows.insert(sel_index, ('', 0.0, quad))
+
+        # Read the rows with a low confidence (i.e. the selected row if it was not read) again, one line each,
+        # in one OCR call
+        retry = [i for i, r in enumerate(rows) if r[1] < self.ocr.rec_min_score]
+        if len(retry) > 0:
+            images = [img_selected if i == sel_index else crop_image_by_pct(loc_panel, rows[i][2]) for i in retry]
+            for i, (ocr_textlist, score) in zip(retry, self.ocr.image_ocr_batch(images, True, 'nav panel row')):
+                if ocr_textlist is not None and score > rows[i][1]:
+                    rows[i] = (' '.join(ocr_textlist), score, rows[i][2])
+        return rows, sel_index
+
+    def find_row_in_list(self, rows, dst_name, sim_match=0.8) -> int:
+        """ Returns the index of the row best matching the destination name, or -1 if no row matches.
+        @param rows: The rows from read_location_list().
+        @param dst_name: The destination name.
+        @param sim_match: Similarity match 0.0 - 1.0 for 0% - 100%.
+        """
+        if len(rows) == 0:
+            return -1
+        sims = [text_similarity(dst_name, r[0]) for r in rows]
+        index = max(range(len(sims)), key=sims.__getitem__)
+        return index if sims[index] >= sim_match else -1
+
+    def jump_to_destination_in_list(self, dst_name, max_pages: int = 20) -> bool | None:
+        """ Finds the destination by reading all the visible rows of the list at once, then moves straight to
+        it with the number of up/down presses needed. The list is only paged if the destination is not visible.
+        Only the final selection is checked.
+        @param dst_name: The destination name.
+        @param max_pages: The max number of pages to read.
+        @return: True if the destination is selected, False if it is not in the list, or None if the list could
+        not be read (i.e. no row is selected), so the row by row search should be used.
+        """
+        rows, sel_index = self.read_location_list()
+        if rows is None or sel_index < 0 or len(rows) < 2:
+            return None
+
+        dst_index = self.find_row_in_list(rows, dst_name)
+        if dst_index < 0:
+            # Not visible, start from the top and page down
+            res = self.scroll_to_top_of_list()
+            if not res:
+                return None
+            for page in range(max_pages):
+                rows, sel_index = self.read_location_list()
+                if rows is None or sel_index < 0:
+                    return None
+                last_page = False
+                if page > 0 and sel_index != len(rows) - 1:
+                    # The selection is not at the bottom of the list shown, the list ended and wrapped to the top,
+                    # past the rows after the last page. Go up past the top to the last row, to read the last page.
+                    logger.debug(f"Nav Panel list wrapped while paging for '{dst_name}', reading the last page.")
+                    self.keys.send("UI_Up", repeat=sel_index + 1)
+                    rows, sel_index = self.read_location_list()
+                    if rows is None or sel_index != len(rows) - 1:
+                        return None
+                    last_page = True
+
+                dst_index = self.find_row_in_list(rows, dst_name)
+                if dst_index >= 0:
+                    break
+                if last_page:
+                    logger.debug(f"Did not find '{dst_name}' in the list.")
+                    return False
+
+                # Move the selection a page below the last row shown, so the next page starts at that row
+                self.keys.send("UI_Down", repeat=(len(rows) - 1 - sel_index) + (len(rows) - 1))
+            else:
+                logger.debug(f"Did not find '{dst_name}' in {max_pages} pages of the list.")
+                return False
+
+        # Go straight to the row
+        presses = dst_index - sel_index
+        logger.debug(f"Found '{dst_name}' in list at {presses} rows from the selection.")
+        if presses > 0:
+            self.keys.send("UI_Down", repeat=presses)
+        elif presses < 0:
+            self.keys.send("UI_Up", repeat=-presses)
+        sleep(0.2)
+
+        # Check the final selection
+        loc_panel = self.capture_location_panel()
+        if loc_panel is None:
+            return None
+        img_selected, quad = self.ocr.get_highlighted_item_in_image(loc_panel, self.sub_reg_size['nav_pnl_location']['width'], self.sub_reg_size['nav_pnl_location']['height'])
+        ocr_textlist = self.ocr.image_line_ocr(img_selected)
+        if ocr_textlist is not None:
+            sim = self.ocr.string_similarity(dst_name, ocr_textlist)
+            if sim > 0.8:
+                logger.debug(f"Selected '{dst_name}' in list.")
+                return True
+
+        logger.debug(f"Selection is not '{dst_name}' after jumping to it, found {str(ocr_textlist)}.")
+        return None
+
     def find_destination_in_list(self, dst_name) -> bool:
+        if self.ap.config['NavPanelDirectJump']:
+            res = self.jump_to_destination_in_list(dst_name)
+            if res is not None:
+                return res
+            logger.debug(f"Nav Panel direct jump failed, searching the list row by row.")
+
         # tries is the number of rows to go through to find the item looking for
         # the Nav Panel should be filtered to reduce the number of rows in the list
         q_out = None
@@ -531,9 +663,9 @@ class EDNavigationPanel:
 
             # OCR the selected item
             sim_match = 0.8  # Similarity match 0.0 - 1.0 for 0% - 100%)
-            ocr_textlist = self.ocr.image_simple_ocr(img_selected)
+            ocr_textlist = self.ocr.image_line_ocr(img_selected)
             if ocr_textlist is not None:
-                sim = self.ocr.string_similarity(f"['{dst_name.upper()}']", str(ocr_textlist))
+                sim = self.ocr.string_similarity(dst_name, ocr_textlist)
 
                 if self.ap.debug_overlay:
                     # Overlay OCR result
@@ -8,12 +8,17 @@ from StatusParser import StatusParser
 class EDShipControl:
     """ Handles ship control, FSD, SC, etc. """
     def __init__(self, ed_ap, screen, keys, cb):
-        self.ocr = ed_ap.ocr
+        self.ap = ed_ap
         self.screen = screen
         self.keys = keys
         self.status_parser = StatusParser()
         self.ap_ckb = cb
 
+    @property
+    def ocr(self):
+        """ The AP's OCR, created on first use (or by the background warm up). """
+        return self.ap.ocr
+
     def goto_cockpit_view(self) -> bool:
         """ Goto cockpit view.
         @return: True once complete.
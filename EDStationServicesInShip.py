@@ -25,13 +25,12 @@ class EDStationServicesInShip:
     """ Handles Station Services In Ship. """
     def __init__(self, ed_ap, screen, keys, cb):
         self.ap = ed_ap
-        self.ocr = ed_ap.ocr
         self.locale = self.ap.locale
         self.screen = screen
         self.keys = keys
         self.ap_ckb = cb
-        self.passenger_lounge = PassengerLounge(self, self.ap, self.ocr, self.keys, self.screen, self.ap_ckb)
-        self.commodities_market = CommoditiesMarket(self, self.ap, self.ocr, self.keys, self.screen, self.ap_ckb)
+        self.passenger_lounge = PassengerLounge(self, self.ap, self.keys, self.screen, self.ap_ckb)
+        self.commodities_market = CommoditiesMarket(self, self.ap, self.keys, self.screen, self.ap_ckb)
         self.status_parser = StatusParser()
         self.market_parser = MarketParser()
         # The rect is top left x, y, and bottom right x, y in fraction of screen resolution
@@ -49,6 +48,11 @@ class EDStationServicesInShip:
 
         self.load_calibrated_regions()
 
+    @property
+    def ocr(self):
+        """ The AP's OCR, created on first use (or by the background warm up). """
+        return self.ap.ocr
+
     def load_calibrated_regions(self):
         calibration_file = 'configs/ocr_calibration.json'
         if os.path.exists(calibration_file):
@@ -194,10 +198,9 @@ class EDStationServicesInShip:
 
 
 class PassengerLounge:
-    def __init__(self, station_services_in_ship: EDStationServicesInShip, ed_ap, ocr, keys, screen, cb):
+    def __init__(self, station_services_in_ship: EDStationServicesInShip, ed_ap, keys, screen, cb):
         self.parent = station_services_in_ship
         self.ap = ed_ap
-        self.ocr = ocr
         self.keys = keys
         self.screen = screen
         self.ap_ckb = cb
@@ -215,12 +218,16 @@ class PassengerLounge:
         self.complete_mission_row_width = 384  # Buy/sell item width in pixels at 1920x1080
         self.complete_mission_row_height = 70  # Buy/sell item height in pixels at 1920x1080
 
+    @property
+    def ocr(self):
+        """ The AP's OCR, created on first use (or by the background warm up). """
+        return self.ap.ocr
+
 
 class CommoditiesMarket:
-    def __init__(self, station_services_in_ship: EDStationServicesInShip, ed_ap, ocr, keys, screen, cb):
+    def __init__(self, station_services_in_ship: EDStationServicesInShip, ed_ap, keys, screen, cb):
         self.parent = station_services_in_ship
         self.ap = ed_ap
-        self.ocr = ocr
         self.keys = keys
         self.screen = screen
         self.ap_ckb = cb
@@ -233,6 +240,11 @@ class CommoditiesMarket:
         self.commodity_row_width = 422  # Buy/sell item width in pixels at 1920x1080
         self.commodity_row_height = 35  # Buy/sell item height in pixels at 1920x1080
 
+    @property
+    def ocr(self):
+        """ The AP's OCR, created on first use (or by the background warm up). """
+        return self.ap.ocr
+
     def select_buy(self, keys) -> bool:
         """ Select Buy. Assumes on Commodities Market screen. """
 
@@ -1,6 +1,7 @@
 import math
 import os
 import traceback
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
 from datetime import timedelta
 from enum import Enum
 from math import atan, degrees
@@ -22,13 +23,21 @@ from EDlogger import logging
 import Image_Templates
 import Screen
 import Screen_Regions
+from Screen_Frame import Frame
+from Screen_FrameSource import create_frame_source
+from Compass_Locator import CompassLocator
+from Template_Calibration import ScaleTracker, find_best_scale, score_scale
+from SessionRecorder import SessionRecorder
 from EDWayPoint import *
 from EDJournal import *
 from EDKeys import *
 from EDafk_combat import AFK_Combat
+from CvViewer import CvViewer
+from DebugSink import DebugSink, DEBUG_KEY, DEBUG_OFF
 from EDInternalStatusPanel import EDInternalStatusPanel
 from NavRouteParser import NavRouteParser
 from OCR import OCR
+from OCR_Service import PRIORITY_BACKGROUND
 from EDNavigationPanel import EDNavigationPanel
 from Overlay import *
 from StatusParser import StatusParser
@@ -67,7 +76,7 @@ class FSDAssistReturn(Enum):
 
 class EDAutopilot:
 
-    def __init__(self, cb, doThread=True):
+    def __init__(self, cb, doThread=True, frame_source=None, frame_source_path=None):
 
         # NOTE!!! When adding a new config value below, add the same after read_config() to set
         # a default value or an error will occur reading the new value!
@@ -121,6 +130,16 @@ class EDAutopilot:
             "WaypointFilepath": "",        # The previous waypoint file path
             "DebugOCR": False,             # For debug, write all OCR data to output folder
             "DebugImages": False,          # For debug, write debug images to output folder
+            "DebugImageLevel": 0,          # Debug images to write, 0 = off (or key images if DebugImages), 1 = key images, 2 = every step
+            "DebugImageChannels": {},      # Debug image level by channel, overrides DebugImageLevel (i.e. {"ocr": 2})
+            "DebugImageQuotaMB": 200,      # Max disk space used by debug images, the oldest are deleted
+            "OCRCacheSize": 256,           # OCR results kept by image hash, 0 to disable the OCR cache
+            "OCRCacheTTL": 5.0,            # Max age in seconds of a cached OCR result
+            "OCRRecognitionOnly": True,    # OCR highlighted items with the recognition model only (no text detection)
+            "OCRService": False,           # Run OCR on worker processes. If False, OCR runs on threads in the AP process and holds the GIL
+            "OCRServiceWorkers": 1,        # Number of OCR worker processes (or threads if OCRService is False)
+            "NavPanelDirectJump": False,   # Read the whole Nav Panel list and jump straight to the destination
+            "OCRWarmUp": False,            # Load the OCR models in the background when the GUI starts
             "Key_ModDelay": 0.01,          # Delay for key modifiers to ensure modifier is detected before/after the key
             "Key_DefHoldTime": 0.2,        # Default hold time for a key press
             "Key_RepeatDelay": 0.1,        # Delay between key press repeats
@@ -129,6 +148,20 @@ class EDAutopilot:
             "target_align_inner_lim": 0.5, # For test
             "target_align_inertia_pitch_factor": 1.2, # For test
             "target_align_inertia_yaw_factor": 1.2, # For test
+            "FrameSource": "live",         # Where frames come from: 'live', 'images', 'video' or 'session' (for testing)
+            "FrameSourcePath": "",         # The folder or file for the non-live frame sources
+            "CaptureThreadEnable": False,  # Grab frames on a background thread instead of when needed
+            "CaptureRate": 30,             # Capture thread rate in frames per second
+            "CaptureBufferSize": 8,        # Number of recent frames kept by the capture thread
+            "RecordSession": False,        # Record frames for replay, with the status, journal and keys to compare
+            "RecordPath": "./recordings",  # Folder to write recorded sessions to
+            "RecordRect": [0.0, 0.0, 1.0, 1.0],  # Part of the screen to record [L, T, R, B] in percent
+            "RecordScale": 0.5,            # Scale to record frames at
+            "RecordMaxRate": 10,           # Max frames per second to record
+            "PyramidLevels": {},           # Pyramid matching levels by region name (i.e. {"target": 1}), none by default
+            "SubPixelAlign": True,         # Refine the navpoint and target match locations to sub-pixel accuracy
+            "ColorLutRegions": [],         # Regions to colour filter with a lookup table instead of HSV (i.e. ["target"])
+            "CompassLocator": "template",  # How the compass and nav point are found, "template" or "shape" (no scale calibration)
         }
         # NOTE!!! When adding a new config value above, add the same after read_config() to set
         # a default value or an error will occur reading the new value!
@@ -146,7 +179,14 @@ class EDAutopilot:
         self.honk_thread = None
         self._tce_integration = None
         self._ocr = None
+        self._ocr_lock = threading.Lock()  # Only one OCR is created, the warm up thread may be creating it
+        self._ocr_warm_up_thread = None
+        self.ocr_ready = threading.Event()  # Set when the background OCR warm up is done
         self._sc_disengage_active = False  # Is SC Disengage active
+        self._disengage_future = None  # The disengage OCR running in the background
+        self._disengage_image = None
+        self._disengage_start = 0.0
+        self._sco_monitor_start = 0.0  # When the current SCO monitoring started, older disengage OCR is discarded
 
         # used this to write the self.config table to the json file
         # self.write_config(self.config)
@@ -191,6 +231,26 @@ class EDAutopilot:
                 cnf['DebugOCR'] = False
             if 'DebugImages' not in cnf:
                 cnf['DebugImages'] = False
+            if 'DebugImageLevel' not in cnf:
+                cnf['DebugImageLevel'] = 0
+            if 'DebugImageChannels' not in cnf:
+                cnf['DebugImageChannels'] = {}
+            if 'DebugImageQuotaMB' not in cnf:
+                cnf['DebugImageQuotaMB'] = 200
+            if 'OCRCacheSize' not in cnf:
+                cnf['OCRCacheSize'] = 256
+            if 'OCRCacheTTL' not in cnf:
+                cnf['OCRCacheTTL'] = 5.0
+            if 'OCRRecognitionOnly' not in cnf:
+                cnf['OCRRecognitionOnly'] = True
+            if 'OCRService' not in cnf:
+                cnf['OCRService'] = False
+            if 'OCRServiceWorkers' not in cnf:
+                cnf['OCRServiceWorkers'] = 1
+            if 'NavPanelDirectJump' not in cnf:
+                cnf['NavPanelDirectJump'] = False
+            if 'OCRWarmUp' not in cnf:
+                cnf['OCRWarmUp'] = False
             if 'Key_ModDelay' not in cnf:
                 cnf['Key_ModDelay'] = 0.01
             if 'Key_DefHoldTime' not in cnf:
@@ -207,6 +267,34 @@ class EDAutopilot:
                 cnf['target_align_inertia_pitch_factor'] = 1.2 # For test
             if 'target_align_inertia_yaw_factor' not in cnf:
                 cnf['target_align_inertia_yaw_factor'] = 1.2 # For test
+            if 'FrameSource' not in cnf:
+                cnf['FrameSource'] = "live"
+            if 'FrameSourcePath' not in cnf:
+                cnf['FrameSourcePath'] = ""
+            if 'CaptureThreadEnable' not in cnf:
+                cnf['CaptureThreadEnable'] = False
+            if 'CaptureRate' not in cnf:
+                cnf['CaptureRate'] = 30
+            if 'CaptureBufferSize' not in cnf:
+                cnf['CaptureBufferSize'] = 8
+            if 'RecordSession' not in cnf:
+                cnf['RecordSession'] = False
+            if 'RecordPath' not in cnf:
+                cnf['RecordPath'] = "./recordings"
+            if 'RecordRect' not in cnf:
+                cnf['RecordRect'] = [0.0, 0.0, 1.0, 1.0]
+            if 'RecordScale' not in cnf:
+                cnf['RecordScale'] = 0.5
+            if 'RecordMaxRate' not in cnf:
+                cnf['RecordMaxRate'] = 10
+            if 'PyramidLevels' not in cnf:
+                cnf['PyramidLevels'] = {}
+            if 'SubPixelAlign' not in cnf:
+                cnf['SubPixelAlign'] = True
+            if 'ColorLutRegions' not in cnf:
+                cnf['ColorLutRegions'] = []
+            if 'CompassLocator' not in cnf:
+                cnf['CompassLocator'] = "template"
             self.config = cnf
             logger.debug("read AP json:"+str(cnf))
         else:
@@ -255,7 +343,14 @@ class EDAutopilot:
         self.single_waypoint_enabled = False
 
         # Create instance of each of the needed Classes
-        self.scr = Screen.Screen(cb)
+        # The frame source from the command line (if any) overrides the config
+        if frame_source is None:
+            frame_source = self.config['FrameSource']
+        if frame_source_path is None:
+            frame_source_path = self.config['FrameSourcePath']
+        self.scr = Screen.Screen(cb, create_frame_source(frame_source, frame_source_path))
+        if self.config['CaptureThreadEnable']:
+            self.scr.start_capture(self.config['CaptureRate'], self.config['CaptureBufferSize'])
         self.scr.scaleX = self.config['ScreenScale']
         self.scr.scaleY = self.config['ScreenScale']
         self.target_scale = self.config['TargetScale']
@@ -276,6 +371,10 @@ class EDAutopilot:
 
         self.templ = Image_Templates.Image_Templates(self.scr.scaleX, self.scr.scaleY, self.scr.scaleX, self.scr.scaleX)
         self.scrReg = Screen_Regions.Screen_Regions(self.scr, self.templ)
+        for region_name, levels in self.config['PyramidLevels'].items():
+            self.scrReg.set_pyramid_levels(region_name, levels)
+        for region_name in self.config['ColorLutRegions']:
+            self.scrReg.set_color_lut(region_name, True)
         self.jn = EDJournal(cb)
         self.keys = EDKeys(cb)
         self.afk_combat = AFK_Combat(self, self.keys, self.jn, self.vce)
@@ -303,6 +402,12 @@ class EDAutopilot:
         self.pitchrate = 33.0
         self.sunpitchuptime = 0.0
 
+        # Keep the compass and target scales calibrated from the match scores, see ScaleTracker
+        self.compass_tracker = ScaleTracker(self.templ, 'compass', self.compass_scale)
+        self.target_tracker = ScaleTracker(self.templ, 'target', self.target_scale)
+        self.target_tracker.calibrated = True  # From the config TargetScale
+        self.compass_locator = CompassLocator()
+
         self.jump_cnt = 0
         self._eta = 0
         self._str_eta = ''
@@ -333,16 +438,24 @@ class EDAutopilot:
 
         self.debug_overlay = self.config['DebugOverlay']
         self.debug_ocr = self.config['DebugOCR']
-        self.debug_images = self.config['DebugImages']
         self.debug_image_folder = './debug-output/images'
         if not os.path.exists(self.debug_image_folder):
             os.makedirs(self.debug_image_folder)
+        self.debug_sink = DebugSink(self.debug_image_folder, self.config['DebugImageLevel'],
+                                    self.config['DebugImageChannels'], self.config['DebugImageQuotaMB'])
+        self.debug_images = self.config['DebugImages']
 
-        # debug window
+        # debug window, shown by the viewer thread
         self.cv_view = self.config['Enable_CV_View']
+        self.cv_viewer = CvViewer()
         self.cv_view_x = 10
         self.cv_view_y = 10
 
+        # session recorder
+        self.recorder = None
+        if self.config['RecordSession']:
+            self.start_recording()
+
         #start the engine thread
         self.terminate = False  # terminate used by the thread to exit its loop
         if doThread:
@@ -363,13 +476,81 @@ class EDAutopilot:
             self._tce_integration = TceIntegration(self, self.ap_ckb)
         return self._tce_integration
 
+    @property
+    def debug_images(self) -> bool:
+        """ True to write the key debug images (i.e. when a match fails). """
+        return self._debug_images
+
+    @debug_images.setter
+    def debug_images(self, value: bool):
+        self._debug_images = value
+        self.debug_sink.set_level(max(self.config['DebugImageLevel'], DEBUG_KEY if value else DEBUG_OFF))
+
     @property
     def ocr(self) -> OCR:
         """ Load OCR class when needed. """
         if not self._ocr:
-            self._ocr = OCR(self, self.scr)
+            with self._ocr_lock:
+                if not self._ocr:
+                    start = time.perf_counter()
+                    self._ocr = OCR(self, self.scr)
+                    logger.info(f"OCR created in {time.perf_counter() - start:.2f} secs.")
         return self._ocr
 
+    def warm_up_ocr(self):
+        """ Creates the OCR and runs a first inference on a background thread, so the first OCR use (i.e. the
+        disengage check) does not stall the AP while the models load. ocr_ready is set when done. """
+        if self._ocr_warm_up_thread is not None:
+            return
+        self._ocr_warm_up_thread = threading.Thread(target=self._warm_up_ocr, name="OCRWarmUp", daemon=True)
+        self._ocr_warm_up_thread.start()
+
+    def _warm_up_ocr(self):
+        try:
+            logger.info("OCR warm up started.")
+            start = time.perf_counter()
+            warm_time = self.ocr.warm_up()
+            logger.info(f"OCR warmed up in {warm_time:.2f} secs, ready in {time.perf_counter() - start:.2f} secs.")
+        except Exception as e:
+            logger.error(f"OCR warm up failed: {e}")
+        finally:
+            self.ocr_ready.set()
+
+    def wait_for_ocr(self, timeout: float = None) -> bool:
+        """ Waits for the background OCR warm up (if started) to finish.
+        @param timeout: The max time to wait in seconds, or None to wait until done.
+        @return: True if the warm up is done or was not started, False if timed out.
+        """
+        if self._ocr_warm_up_thread is None:
+            return True
+        return self.ocr_ready.wait(timeout)
+
+    def start_recording(self):
+        """ Start recording the frames used, the status, the journal and the keys sent to a new session folder.
+        The frames can be replayed with the 'session' frame source. """
+        self.stop_recording()
+        path = os.path.join(self.config['RecordPath'], get_timestamped_filename('session', '', '')[:-1])
+        self.recorder = SessionRecorder(path, self.scr.screen_width, self.scr.screen_height,
+                                        self.config['RecordRect'], self.config['RecordScale'],
+                                        self.config['RecordMaxRate'])
+        self.recorder.start()
+        self.scr.recorder = self.recorder
+        self.keys.recorder = self.recorder
+        self.jn.recorder = self.recorder
+        self.status.recorder = self.recorder
+        self.ap_ckb('log', f"Recording session to '{path}'.")
+
+    def stop_recording(self):
+        """ Stop recording the session (if recording). """
+        if self.recorder is None:
+            return
+        self.scr.recorder = None
+        self.keys.recorder = None
+        self.jn.recorder = None
+        self.status.recorder = None
+        self.recorder.stop()
+        self.recorder = None
+
     # Loads the configuration file
     #
     def read_config(self, fileName='./configs/AP.json'):
@@ -412,7 +593,6 @@ class EDAutopilot:
                 self.ship_configs['Ship_Configs'][self.current_ship_type] = {}
                 logger.debug(f"Created new ship config entry for: {self.current_ship_type}")
             
-            self.ship_configs['Ship_Configs'][self.current_ship_type]['compass_scale'] = round(self.compass_scale, 4)
             self.ship_configs['Ship_Configs'][self.current_ship_type]['PitchRate'] = self.pitchrate
             self.ship_configs['Ship_Configs'][self.current_ship_type]['RollRate'] = self.rollrate
             self.ship_configs['Ship_Configs'][self.current_ship_type]['YawRate'] = self.yawrate
@@ -439,9 +619,8 @@ class EDAutopilot:
         if ship_type in self.ship_configs['Ship_Configs']:
             current_ship_cfg = self.ship_configs['Ship_Configs'][ship_type]
             # Check if the custom config has actual values (not just empty dict)
-            if any(key in current_ship_cfg for key in ['compass_scale', 'RollRate', 'PitchRate', 'YawRate', 'SunPitchUp+Time']):
+            if any(key in current_ship_cfg for key in ['RollRate', 'PitchRate', 'YawRate', 'SunPitchUp+Time']):
                 # Use custom configuration - this means it's been modified and saved to ship_configs.json
-                self.compass_scale = current_ship_cfg.get('compass_scale', self.scr.scaleX)
                 self.rollrate = current_ship_cfg.get('RollRate', 80.0)
                 self.pitchrate = current_ship_cfg.get('PitchRate', 33.0)
                 self.yawrate = current_ship_cfg.get('YawRate', 8.0)
@@ -453,7 +632,6 @@ class EDAutopilot:
         if ship_type in ship_rpy_sc_50:
             ship_defaults = ship_rpy_sc_50[ship_type]
             # Use default configuration - this means it's been modified and saved to ship_configs.json
-            self.compass_scale = self.scr.scaleX  # Always use current scale for compass
             self.rollrate = ship_defaults.get('RollRate', 80.0)
             self.pitchrate = ship_defaults.get('PitchRate', 33.0)
             self.yawrate = ship_defaults.get('YawRate', 8.0)
@@ -462,7 +640,6 @@ class EDAutopilot:
             return
 
         # Step 3: Use hardcoded defaults
-        self.compass_scale = self.scr.scaleX
         self.rollrate = 80.0
         self.pitchrate = 33.0
         self.yawrate = 8.0
@@ -473,6 +650,54 @@ class EDAutopilot:
         if ship_type not in self.ship_configs['Ship_Configs']:
             self.ship_configs['Ship_Configs'][ship_type] = dict()
 
+    def get_scale_calibration_key(self) -> str:
+        """ The compass and target scales depend on the resolution and FOV as well as the ship (cockpit), so they
+        are saved per ship under this key. """
+        return f"{self.scr.screen_width}x{self.scr.screen_height} FOV {self.gfx_settings.fov}"
+
+    def load_scale_calibration(self, ship_type):
+        """ Load the compass and target scales saved for the ship at the current resolution and FOV. This is the
+        only store of the scales. If there are none, the scales are reset to the screen defaults and the compass
+        will be calibrated on the next compass align. """
+        ship_cfg = self.ship_configs['Ship_Configs'].get(ship_type, {})
+        key = self.get_scale_calibration_key()
+        scale_cfg = ship_cfg.get('ScaleCalibration', {}).get(key)
+
+        # Move a compass scale saved before the scales were per resolution and FOV to the current key
+        if 'compass_scale' in ship_cfg:
+            compass_scale = ship_cfg.pop('compass_scale')
+            if scale_cfg is None:
+                scale_cfg = {'compass_scale': compass_scale}
+                ship_cfg.setdefault('ScaleCalibration', {})[key] = scale_cfg
+            self.write_ship_configs(self.ship_configs)
+            logger.info(f"Moved the compass scale of {ship_type} to {key}")
+
+        if scale_cfg is None:
+            scale_cfg = {}
+        self.compass_scale = scale_cfg.get('compass_scale', self.scr.scaleX)
+        self.target_scale = scale_cfg.get('target_scale', self.config['TargetScale'])
+        logger.info(f"Using compass scale {self.compass_scale:5.4f} and target scale {self.target_scale:5.4f} "
+                    f"for {ship_type} at {key}")
+
+        self.compass_tracker.reset(self.compass_scale, 'compass_scale' in scale_cfg)
+        self.target_tracker.reset(self.target_scale)  # The default is the calibrated config TargetScale
+
+    def save_scale_calibration(self):
+        """ Save the compass and target scales for the current ship at the current resolution and FOV. """
+        self.compass_tracker.changed = False
+        self.target_tracker.changed = False
+        # Check if a ship and not a suit (on foot)
+        if self.current_ship_type not in ship_size_map:
+            return
+
+        ship_cfg = self.ship_configs['Ship_Configs'].setdefault(self.current_ship_type, {})
+        ship_cfg.setdefault('ScaleCalibration', {})[self.get_scale_calibration_key()] = {
+            'compass_scale': round(self.compass_scale, 4),
+            'target_scale': round(self.target_scale, 4),
+        }
+        self.write_ship_configs(self.ship_configs)
+        logger.debug(f"Saved scale calibration for: {self.current_ship_type}")
+
     # draw the overlay data on the ED Window
     #
     def update_overlay(self):
@@ -571,59 +796,48 @@ class EDAutopilot:
             cv2.line(img, (int(pt2[0]), int(pt1[1]+half_hgt)), (int(pt2[0]+tic_len), int(pt1[1]+half_hgt)), color, thick)
 
     def calibrate_region(self, range_low, range_high, range_step, threshold: float, reg_name: str, templ_name: str, no_overlay: bool = False):
-        """ Find the best scale value in the given range of scales with the passed in threshold
+        """ Find the best scale value in the given range of scales with the passed in threshold.
+        The screen is grabbed once and the range is searched coarse to fine on that frame, so the result
+        does not depend on the ship holding still.
         @param reg_name:
         @param range_low: Lowest scaling value (0-100%)
         @param range_high: Highest scaling value (0-100%)
-        @param range_step: Scaling value step increment (0-100%) for each loop
+        @param range_step: Scaling value step increment (0-100%), the resolution of the result
         @param threshold: The minimum threshold to match (0.0 - 1.0)
         @param templ_name: The region name i.i 'compass' or 'target'
         @param no_overlay: Do not show overlay.
-        @return:
+        @return: The best scale (0-100%) and match, or 0, 0 if the match is not above the threshold.
         """
-        scale = 0
-        max_pick = 0
-        i = range_low
-        while i <= range_high:
-            scale_x = float(i / 100)
-            scale_y = scale_x
-
-            # reload the templates with this scale value
-            self.templ.reload_templates(scale_x, scale_y, scale_x, scale_x)
-
-            # do image matching on the compass and the target
-            image, (minVal, maxVal, minLoc, maxLoc), match = self.scrReg.match_template_in_region_x3(reg_name, templ_name)
-
-            if not no_overlay:
-                border = 10  # border to prevent the box from interfering with future matches
-                reg_pos = self.scrReg.reg[reg_name]['rect']
-                width = self.scrReg.templates.template[templ_name]['width'] + border + border
-                height = self.scrReg.templates.template[templ_name]['height'] + border + border
-                left = reg_pos[0] + maxLoc[0] - border
-                top = reg_pos[1] + maxLoc[1] - border
-
-                if maxVal > threshold and maxVal > max_pick:
-                    # Draw box around region
-                    self.overlay.overlay_rect(20, (left, top), (left + width, top + height), (0, 255, 0), 2)
-                    self.overlay.overlay_floating_text(20, f'Match: {maxVal:5.4f}(%)', left, top - 25, (0, 255, 0))
-                else:
-                    # Draw box around region
-                    self.overlay.overlay_rect(21, (left, top), (left + width, top + height), (255, 0, 0), 2)
-                    self.overlay.overlay_floating_text(21, f'Match: {maxVal:5.4f}(%)', left, top - 25, (255, 0, 0))
+        self.scr.grab_frame()
+        region = self.scr.get_frame_region(self.scrReg.reg[reg_name]['rect'])
+        best_scale, max_val, max_loc = find_best_scale(region, self.templ, templ_name, range_low / 100,
+                                                       range_high / 100, range_step / 100)
 
-                self.overlay.overlay_paint()
+        if not no_overlay and best_scale != 0:
+            border = 10  # border to prevent the box from interfering with future matches
+            reg_pos = self.scrReg.reg[reg_name]['rect']
+            templ = self.templ.get_template(templ_name, best_scale)
+            width = templ['width'] + border + border
+            height = templ['height'] + border + border
+            left = reg_pos[0] + max_loc[0] - border
+            top = reg_pos[1] + max_loc[1] - border
+
+            if max_val > threshold:
+                # Draw box around region
+                self.overlay.overlay_rect(20, (left, top), (left + width, top + height), (0, 255, 0), 2)
+                self.overlay.overlay_floating_text(20, f'Match: {max_val:5.4f}(%)', left, top - 25, (0, 255, 0))
+            else:
+                # Draw box around region
+                self.overlay.overlay_rect(21, (left, top), (left + width, top + height), (255, 0, 0), 2)
+                self.overlay.overlay_floating_text(21, f'Match: {max_val:5.4f}(%)', left, top - 25, (255, 0, 0))
 
-            # Check the match percentage
-            if maxVal > threshold:
-                if maxVal > max_pick:
-                    max_pick = maxVal
-                    scale = i
-                    #self.ap_ckb('log', 'Cal: Found match:' + f'{max_pick:5.4f}' + "% with scale:" + f'{self.scr.scaleX:5.4f}')
+            self.overlay.overlay_paint()
 
-            # Next range
-            i = i + range_step
+        # Check the match percentage
+        if max_val > threshold:
+            return best_scale * 100, max_val
 
-        return scale, max_pick
+        return 0, 0
 
     def calibrate_target(self):
         """ Routine to find the optimal scaling values for the template images. """
@@ -685,33 +899,14 @@ class EDAutopilot:
 
     def calibrate_target_worker(self):
         """ Calibrate target and screen. """
-        range_low = 50  # Minimum scale (30%)
+        range_low = 50  # Minimum scale (50%)
         range_high = 200  # Maximum scale (200%)
-        range_step = 1  # Scale increment to step (1%)
-        scale_max = 0
-        max_val = 0
+        range_step = 0.1  # Resolution of the scale found (0.1%)
 
-        # loop through the test twice. Once over the wide scaling range at 1% increments and once over a
-        # small scaling range at 0.1% increments.
+        # Search the whole scaling range, coarse to fine, down to 0.1% on a single screen grab.
         # Find out which scale factor meets the highest threshold value.
-        for i in range(2):
-            threshold = 0.0  # Minimum match is constant. Result will always be the highest match.
-            scale, max_pick = self.calibrate_region(range_low, range_high, range_step, threshold, 'target', 'target')
-            if scale != 0:
-                scale_max = scale
-                max_val = max_pick
-                range_low = scale - 5  # Current scale - 5%
-                range_high = scale + 5  # Current scale + 5%
-                range_step = 0.1  # Scale increment to step (0.1%)
-                if i == 1:
-                    self.ap_ckb('log',
-                                f'Target Cal: Best rough match: {max_val:5.4f}(%) at scale: {float(scale_max / 100):5.4f}')
-                else:
-                    self.ap_ckb('log',
-                                f'Target Cal: Best fine match: {max_val:5.4f}(%) at scale: {float(scale_max / 100):5.4f}')
-
-            else:
-                break  # no match found with threshold
+        threshold = 0.0  # Minimum match is constant. Result will always be the highest match.
+        scale_max, max_val = self.calibrate_region(range_low, range_high, range_step, threshold, 'target', 'target')
 
         # if we found a scaling factor that meets our criteria, then save it to the resolution.json file
         if max_val != 0:
@@ -724,6 +919,8 @@ class EDAutopilot:
 
             self.scr.write_config(
                 data=None)  # None means the writer will use its own scales variable which we modified
+            self.target_tracker.reset(self.target_scale)
+            self.save_scale_calibration()
         else:
             self.ap_ckb('log',
                         f'Target Cal: Insufficient matching to meet reliability, max % match: {max_val:5.4f}(%)')
@@ -738,9 +935,9 @@ class EDAutopilot:
         cur_scale = self.scr.scaleX * 100
         range_low = cur_scale - 15  # Current scale - 15%
         range_high = cur_scale + 15  # Current scale + 15%
-        range_step = 0.25  # Scale increment to step (0.25%)
+        range_step = 0.25  # Resolution of the scale found (0.25%)
 
-        # loop through the test.
+        # search the range, coarse to fine, on a single screen grab.
         threshold = 0.5  # Minimum match is constant. Result will always be the highest match.
         no_overlay = not self.debug_overlay
         scale_max, max_val = self.calibrate_region(range_low, range_high, range_step, threshold, 'target','target', no_overlay)
@@ -754,6 +951,8 @@ class EDAutopilot:
 
             self.scr.write_config(
                 data=None)  # None means the writer will use its own scales variable which we modified
+            self.target_tracker.reset(self.target_scale)
+            self.save_scale_calibration()
         else:
             self.ap_ckb('log', f'Target Cal: Insufficient matching to meet reliability, max % match: {max_val:5.4f}(%)')
 
@@ -762,33 +961,14 @@ class EDAutopilot:
 
     def calibrate_compass_worker(self):
         """ Calibrate Compass """
-        range_low = 50  # Minimum scale (30%)
+        range_low = 50  # Minimum scale (50%)
         range_high = 200  # Maximum scale (200%)
-        range_step = 1  # Scale increment to step (1%)
-        scale_max = 0
-        max_val = 0
+        range_step = 0.1  # Resolution of the scale found (0.1%)
 
-        # loop through the test twice. Once over the wide scaling range at 1% increments and once over a
-        # small scaling range at 0.1% increments.
+        # Search the whole scaling range, coarse to fine, down to 0.1% on a single screen grab.
         # Find out which scale factor meets the highest threshold value.
-        for i in range(1):
-            threshold = 0.0  # Minimum match is constant. Result will always be the highest match.
-            scale, max_pick = self.calibrate_region(range_low, range_high, range_step, threshold, 'compass','compass')
-            if scale != 0:
-                scale_max = scale
-                max_val = max_pick
-                range_low = scale - 5  # Current scale - 5%
-                range_high = scale + 5  # Current scale + 5%
-                range_step = 0.1  # Scale increment to step (0.1%)
-                if i == 1:
-                    self.ap_ckb('log',
-                                f'Target Cal: Best rough match: {max_val * 100:5.2f}% at scale: {float(scale_max / 100):5.4f}')
-                else:
-                    self.ap_ckb('log',
-                                f'Target Cal: Best fine match: {max_val * 100:5.2f}% at scale: {float(scale_max / 100):5.4f}')
-
-            else:
-                break  # no match found with threshold
+        threshold = 0.0  # Minimum match is constant. Result will always be the highest match.
+        scale_max, max_val = self.calibrate_region(range_low, range_high, range_step, threshold, 'compass', 'compass')
 
         # if we found a scaling factor that meets our criteria, then save it to the resolution.json file
         if max_val != 0:
@@ -797,6 +977,8 @@ class EDAutopilot:
                         f'Compass Cal: Max best match: {max_val * 100:5.2f}% with scale: {c_scale_x:5.4f}')
             # Keep new value
             self.compass_scale = c_scale_x
+            self.compass_tracker.reset(self.compass_scale)
+            self.save_scale_calibration()
 
         else:
             self.ap_ckb('log',
@@ -812,9 +994,9 @@ class EDAutopilot:
         cur_scale = self.compass_scale * 100
         range_low = cur_scale - 15  # Current scale - 15%
         range_high = cur_scale + 15  # Current scale + 15%
-        range_step = 0.25  # Scale increment to step (0.25%)
+        range_step = 0.25  # Resolution of the scale found (0.25%)
 
-        # loop through the test.
+        # search the range, coarse to fine, on a single screen grab.
         threshold = 0.5  # Minimum match is constant. Result will always be the highest match.
         no_overlay = not self.debug_overlay
         scale_max, max_val = self.calibrate_region(range_low, range_high, range_step, threshold, 'compass','compass', no_overlay)
@@ -825,6 +1007,8 @@ class EDAutopilot:
                         f'Compass Cal: Max best match: {max_val * 100:5.2f}% with scale: {c_scale_x:5.4f}')
             # Keep new value
             self.compass_scale = c_scale_x
+            self.compass_tracker.reset(self.compass_scale)
+            self.save_scale_calibration()
 
         else:
             self.ap_ckb('log',
@@ -866,9 +1050,7 @@ class EDAutopilot:
             #self.draw_match_rect(elw_image_d, maxLoc, (maxLoc[0]+15,maxLoc[1]+15), (255,255,255), 1)
             self.draw_match_rect(elw_image_d, maxLoc1, (maxLoc1[0]+15, maxLoc1[1]+25), (0, 0, 255), 1)
             cv2.putText(elw_image_d, f'{maxVal1:5.2f}> .70', (1, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.30, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.imshow('fss', elw_image_d)
-            cv2.moveWindow('fss', self.cv_view_x, self.cv_view_y+100)
-            cv2.waitKey(30)
+            self.cv_viewer.show('fss', elw_image_d, self.cv_view_x, self.cv_view_y+100)
 
         logger.info("elw detected:{0:6.2f} ".format(maxVal)+" sig:{0:6.2f}".format(maxVal1))
 
@@ -954,12 +1136,26 @@ class EDAutopilot:
             0deg (12 o'clock) to
             180deg (6 o'clock clockwise)
         """
+        if self.config['CompassLocator'] == 'shape':
+            result = self.get_nav_offset_shape(scr_reg)
+            if result is not None:
+                return result
+            # Fall back to the templates (i.e. the compass ring is partly hidden)
+
         full_compass_image = None
         maxLoc = 0
         maxVal = 0
         # for i in range(2):
         full_compass_image, (minVal, maxVal, minLoc, maxLoc), match = scr_reg.match_template_in_region_x3('compass', 'compass')
 
+        # Track the compass scale while the compass is (likely) up, checking the neighbouring scales if the match drops
+        if not disable_auto_cal and maxVal >= scr_reg.compass_match_thresh / 2:
+            channels = self.scr.get_frame_region(scr_reg.reg['compass']['rect']).get_channels('HSV', swap_rb=False)
+            if self.compass_tracker.update(maxVal, lambda templ_image: score_scale(channels, templ_image)[0]):
+                self.compass_scale = self.compass_tracker.scale
+                self.templ.reload_templates(self.scr.scaleX, self.scr.scaleY, self.compass_scale, self.target_scale)
+                full_compass_image, (minVal, maxVal, minLoc, maxLoc), match = scr_reg.match_template_in_region_x3('compass', 'compass')
+
             # # need > x in the match to say we do have a destination
             # if maxVal < (scr_reg.compass_match_thresh / 2):
             #     # If we are so far below threshold, then compass must not be up
@@ -972,9 +1168,7 @@ class EDAutopilot:
 
         # need > x in the match to say we do have a destination
         if maxVal < scr_reg.compass_match_thresh:
-            if self.debug_images:
-                f = get_timestamped_filename('[get_nav_offset] no_compass_match', '', '.png')
-                cv2.imwrite(f'{self.debug_image_folder}/{f}', full_compass_image)
+            self.debug_sink.write('compass', '[get_nav_offset] no_compass_match', full_compass_image, timestamp=True)
             return None
 
         pt = maxLoc
@@ -990,11 +1184,13 @@ class EDAutopilot:
         # cut out the compass from the region
         pad = 5
         compass_image = full_compass_image[abs(pt[1]-pad): pt[1]+c_hgt+pad, abs(pt[0]-pad): pt[0]+c_wid+pad].copy()
+        # The gray and HSV conversions of the compass are shared by the matches below
+        compass_frame = Frame.from_image(compass_image)
         #compass_image_gray = cv2.cvtColor(compass_image, cv2.COLOR_BGR2GRAY)
-        compass_image_gray = self.scrReg.equalize(compass_image)
+        compass_image_gray = self.scrReg.equalize(compass_frame)
 
         # find the nav point within the compass box
-        navpt_image, (n_minVal, n_maxVal, n_minLoc, n_maxLoc), match = scr_reg.match_template_in_image_x3(compass_image, 'navpoint')
+        navpt_image, (n_minVal, n_maxVal, n_minLoc, n_maxLoc), match = scr_reg.match_template_in_image_x3(compass_frame, 'navpoint')
         n_pt = n_maxLoc
 
         compass_x_min = pad
@@ -1007,20 +1203,114 @@ class EDAutopilot:
             final_z_pct = -1.0  # Behind
 
             # find the nav point within the compass box using the -behind template
-            navpt_image, (n_minVal, n_maxVal, n_minLoc, n_maxLoc), match = scr_reg.match_template_in_image_x3(compass_image, 'navpoint-behind')
+            navpt_image, (n_minVal, n_maxVal, n_minLoc, n_maxLoc), match = scr_reg.match_template_in_image_x3(compass_frame, 'navpoint-behind')
             n_pt = n_maxLoc
         else:
             final_z_pct = 1.0  # Ahead
 
+        # Refine the nav point location to sub-pixel, as a pixel of the compass is several degrees
+        n_pt_f = n_pt
+        if self.config['SubPixelAlign']:
+            n_pt_f = scr_reg.subpixel_peak(match, n_pt)
+
         # Continue calc
-        final_x_pct = 2*(((n_pt[0]-compass_x_min)/(compass_x_max-compass_x_min))-0.5)  # X as percent (-1.0 to 1.0, 0.0 in the center)
+        final_x_pct = 2*(((n_pt_f[0]-compass_x_min)/(compass_x_max-compass_x_min))-0.5)  # X as percent (-1.0 to 1.0, 0.0 in the center)
         final_x_pct = final_x_pct - self._nav_cor_x
         final_x_pct = max(min(final_x_pct, 1.0), -1.0)
 
-        final_y_pct = -2*(((n_pt[1]-compass_y_min)/(compass_y_max-compass_y_min))-0.5)  # Y as percent (-1.0 to 1.0, 0.0 in the center)
+        final_y_pct = -2*(((n_pt_f[1]-compass_y_min)/(compass_y_max-compass_y_min))-0.5)  # Y as percent (-1.0 to 1.0, 0.0 in the center)
         final_y_pct = final_y_pct - self._nav_cor_y
         final_y_pct = max(min(final_y_pct, 1.0), -1.0)
 
+        final_roll_deg, final_pit_deg, final_yaw_deg = self.calc_nav_angles(final_x_pct, final_y_pct, final_z_pct)
+
+        result = {'x': round(final_x_pct, 4), 'y': round(final_y_pct, 4), 'z': round(final_z_pct, 2),
+                  'roll': round(final_roll_deg, 2), 'pit': round(final_pit_deg, 2), 'yaw': round(final_yaw_deg, 2)}
+
+        # Draw box around region
+        if self.debug_overlay:
+            border = 10  # border to prevent the box from interfering with future matches
+            left = c_left + maxLoc[0]
+            top = c_top + maxLoc[1]
+            self.overlay.overlay_rect('compass', (left - border, top - border), (left + c_wid + border, top + c_hgt + border), (0, 255, 0), 2)
+            self.overlay.overlay_floating_text('compass', f'Match: {maxVal:5.4f}', left - border, top - border - 25, (0, 255, 0))
+            self.overlay.overlay_floating_text('compass_rpy', f'r: {round(final_roll_deg, 2)} p: {round(final_pit_deg, 2)} y: {round(final_yaw_deg, 2)}', left - border, top + c_hgt + border, (0, 255, 0))
+            self.overlay.overlay_paint()
+
+        if self.cv_view:
+            #icompass_image_d = cv2.cvtColor(compass_image_gray, cv2.COLOR_GRAY2RGB)
+            icompass_image_d = full_compass_image.copy()  # The region is a read only view of the screen frame
+            self.draw_match_rect(icompass_image_d, pt, (pt[0]+c_wid, pt[1]+c_hgt), (0, 0, 255), 2)
+            #cv2.rectangle(icompass_image_display, pt, (pt[0]+c_wid, pt[1]+c_hgt), (0, 0, 255), 2)
+            #self.draw_match_rect(compass_image, n_pt, (n_pt[0] + wid, n_pt[1] + hgt), (255,255,255), 2)
+            self.draw_match_rect(icompass_image_d, (pt[0]+n_pt[0]-pad, pt[1]+n_pt[1]-pad), (pt[0]+n_pt[0]+wid-pad, pt[1]+n_pt[1]+hgt-pad), (0, 255, 0), 1)
+            #cv2.rectangle(icompass_image_display, (pt[0]+n_pt[0]-pad, pt[1]+n_pt[1]-pad), (pt[0]+n_pt[0] + wid-pad, pt[1]+n_pt[1] + hgt-pad), (0, 0, 255), 2)
+
+            #   dim = (int(destination_width/3), int(destination_height/3))
+
+            #   img = cv2.resize(dst_image, dim, interpolation =cv2.INTER_AREA)
+            icompass_image_d = cv2.rectangle(icompass_image_d, (0, 0), (1000, 60), (0, 0, 0), -1)
+            cv2.putText(icompass_image_d, f'Compass: {maxVal:5.4f} > {scr_reg.compass_match_thresh:5.2f}', (1, 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+            cv2.putText(icompass_image_d, f'Nav Point: {n_maxVal:5.4f} > {scr_reg.navpoint_match_thresh:5.2f}', (1, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+            #cv2.putText(icompass_image_d, f'Result: {result}', (1, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+            cv2.putText(icompass_image_d, f'x: {final_x_pct:5.2f} y: {final_y_pct:5.2f} z: {final_z_pct:5.2f}', (1, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+            cv2.putText(icompass_image_d, f'r: {final_roll_deg:5.2f}deg p: {final_pit_deg:5.2f}deg y: {final_yaw_deg:5.2f}deg', (1, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+            self.cv_viewer.show('compass', icompass_image_d, self.cv_view_x - 400, self.cv_view_y + 600)
+
+        return result
+
+    def get_nav_offset_shape(self, scr_reg):
+        """ Determine the x,y offset from center of the compass of the nav point, finding the compass ring and the
+        nav point by shape (see CompassLocator) so no compass scale calibration is needed.
+        @return: As get_nav_offset(), or None if the compass or nav point is not found.
+        """
+        frame = self.scr.get_frame_region(scr_reg.reg['compass']['rect'])
+        compass = self.compass_locator.locate_compass(frame)
+        if compass is None:
+            return None
+        cx, cy, radius, score = compass
+
+        navpoint = self.compass_locator.locate_navpoint(frame, cx, cy, radius)
+        if navpoint is None:
+            return None
+        nx, ny, final_z_pct = navpoint
+
+        # The nav point centre moves up to the compass radius less its own radius from the centre
+        extent = radius * (1.0 - self.compass_locator.navpoint_radius_pct)
+        final_x_pct = (nx - cx) / extent  # X as percent (-1.0 to 1.0, 0.0 in the center)
+        final_x_pct = final_x_pct - self._nav_cor_x
+        final_x_pct = max(min(final_x_pct, 1.0), -1.0)
+
+        final_y_pct = -(ny - cy) / extent  # Y as percent (-1.0 to 1.0, 0.0 in the center)
+        final_y_pct = final_y_pct - self._nav_cor_y
+        final_y_pct = max(min(final_y_pct, 1.0), -1.0)
+
+        final_roll_deg, final_pit_deg, final_yaw_deg = self.calc_nav_angles(final_x_pct, final_y_pct, final_z_pct)
+
+        result = {'x': round(final_x_pct, 4), 'y': round(final_y_pct, 4), 'z': round(final_z_pct, 2),
+                  'roll': round(final_roll_deg, 2), 'pit': round(final_pit_deg, 2), 'yaw': round(final_yaw_deg, 2)}
+
+        # Draw circle around compass
+        if self.debug_overlay:
+            border = 10  # border to prevent the box from interfering with future matches
+            left = int(scr_reg.reg['compass']['rect'][0] + cx - radius)
+            top = int(scr_reg.reg['compass']['rect'][1] + cy - radius)
+            size = int(2 * radius)
+            self.overlay.overlay_rect('compass', (left - border, top - border), (left + size + border, top + size + border), (0, 255, 0), 2)
+            self.overlay.overlay_floating_text('compass', f'Ring: {score:5.4f}', left - border, top - border - 25, (0, 255, 0))
+            self.overlay.overlay_floating_text('compass_rpy', f'r: {round(final_roll_deg, 2)} p: {round(final_pit_deg, 2)} y: {round(final_yaw_deg, 2)}', left - border, top + size + border, (0, 255, 0))
+            self.overlay.overlay_paint()
+
+        return result
+
+    @staticmethod
+    def calc_nav_angles(final_x_pct: float, final_y_pct: float, final_z_pct: float) -> (float, float, float):
+        """ Convert the nav point position on the compass to angles.
+        @param final_x_pct: X as percent (-1.0 to 1.0, 0.0 in the center).
+        @param final_y_pct: Y as percent (-1.0 to 1.0, 0.0 in the center).
+        @param final_z_pct: 1.0 ahead, -1.0 behind.
+        @return: The roll, pitch and yaw in degrees.
+        """
         # Calc angle in degrees starting at 0 deg at 12 o'clock and increasing clockwise
         # so 3 o'clock is +90° and 9 o'clock is -90°.
         final_roll_deg = 0.0
@@ -1057,42 +1347,18 @@ class EDAutopilot:
             else:
                 final_yaw_deg = degrees(math.acos(yaw_pct)) - 270  # X in deg (-90.0 to 90.0, 0.0 in the center)
 
-        result = {'x': round(final_x_pct, 4), 'y': round(final_y_pct, 4), 'z': round(final_z_pct, 2),
-                  'roll': round(final_roll_deg, 2), 'pit': round(final_pit_deg, 2), 'yaw': round(final_yaw_deg, 2)}
-
-        # Draw box around region
-        if self.debug_overlay:
-            border = 10  # border to prevent the box from interfering with future matches
-            left = c_left + maxLoc[0]
-            top = c_top + maxLoc[1]
-            self.overlay.overlay_rect('compass', (left - border, top - border), (left + c_wid + border, top + c_hgt + border), (0, 255, 0), 2)
-            self.overlay.overlay_floating_text('compass', f'Match: {maxVal:5.4f}', left - border, top - border - 25, (0, 255, 0))
-            self.overlay.overlay_floating_text('compass_rpy', f'r: {round(final_roll_deg, 2)} p: {round(final_pit_deg, 2)} y: {round(final_yaw_deg, 2)}', left - border, top + c_hgt + border, (0, 255, 0))
-            self.overlay.overlay_paint()
-
-        if self.cv_view:
-            #icompass_image_d = cv2.cvtColor(compass_image_gray, cv2.COLOR_GRAY2RGB)
-            icompass_image_d = full_compass_image
-            self.draw_match_rect(icompass_image_d, pt, (pt[0]+c_wid, pt[1]+c_hgt), (0, 0, 255), 2)
-            #cv2.rectangle(icompass_image_display, pt, (pt[0]+c_wid, pt[1]+c_hgt), (0, 0, 255), 2)
-            #self.draw_match_rect(compass_image, n_pt, (n_pt[0] + wid, n_pt[1] + hgt), (255,255,255), 2)
-            self.draw_match_rect(icompass_image_d, (pt[0]+n_pt[0]-pad, pt[1]+n_pt[1]-pad), (pt[0]+n_pt[0]+wid-pad, pt[1]+n_pt[1]+hgt-pad), (0, 255, 0), 1)
-            #cv2.rectangle(icompass_image_display, (pt[0]+n_pt[0]-pad, pt[1]+n_pt[1]-pad), (pt[0]+n_pt[0] + wid-pad, pt[1]+n_pt[1] + hgt-pad), (0, 0, 255), 2)
-
-            #   dim = (int(destination_width/3), int(destination_height/3))
-
-            #   img = cv2.resize(dst_image, dim, interpolation =cv2.INTER_AREA)
-            icompass_image_d = cv2.rectangle(icompass_image_d, (0, 0), (1000, 60), (0, 0, 0), -1)
-            cv2.putText(icompass_image_d, f'Compass: {maxVal:5.4f} > {scr_reg.compass_match_thresh:5.2f}', (1, 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.putText(icompass_image_d, f'Nav Point: {n_maxVal:5.4f} > {scr_reg.navpoint_match_thresh:5.2f}', (1, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-            #cv2.putText(icompass_image_d, f'Result: {result}', (1, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.putText(icompass_image_d, f'x: {final_x_pct:5.2f} y: {final_y_pct:5.2f} z: {final_z_pct:5.2f}', (1, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.putText(icompass_image_d, f'r: {final_roll_deg:5.2f}deg p: {final_pit_deg:5.2f}deg y: {final_yaw_deg:5.2f}deg', (1, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.imshow('compass', icompass_image_d)
-            cv2.moveWindow('compass', self.cv_view_x - 400, self.cv_view_y + 600)
-            cv2.waitKey(30)
+        return final_roll_deg, final_pit_deg, final_yaw_deg
 
-        return result
+    @staticmethod
+    def match_filtered_scale(image, templ_image) -> float:
+        """ Match a template in a filtered (single channel) region image.
+        @return: The best match value, or -1.0 if the template is larger than the image.
+        """
+        if templ_image.shape[0] > image.shape[0] or templ_image.shape[1] > image.shape[1]:
+            return -1.0
+        match = cv2.matchTemplate(image, templ_image, cv2.TM_CCOEFF_NORMED)
+        (minVal, maxVal, minLoc, maxLoc) = cv2.minMaxLoc(match)
+        return maxVal
 
     def get_target_offset(self, scr_reg, disable_auto_cal: bool = False):
         """ Determine how far off we are from the target being in the middle of the screen
@@ -1115,8 +1381,10 @@ class EDAutopilot:
         maxLoc = 0
         maxVal = 0
         # for i in range(2):
-        dst_image, (minVal, maxVal, minLoc, maxLoc), match = scr_reg.match_template_in_region('target', 'target')
-        dst_image_occ, (minVal, maxVal_occ, minLoc, maxLoc_occ), match_occ = scr_reg.match_template_in_region('target_occluded', 'target_occluded', inv_col=False)
+        # The target and target occluded regions share the rect, so are matched from one grab and HSV conversion
+        ((dst_image, (minVal, maxVal, minLoc, maxLoc), match),
+         (dst_image_occ, (minVal, maxVal_occ, minLoc, maxLoc_occ), match_occ)) = scr_reg.match_templates_in_region(
+            ['target', 'target_occluded'], ['target', 'target_occluded'], [True, False])
         #
         #     # need > x in the match to say we do have a destination
         #     if maxVal < (scr_reg.target_thresh / 2):
@@ -1128,6 +1396,15 @@ class EDAutopilot:
         #             self.ap_ckb('log', f'Target Offset below threshold: {maxVal:5.4f} with scale: {self.scr.scaleX:5.4f}')
         #             self.quick_calibrate_target()
 
+        # Track the target scale while the target is (likely) up, checking the neighbouring scales if the match drops
+        if not disable_auto_cal and maxVal > maxVal_occ and maxVal >= scr_reg.target_thresh / 2:
+            if self.target_tracker.update(maxVal, lambda templ_image: self.match_filtered_scale(dst_image, templ_image)):
+                self.target_scale = self.target_tracker.scale
+                self.templ.reload_templates(self.scr.scaleX, self.scr.scaleY, self.compass_scale, self.target_scale)
+                ((dst_image, (minVal, maxVal, minLoc, maxLoc), match),
+                 (dst_image_occ, (minVal, maxVal_occ, minLoc, maxLoc_occ), match_occ)) = scr_reg.match_templates_in_region(
+                    ['target', 'target_occluded'], ['target', 'target_occluded'], [True, False])
+
         pt = maxLoc
         pt_occ = maxLoc_occ
 
@@ -1141,6 +1418,14 @@ class EDAutopilot:
             sel_loc = maxLoc_occ
             occluded = True
 
+        # Refine the target location to sub-pixel
+        sel_pt_f = sel_pt
+        if self.config['SubPixelAlign']:
+            if occluded:
+                sel_pt_f = scr_reg.refine_match_loc(dst_image_occ, scr_reg.templates.template['target_occluded']['image'], sel_pt)
+            else:
+                sel_pt_f = scr_reg.refine_match_loc(dst_image, scr_reg.templates.template['target']['image'], sel_pt)
+
         destination_left = scr_reg.reg['target']['rect'][0]
         destination_top = scr_reg.reg['target']['rect'][1]
         destination_width = scr_reg.reg['target']['width']
@@ -1153,11 +1438,11 @@ class EDAutopilot:
         target_y_max = self.scr.screen_height - height
 
         # X as percent (-1.0 to 1.0, 0.0 in the center)
-        final_x_pct = 2.0*(((sel_pt[0]+destination_left) / target_x_max) - 0.5)
+        final_x_pct = 2.0*(((sel_pt_f[0]+destination_left) / target_x_max) - 0.5)
         final_x_pct = 100 * max(min(final_x_pct, 1.0), -1.0)
 
         # Y as percent (-1.0 to 1.0, 0.0 in the center)
-        final_y_pct = -2.0*(((sel_pt[1]+destination_top) / target_y_max) - 0.5)
+        final_y_pct = -2.0*(((sel_pt_f[1]+destination_top) / target_y_max) - 0.5)
         final_y_pct = 100 * max(min(final_y_pct, 1.0), -1.0)
 
         final_yaw_deg = final_x_pct / 100 * (self.hor_fov / 2)  # X in deg (-90.0 to 90.0, 0.0 in the center)
@@ -1194,17 +1479,14 @@ class EDAutopilot:
                 cv2.putText(img, f'{maxVal:5.4f} > {scr_reg.target_thresh:5.2f}', (1, 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
                 cv2.putText(img, f'p: {round(final_pit_deg, 4)} y: {round(final_yaw_deg, 4)}',
                             (1, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-                cv2.imshow('target', img)
+                self.cv_viewer.show('target', img)
                 #cv2.moveWindow('target', self.cv_view_x, self.cv_view_y+425)
             except Exception as e:
                 print("exception in getdest: "+str(e))
-            cv2.waitKey(30)
 
         # must be > x to have solid hit, otherwise we are facing wrong way (empty circle)
         if maxVal < scr_reg.target_thresh and maxVal_occ < scr_reg.target_occluded_thresh:
-            if self.debug_images:
-                f = get_timestamped_filename('[get_target_offset] no_target_match', '', '.png')
-                cv2.imwrite(f'{self.debug_image_folder}/{f}', dst_image)
+            self.debug_sink.write('target', '[get_target_offset] no_target_match', dst_image, timestamp=True)
             result = None
         else:
             result = {'roll': round(final_roll_deg, 2), 'pit': round(final_pit_deg, 2), 'yaw': round(final_yaw_deg, 2), 'occ': occluded}
@@ -1272,9 +1554,7 @@ class EDAutopilot:
             self.draw_match_rect(dis_image, pt, (pt[0] + width, pt[1] + height), (0,255,0), 2)
             dis_image = cv2.rectangle(dis_image, (0, 0), (1000, 25), (0, 0, 0), -1)
             cv2.putText(dis_image, f'{maxVal:5.4f} > {scr_reg.disengage_thresh}', (1, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.imshow('sc_disengage_label_up', dis_image)
-            cv2.moveWindow('sc_disengage_label_up', self.cv_view_x-460,self.cv_view_y+575)
-            cv2.waitKey(1)
+            self.cv_viewer.show('sc_disengage_label_up', dis_image, self.cv_view_x-460, self.cv_view_y+575)
 
         if maxVal > scr_reg.disengage_thresh:
             return True
@@ -1303,9 +1583,7 @@ class EDAutopilot:
             self.draw_match_rect(dis_image, pt, (pt[0] + width, pt[1] + height), (0,255,0), 2)
             dis_image = cv2.rectangle(dis_image, (0, 0), (1000, 25), (0, 0, 0), -1)
             cv2.putText(dis_image, f'{maxVal:5.4f} > {scr_reg.disengage_thresh}', (1, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.imshow('disengage', dis_image)
-            cv2.moveWindow('disengage', self.cv_view_x-460,self.cv_view_y+575)
-            cv2.waitKey(1)
+            self.cv_viewer.show('disengage', dis_image, self.cv_view_x-460, self.cv_view_y+575)
 
         if maxVal > scr_reg.disengage_thresh:
             # logger.info("'PRESS [] TO DISENGAGE' detected. Disengaging Supercruise")
@@ -1316,28 +1594,74 @@ class EDAutopilot:
 
     def sc_disengage_ocr(self, scr_reg) -> bool:
         """ look for the "SUPERCRUISE OVERCHARGE ACTIVE" text using OCR, if in this region then return true. """
-        image = self.scr.get_screen_region(scr_reg.reg['disengage']['rect'])
-        # TODO delete this line when COLOR_RGB2BGR is removed from get_screen()
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        mask = scr_reg.capture_region_filtered(self.scr, 'disengage')
-        masked_image = cv2.bitwise_and(image, image, mask=mask)
-        image = masked_image
+        image = self.sc_disengage_image(scr_reg)
 
-        start_time = None
-        if self.debug_overlay:
-            start_time = time.time()
+        start_time = time.time()
 
         # OCR the selected item
+        ocr_textlist = self.ocr.image_simple_ocr(image, 'disengage')
+        return self.sc_disengage_check(scr_reg, image, ocr_textlist, time.time() - start_time)
+
+    def sc_disengage_ocr_poll(self, scr_reg, timeout: float = 0.0) -> bool | None:
+        """ As sc_disengage_ocr, but the OCR runs in the background (see OCR.submit). The first call starts the
+        OCR, later calls return the result once done and start the next.
+        @param timeout: Time in seconds to wait for the result.
+        @return: True or False when the OCR is done, None if it is still running.
+        """
+        if self._disengage_future is None:
+            self._disengage_image = self.sc_disengage_image(scr_reg)
+            self._disengage_start = time.time()
+            self._disengage_future = self.ocr.submit(self._disengage_image, 'simple', PRIORITY_BACKGROUND)
+        future = self._disengage_future
+        image = self._disengage_image
+        start_time = self._disengage_start
+
+        try:
+            ocr_textlist = future.result(timeout)
+        except (FutureTimeoutError, CancelledError):
+            return None
+        except Exception as e:
+            logger.error(f"Disengage OCR failed: {e}")
+            ocr_textlist = None
+
+        if future is not self._disengage_future:
+            # Monitoring was stopped while the OCR ran, the next call starts a new one
+            return None
+        self._disengage_future = None
+        self._disengage_image = None
+        if start_time < self._sco_monitor_start:
+            # The frame was taken before the current monitoring started (i.e. before the last drop)
+            return None
+        return self.sc_disengage_check(scr_reg, image, ocr_textlist, time.time() - start_time)
+
+    def sc_disengage_ocr_cancel(self):
+        """ Cancels the background disengage OCR of sc_disengage_ocr_poll, if any. """
+        future = self._disengage_future
+        self._disengage_future = None
+        self._disengage_image = None
+        if future is not None:
+            future.cancel()
+
+    def sc_disengage_image(self, scr_reg):
+        """ Returns the disengage region masked by its colour filter, ready to OCR. """
+        # The BGR image and the mask filter share the region of the current frame
+        image = self.scr.get_frame_region(scr_reg.reg['disengage']['rect']).get('BGR')
+        mask = scr_reg.capture_region_filtered(self.scr, 'disengage')
+        masked_image = cv2.bitwise_and(image, image, mask=mask)
+        return masked_image
+
+    def sc_disengage_check(self, scr_reg, image, ocr_textlist, elapsed_time: float) -> bool:
+        """ Checks the OCR of the disengage region for the disengage text and shows the result.
+        @return: True if the disengage text was found.
+        """
         sim_match = 0.35  # Similarity match 0.0 - 1.0 for 0% - 100%)
         sim = 0.0
-        ocr_textlist = self.ocr.image_simple_ocr(image, 'disengage')
         if ocr_textlist is not None:
-            sim = self.ocr.string_similarity(self.locale["PRESS_TO_DISENGAGE_MSG"], str(ocr_textlist))
+            sim = self.ocr.string_similarity(self.locale["PRESS_TO_DISENGAGE_MSG"], ocr_textlist)
             logger.info(f"Disengage similarity with {str(ocr_textlist)} is {sim}")
 
         # Draw box around region
         if self.debug_overlay:
-            elapsed_time = time.time() - start_time
             abs_rect = scr_reg.reg['disengage']['rect']
             self.overlay.overlay_rect1('sc_disengage_active', abs_rect, (0, 255, 0), 2)
             self.overlay.overlay_floating_text('sc_disengage_active', f'{str(ocr_textlist)} ({round(elapsed_time, 4)} Secs)', abs_rect[0], abs_rect[1] - 25, (0, 255, 0))
@@ -1347,9 +1671,7 @@ class EDAutopilot:
             image = cv2.rectangle(image, (0, 0), (1000, 30), (0, 0, 0), -1)
             cv2.putText(image, f'Text: {str(ocr_textlist)}', (1, 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
             cv2.putText(image, f'Similarity: {sim:5.4f} > {sim_match}', (1, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
-            cv2.imshow('disengage2', image)
-            cv2.moveWindow('disengage2', self.cv_view_x - 460, self.cv_view_y + 650)
-            cv2.waitKey(30)
+            self.cv_viewer.show('disengage2', image, self.cv_view_x - 460, self.cv_view_y + 650)
 
         if sim > sim_match:
             # logger.info("'PRESS [] TO DISENGAGE' detected. Disengaging Supercruise")
@@ -1361,6 +1683,8 @@ class EDAutopilot:
     def start_sco_monitoring(self):
         """ Start Supercruise Overcharge Monitoring. This starts a parallel thread used to detect SCO
         until stop_sco_monitoring if called. """
+        self.sc_disengage_ocr_cancel()
+        self._sco_monitor_start = time.time()
         self._sc_sco_active_loop_enable = True
 
         if self._sc_sco_active_loop_thread is None or not self._sc_sco_active_loop_thread.is_alive():
@@ -1370,6 +1694,7 @@ class EDAutopilot:
     def stop_sco_monitoring(self):
         """ Stop Supercruise Overcharge Monitoring. """
         self._sc_sco_active_loop_enable = False
+        self.sc_disengage_ocr_cancel()
         self._sc_disengage_active = False
 
     def _sc_sco_active_loop(self):
@@ -1410,7 +1735,11 @@ class EDAutopilot:
                 # self._sc_disengage_active = self.sc_disengage(self.scrReg)
 
                 # if self.sc_disengage_label_up(scr_reg):
-                self._sc_disengage_active = self.sc_disengage_ocr(self.scrReg)
+                # The OCR runs in the background, wait for it up to the end of this loop, else check next loop
+                remaining = max(1.0 - (time.time() - start_time), 0.0)
+                disengage = self.sc_disengage_ocr_poll(self.scrReg, remaining)
+                if disengage is not None and self._sc_sco_active_loop_enable:
+                    self._sc_disengage_active = disengage
             else:
                 self._sc_disengage_active = False
 
@@ -1626,7 +1955,8 @@ class EDAutopilot:
                         else:
                             # bottom left quad, then roll right
                             self.rotateRight(180 + off['roll'])
-                        sleep(0.5)
+                        # Wait for the picture to settle and get a frame taken after the roll
+                        self.scr.grab_frame_after(0.5)
                         off = self.get_nav_offset(scr_reg)
                     else:
                         break
@@ -1648,7 +1978,7 @@ class EDAutopilot:
                         self.pitchDown(abs(off['pit']))
                     else:
                         self.pitchUp(abs(off['pit']))
-                    sleep(0.5)
+                    self.scr.grab_frame_after(0.5)
                     off = self.get_nav_offset(scr_reg)
 
                 else:
@@ -1671,7 +2001,7 @@ class EDAutopilot:
                         self.yawLeft(abs(off['yaw']))
                     else:
                         self.yawRight(abs(off['yaw']))
-                    sleep(0.5)
+                    self.scr.grab_frame_after(0.5)
                     off = self.get_nav_offset(scr_reg)
                 else:
                     break
@@ -1695,9 +2025,12 @@ class EDAutopilot:
         self.sun_avoid(scr_reg)
 
         res = self.compass_align(scr_reg)
-        # Quick calibrate the compass
-        if res:
+        # Quick calibrate the compass if it has not been calibrated for this ship, resolution and FOV. After that
+        # the compass scale tracker keeps it calibrated from the compass matches.
+        if res and not self.compass_tracker.calibrated and self.config['CompassLocator'] != 'shape':
             self.quick_calibrate_compass()
+        elif self.compass_tracker.changed:
+            self.save_scale_calibration()
         self.keys.send('SetSpeed100')
 
         self.ap_ckb('log+vce', 'Target Align')
@@ -1736,7 +2069,8 @@ class EDAutopilot:
 
         # Try to get the target 5 times before quiting
         for i in range(5):
-            # Check Target and Compass
+            # Check Target and Compass, both from the same screen grab
+            self.scr.grab_frame()
             nav_off = self.get_nav_offset(scr_reg)
             tar_off = self.get_target_offset(scr_reg)
             if tar_off:
@@ -1819,10 +2153,9 @@ class EDAutopilot:
                 else:
                     self.yawRight(self.target_align_inertia_yaw_factor * abs(off['yaw']))
 
-            # Wait for ship to finish moving and picture to stabilize
-            sleep(0.25)
-
-            # Check Target and Compass
+            # Wait for ship to finish moving and picture to stabilize, then check Target and Compass,
+            # both from the same screen grab taken after the move
+            self.scr.grab_frame_after(0.25)
             nav_off = self.get_nav_offset(scr_reg)  # For cv view only
             tar_off = self.get_target_offset(scr_reg)
             if tar_off:
@@ -2696,8 +3029,7 @@ class EDAutopilot:
             self.cv_view_x = x
             self.cv_view_y = y
         else:
-            cv2.destroyAllWindows()
-            cv2.waitKey(50)
+            self.cv_viewer.close_all()
 
     def set_randomness(self, enable=False):
         self.config["EnableRandomness"] = enable
@@ -2743,6 +3075,12 @@ class EDAutopilot:
     # quit() is important to call to clean up, if we don't terminate the threads we created the AP will hang on exit
     # have then then kill python exec
     def quit(self):
+        self.stop_recording()
+        self.debug_sink.stop()
+        self.cv_viewer.stop()
+        if self._ocr:
+            self._ocr.stop()
+        self.scr.stop_capture()
         if self.vce != None:
             self.vce.quit()
         if self.overlay != None:
@@ -2933,6 +3271,7 @@ class EDAutopilot:
 
                         # Load ship configuration with proper hierarchy
                         self.load_ship_configuration(ship)
+                        self.load_scale_calibration(ship)
 
                         # Update GUI with ship config
                         self.ap_ckb('update_ship_cfg')
@@ -2941,7 +3280,6 @@ class EDAutopilot:
                         self.templ.reload_templates(self.scr.scaleX, self.scr.scaleY, self.compass_scale, self.target_scale)
 
             self.update_overlay()
-            cv2.waitKey(10)
             sleep(1)
 
     def ship_tst_pitch(self, angle: float):
@@ -1,4 +1,5 @@
 import sys
+from collections import OrderedDict
 from os.path import abspath, getmtime, isfile, join, dirname
 
 import cv2
@@ -30,34 +31,90 @@ class Image_Templates:
                           'sirius_atmos' : {'image': None, 'width': 1, 'height': 1}                                            
                         }
  
-        # load the templates and scale them.  Default templates assumed 3440x1440 screen resolution
+        # The template files by template name. Default templates assumed 3440x1440 screen resolution
+        self.template_files = {'elw': "templates/elw-template.png",
+                               'elw_sig': "templates/elw-sig-template.png",
+                               'navpoint': "templates/navpoint.png",
+                               'navpoint-behind': "templates/navpoint-behind.png",
+                               'compass': "templates/compass.png",
+                               'target': "templates/destination.png",
+                               'target_occluded': "templates/target_occluded.png",
+                               'disengage': "templates/sc-disengage.png",
+                               'missions': "templates/completed-missions.png",
+                               'dest_sirius': "templates/dest-sirius-atmos-HL.png",
+                               'robigo_mines': "templates/robigo-mines-selected.png",
+                               'sirius_atmos': "templates/sirius-atmos-selected.png",
+                               }
+
+        # The original (unscaled) images are read from disk once. The scaled images are kept in an LRU cache,
+        # so calibration sweeps and ship changes do not read or resize the files again.
+        self._originals = {}  # Original images by file name
+        self._scaled = OrderedDict()  # Scaled templates by (file name, scale x, scale y), least recently used first
+        self._scaled_bytes = 0
+        self.max_cache_bytes = 32 * 1024 * 1024  # Memory limit for the scaled templates
+
+        # load the templates and scale them.
         self.reload_templates(scale_x, scale_y, compass_scale, target_scale)
-       
+
     def load_template(self, file_name, scale_x, scale_y):
         """ Load the template image in color. If we need grey scale for matching, we can apply that later as needed.
         Resize the image, as the templates are based on 3440x1440 resolution, so scale to current screen resolution
-         return image and size info. """
-        template = cv2.imread(self.resource_path(file_name), cv2.IMREAD_GRAYSCALE)
-        #logger.debug("File:"+self.resource_path(file_name)+" template:"+str(template))
-        template = cv2.resize(template, (0, 0), fx=scale_x, fy=scale_y)
+         return image and size info.
+        The image is read from disk on first use only, the scaled image is cached (treat it as read only). """
+        key = (file_name, round(scale_x, 4), round(scale_y, 4))
+        templ = self._scaled.get(key)
+        if templ is not None:
+            self._scaled.move_to_end(key)
+            return templ
+
+        original = self._originals.get(file_name)
+        if original is None:
+            original = cv2.imread(self.resource_path(file_name), cv2.IMREAD_GRAYSCALE)
+            #logger.debug("File:"+self.resource_path(file_name)+" template:"+str(original))
+            self._originals[file_name] = original
+
+        template = cv2.resize(original, (0, 0), fx=scale_x, fy=scale_y)
+        template.flags.writeable = False
         width, height = template.shape[::-1]
-        return {'image': template, 'width': width, 'height': height}
+        templ = {'image': template, 'width': width, 'height': height}
+
+        # Add to the cache, removing the least recently used templates if over the memory limit
+        self._scaled[key] = templ
+        self._scaled_bytes = self._scaled_bytes + template.nbytes
+        while self._scaled_bytes > self.max_cache_bytes and len(self._scaled) > 1:
+            old_key, old_templ = self._scaled.popitem(last=False)
+            self._scaled_bytes = self._scaled_bytes - old_templ['image'].nbytes
+        return templ
+
+    def get_template(self, name: str, scale_x: float, scale_y: float = None):
+        """ Get a template scaled to the given scale, without reading from disk if already loaded.
+        @param name: The template name (i.e. 'compass').
+        @param scale_x: The X scale.
+        @param scale_y: The Y scale. If None, the X scale is used.
+        @return: The template as {'image', 'width', 'height'}.
+        """
+        if scale_y is None:
+            scale_y = scale_x
+        return self.load_template(self.template_files[name], scale_x, scale_y)
+
+    def set_template_scale(self, name: str, scale_x: float, scale_y: float = None):
+        """ Set a single template to the given scale (i.e. when calibrating), leaving the others unchanged. """
+        self.template[name] = self.get_template(name, scale_x, scale_y)
 
     def reload_templates(self, scale_x, scale_y, compass_scale: float, target_scale: float):
         """ Load the full set of image templates. """
-        self.template['elw']       = self.load_template("templates/elw-template.png", scale_x, scale_y)
-        self.template['elw_sig']   = self.load_template("templates/elw-sig-template.png", scale_x, scale_y)
-        self.template['navpoint']  = self.load_template("templates/navpoint.png", compass_scale, compass_scale)
-        self.template['navpoint-behind']  = self.load_template("templates/navpoint-behind.png", compass_scale, compass_scale)
-        self.template['compass']   = self.load_template("templates/compass.png", compass_scale, compass_scale)
-        self.template['target']    = self.load_template("templates/destination.png", target_scale, target_scale)
-        self.template['target_occluded']    = self.load_template("templates/target_occluded.png", target_scale, target_scale)
-        self.template['disengage'] = self.load_template("templates/sc-disengage.png", scale_x, scale_y)
-        self.template['missions']  = self.load_template("templates/completed-missions.png", scale_x, scale_y)
-        self.template['dest_sirius'] = self.load_template("templates/dest-sirius-atmos-HL.png", scale_x, scale_y)
-        self.template['robigo_mines']  = self.load_template("templates/robigo-mines-selected.png", scale_x, scale_y)
-        self.template['sirius_atmos']  = self.load_template("templates/sirius-atmos-selected.png", scale_x, scale_y)
-        
+        self.template['elw']       = self.get_template('elw', scale_x, scale_y)
+        self.template['elw_sig']   = self.get_template('elw_sig', scale_x, scale_y)
+        self.template['navpoint']  = self.get_template('navpoint', compass_scale, compass_scale)
+        self.template['navpoint-behind']  = self.get_template('navpoint-behind', compass_scale, compass_scale)
+        self.template['compass']   = self.get_template('compass', compass_scale, compass_scale)
+        self.template['target']    = self.get_template('target', target_scale, target_scale)
+        self.template['target_occluded']    = self.get_template('target_occluded', target_scale, target_scale)
+        self.template['disengage'] = self.get_template('disengage', scale_x, scale_y)
+        self.template['missions']  = self.get_template('missions', scale_x, scale_y)
+        self.template['dest_sirius'] = self.get_template('dest_sirius', scale_x, scale_y)
+        self.template['robigo_mines']  = self.get_template('robigo_mines', scale_x, scale_y)
+        self.template['sirius_atmos']  = self.get_template('sirius_atmos', scale_x, scale_y)
 
     def resource_path(self,relative_path):
         """ Get absolute path to resource, works for dev and for PyInstaller """
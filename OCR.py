@@ -1,18 +1,23 @@
 from __future__ import annotations
+import threading
 import time
+from concurrent.futures import Future
 from datetime import datetime
 
 import cv2
 import numpy as np
 from cv2.typing import MatLike
-from paddleocr import PaddleOCR
-from strsimpy import SorensenDice
-from strsimpy.jaro_winkler import JaroWinkler
-from strsimpy.normalized_levenshtein import NormalizedLevenshtein
+from paddleocr import PaddleOCR, TextRecognition
+from DebugSink import DEBUG_STEPS
 from EDlogger import logger
 from tkinter import messagebox
 import tkinter as tk
 
+from OCR_Cache import OCRCache, image_fingerprint
+from OCR_Matcher import TextMatcher, locale_labels, text_similarity
+from OCR_Service import OCRService, PRIORITY_BACKGROUND, PRIORITY_CONTROL
+from OCR_Worker import PADDLEOCR_ARGS, rec_textlist, run_lines, run_rec_batch, run_simple_batch, simple_textlist
+from Screen_Frame import as_frame
 from Screen_Regions import Quad
 
 """
@@ -29,58 +34,99 @@ class OCR:
     def __init__(self, ed_ap, screen):
         self.ap = ed_ap
         self.screen = screen
-        self.paddleocr = PaddleOCR(
-            use_doc_orientation_classify=False,
-            use_doc_unwarping=False,
-            use_textline_orientation=False)  # text detection + text recognition
-        # Class for text similarity metrics
-        self.jarowinkler = JaroWinkler()
-        self.sorensendice = SorensenDice()
-        self.normalized_levenshtein = NormalizedLevenshtein()
+        self._paddleocr = None  # text detection + text recognition, created on first use
+        self._infer_lock = threading.Lock()  # The models are used from the AP thread and the service threads
+        self._matchers = {}  # Fuzzy matchers by vocabulary name
+        # Results of recent OCR calls by image hash, so unchanged UI is not OCR'd again
+        self.cache = OCRCache(ed_ap.config['OCRCacheSize'], ed_ap.config['OCRCacheTTL'])
+        # Recognition only model for single lines of text (i.e. a highlighted item), created on first use.
+        # The same model as the PaddleOCR pipeline recognition stage.
+        self.rec_only = ed_ap.config['OCRRecognitionOnly']
+        self.rec_model_name = "PP-OCRv5_server_rec"
+        self.rec_min_score = 0.5  # Below this confidence the full pipeline is used instead
+        self._text_recognition = None
+        # Runs submitted requests in the background, on worker processes holding their own models if enabled
+        self.out_of_process = ed_ap.config['OCRService']
+        self.service = OCRService(ed_ap.config['OCRServiceWorkers'], self.rec_model_name,
+                                  None if self.out_of_process else self._run_request)
+        self.service.start()
+
+    @property
+    def paddleocr(self) -> PaddleOCR:
+        """ Load the PaddleOCR pipeline when needed. """
+        if self._paddleocr is None:
+            self._paddleocr = PaddleOCR(**PADDLEOCR_ARGS)
+        return self._paddleocr
+
+    def stop(self):
+        """ Stops the OCR service workers. """
+        self.service.stop()
+
+    def warm_up(self) -> float:
+        """ Loads the models and runs a first inference on a dummy image, so the first real OCR call does not pay
+        for the model load and warm up. If the service runs out of process, the workers are warmed up instead.
+        @return: The time taken in seconds.
+        """
+        start = time.perf_counter()
+        image = np.zeros((48, 320, 3), dtype=np.uint8)
+        cv2.putText(image, "WARM UP", (10, 36), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+
+        if self.out_of_process:
+            self.service.submit(image, 'simple', PRIORITY_BACKGROUND).result()
+            if self.rec_only:
+                self.service.submit(image, 'rec', PRIORITY_BACKGROUND).result()
+        else:
+            with self._infer_lock:
+                self.paddleocr.predict(image)
+                if self.rec_only:
+                    self.text_recognition.predict(image, batch_size=1)
+        return time.perf_counter() - start
 
     def string_similarity(self, s1: str, s2: str) -> float:
-        """ Performs a string similarity check and returns the result.
+        """ Performs a string similarity check and returns the result. The strings (or OCR text lists) are
+        normalised first, see OCR_Matcher.normalise_text.
         @param s1: The first string to compare.
         @param s2: The second string to compare.
         @return: The similarity from 0.0 (no match) to 1.0 (identical).
         """
-        s1_new = s1.replace("['",  "")
-        s1_new = s1_new.replace("']",  "")
-        s1_new = s1_new.replace('["',  "")
-        s1_new = s1_new.replace('"]',  "")
-        s1_new = s1_new.replace("', '",  "")
-        s1_new = s1_new.replace("<",  "")
-        s1_new = s1_new.replace(">",  "")
-        s1_new = s1_new.replace(" ",  "")
-
-        s2_new = s2.replace("['",  "")
-        s2_new = s2_new.replace("']",  "")
-        s2_new = s2_new.replace('["',  "")
-        s2_new = s2_new.replace('"]',  "")
-        s2_new = s2_new.replace("', '",  "")
-        s2_new = s2_new.replace("<",  "")
-        s2_new = s2_new.replace(">",  "")
-        s2_new = s2_new.replace(" ",  "")
-
-        # return self.jarowinkler.similarity(s1, s2)
-        return self.normalized_levenshtein.similarity(s1_new, s2_new)
-        # return self.sorensendice.similarity(s1_new, s2_new)
+        return text_similarity(s1, s2)
+
+    def matcher(self, vocabulary: str) -> TextMatcher:
+        """ Returns the fuzzy matcher of a vocabulary, to find the best match for OCR text in one lookup.
+        The matcher is built on first use.
+        @param vocabulary: 'locale' for the labels of all languages.
+        """
+        if vocabulary not in self._matchers:
+            if vocabulary == 'locale':
+                self._matchers[vocabulary] = TextMatcher(locale_labels())
+            else:
+                raise ValueError(f"Unknown vocabulary '{vocabulary}'.")
+        return self._matchers[vocabulary]
 
     def image_ocr(self, image, name = ''):
         """ Perform OCR with no filtering. Returns the full OCR data and a simplified list of strings.
         This routine is slower than the simplified OCR.
         @param name:
-        @param image: The image to check.
+        @param image: The image (or Frame) to check.
 
         'ocr_data' is returned in the following format, or (None, None):
         [[[[[86.0, 8.0], [208.0, 8.0], [208.0, 34.0], [86.0, 34.0]], ('ROBIGO 1 A', 0.9815958738327026)]]]
         'ocr_textlist' is returned in the following format, or None:
         ['DESTINATION', 'SIRIUS ATMOSPHERICS']
         """
+        # Return the last result if the image has not changed
+        fingerprint = None
+        if self.cache.enabled and image is not None:
+            fingerprint = image_fingerprint(image)
+            cached = self.cache.get('full', fingerprint)
+            if cached is not None:
+                return cached[0], list(cached[1])
+
         # Remove Alpha channel if it exists
-        image2 = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        image2 = as_frame(image).get('BGR')
         try:
-            ocr_data = self.paddleocr.predict(image2)
+            with self._infer_lock:
+                ocr_data = self.paddleocr.predict(image2)
 
             if ocr_data is None:
                 return None, None
@@ -101,6 +147,8 @@ class OCR:
 
                 # print(f"image_simple_ocr: {ocr_textlist}")
                 # logger.info(f"image_simple_ocr: {ocr_textlist}")
+                if fingerprint is not None:
+                    self.cache.put('full', fingerprint, (ocr_data, list(ocr_textlist)))
                 return ocr_data, ocr_textlist
 
         except Exception as e:
@@ -112,54 +160,288 @@ class OCR:
         This routine is faster than the function that returns the full data. Generally good when you
         expect to only return one or two lines of text.
         @param name:
-        @param image: The image to check.
+        @param image: The image (or Frame) to check.
         'ocr_textlist' is returned in the following format, or None:
         ['DESTINATION', 'SIRIUS ATMOSPHERICS']
         """
         if image is None:
             return None
 
-        # start_time = time.time()
+        # Return the last result if the image has not changed
+        fingerprint = None
+        if self.cache.enabled:
+            fingerprint = image_fingerprint(image)
+            cached = self.cache.get('simple', fingerprint)
+            if cached is not None:
+                return list(cached)
 
         # Remove Alpha channel if it exists
-        image2 = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        image2 = as_frame(image).get('BGR')
         try:
-            ocr_data = self.paddleocr.predict(image2)
+            if self.out_of_process:
+                ocr_textlist = self.service.submit(image2, 'simple', PRIORITY_CONTROL).result()
+            else:
+                ocr_textlist = self._simple_ocr(image2, name)
 
-            # elapsed_time = time.time() - start_time
-            # print(f"OCR took {elapsed_time} secs")
+            if ocr_textlist is not None and fingerprint is not None:
+                self.cache.put('simple', fingerprint, list(ocr_textlist))
+            return ocr_textlist
 
-            if ocr_data is None:
-                return None
+        except Exception as e:
+            logger.error(f"OCR failed: {e}")
+            return None
+
+    def _simple_ocr(self, image, name='') -> list[str] | None:
+        """ Runs the PaddleOCR pipeline on a BGR image in this process.
+        Returns the simplified list of strings, or None. """
+        # start_time = time.time()
+        with self._infer_lock:
+            ocr_data = self.paddleocr.predict(image)
+
+        # elapsed_time = time.time() - start_time
+        # print(f"OCR took {elapsed_time} secs")
+
+        # Debug - places all detected data to 'output' folder
+        if self.ap.debug_ocr and ocr_data is not None:
+            for res in ocr_data:
+                if res is not None:
+                    res.save_to_img(f"./ocr_output/{name}")
+                    res.save_to_json(f"./ocr_output/{name}")
+
+        return simple_textlist(ocr_data)
+
+    @property
+    def text_recognition(self) -> TextRecognition:
+        """ Load the recognition only model when needed. """
+        if self._text_recognition is None:
+            self._text_recognition = TextRecognition(model_name=self.rec_model_name)
+        return self._text_recognition
+
+    def image_rec_ocr(self, image, name='') -> (list[str] | None, float):
+        """ Perform recognition only OCR of a single line of text that has already been isolated (i.e. by
+        get_highlighted_item_in_image). Skips the text detection stage of the full pipeline.
+        @param name:
+        @param image: The image (or Frame) to check.
+        @return: The simplified list of strings as image_simple_ocr, or None, and the confidence (0.0 - 1.0).
+        """
+        if image is None:
+            return None, 0.0
+
+        # Return the last result if the image has not changed
+        fingerprint = None
+        if self.cache.enabled:
+            fingerprint = image_fingerprint(image)
+            cached = self.cache.get('rec', fingerprint)
+            if cached is not None:
+                return list(cached[0]), cached[1]
+
+        # Remove Alpha channel if it exists
+        image2 = as_frame(image).get('BGR')
+        try:
+            if self.out_of_process:
+                ocr_textlist, score = self.service.submit(image2, 'rec', PRIORITY_CONTROL).result()
             else:
-                ocr_textlist = []
-                for res in ocr_data:
-                    if res is None:
-                        return None
+                ocr_textlist, score = self._rec_ocr(image2, name)
 
-                    # Debug - places all detected data to 'output' folder
-                    if self.ap.debug_ocr:
-                        # x = datetime.now().strftime("%Y-%m-%d %H-%M-%S.%f")[:-3]  # Date time with mS.
-                        res.save_to_img(f"./ocr_output/{name}")
-                        res.save_to_json(f"./ocr_output/{name}")
-                        # res.save_to_img("ocr_output")
-                        # res.save_to_json("ocr_output")
+            # Only cache a confident result, so a low confidence read is not returned again for the same image
+            if ocr_textlist is not None and score >= self.rec_min_score and fingerprint is not None:
+                self.cache.put('rec', fingerprint, (list(ocr_textlist), score))
+            return ocr_textlist, score
 
-                    # Added detected text to list
-                    ocr_textlist.extend(res['rec_texts'])
+        except Exception as e:
+            logger.error(f"OCR recognition failed: {e}")
+            return None, 0.0
+
+    def _rec_ocr(self, image, name='') -> (list[str] | None, float):
+        """ Runs the recognition only model on a BGR image in this process.
+        Returns the simplified list of strings, or None, and the confidence. """
+        with self._infer_lock:
+            rec_data = self.text_recognition.predict(image, batch_size=1)
+        if not rec_data:
+            return None, 0.0
+
+        res = rec_data[0]
+        if self.ap.debug_ocr:
+            res.save_to_img(f"./ocr_output/{name}")
+            res.save_to_json(f"./ocr_output/{name}")
+
+        return rec_textlist(res)
+
+    def _run_request(self, kind: str, image):
+        """ Runs a submitted request when the OCR service runs in this process. """
+        if kind == 'rec':
+            return self._rec_ocr(image, 'service')
+        if kind in ('simple_batch', 'rec_batch', 'lines'):
+            return self._run_batch(kind, image)
+        return self._simple_ocr(image, 'service')
+
+    def _run_batch(self, kind: str, images):
+        """ Runs a batch or lines request, on the OCR service workers if out of process. """
+        if self.out_of_process:
+            return self.service.submit(images, kind, PRIORITY_CONTROL).result()
+        with self._infer_lock:
+            if kind == 'simple_batch':
+                return run_simple_batch(self.paddleocr, images)
+            if kind == 'rec_batch':
+                return run_rec_batch(self.text_recognition, images)
+            return run_lines(self.paddleocr, images)
+
+    def image_ocr_batch(self, images, single_line: bool = True, name='') -> list:
+        """ Perform OCR of a list of images in one inference call, instead of one call per image.
+        @param images: The images (or Frames) to check, i.e. the rows of a list.
+        @param single_line: True if each image is a single line of text, so recognition only OCR can be used
+        (if enabled). Images with a low recognition confidence are then OCR'd again with the full pipeline.
+        @param name:
+        @return: A list with the (text list, confidence) of each image, in the order of the images. The text list
+        is as image_simple_ocr, or None if the OCR failed.
+        """
+        results = [(None, 0.0)] * len(images)
+        use_rec = single_line and self.rec_only
+        # The recognition results, and the full pipeline results (of the images recognition could not read)
+        kinds = ['rec', 'batch'] if use_rec else ['batch']
+
+        # Use the cached results where the image has not changed
+        todo = []  # Index, image and fingerprint of the images to OCR
+        for i, image in enumerate(images):
+            if image is None:
+                continue
+            fingerprint = image_fingerprint(image) if self.cache.enabled else None
+            if fingerprint is not None:
+                cached = None
+                for kind in kinds:
+                    cached = self.cache.get(kind, fingerprint)
+                    if cached is not None:
+                        break
+                if cached is not None:
+                    results[i] = (list(cached[0]), cached[1])
+                    continue
+            todo.append((i, as_frame(image).get('BGR'), fingerprint))
 
-                # print(f"image_simple_ocr: {ocr_textlist}")
-                # logger.info(f"image_simple_ocr: {ocr_textlist}")
-                return ocr_textlist
+        try:
+            if use_rec and len(todo) > 0:
+                rec_results = self._run_batch('rec_batch', [item[1] for item in todo])
+                retry = []
+                for item, (ocr_textlist, score) in zip(todo, rec_results):
+                    if score >= self.rec_min_score:
+                        results[item[0]] = (ocr_textlist, score)
+                        if item[2] is not None:
+                            self.cache.put('rec', item[2], (list(ocr_textlist), score))
+                    else:
+                        retry.append(item)
+                todo = retry
+
+            if len(todo) > 0:
+                batch_results = self._run_batch('simple_batch', [item[1] for item in todo])
+                for item, (ocr_textlist, score) in zip(todo, batch_results):
+                    results[item[0]] = (ocr_textlist, score)
+                    if ocr_textlist is not None and item[2] is not None:
+                        self.cache.put('batch', item[2], (list(ocr_textlist), score))
 
         except Exception as e:
-            logger.error(f"OCR failed: {e}")
+            logger.error(f"OCR batch failed: {e}")
+
+        return results
+
+    def image_list_ocr(self, image, name='') -> list:
+        """ Perform OCR of a whole list (i.e. the nav panel location list) in one call, returning the text of
+        every visible row in order from the top. Text on the same row (i.e. a name and a distance) is joined.
+        @param image: The image (or Frame) of the list.
+        @param name:
+        @return: A list of (text, confidence, Quad) for each row, with the Quad in percentage of the image size.
+        """
+        if image is None:
+            return []
+
+        frame = as_frame(image)
+        try:
+            lines = self._run_batch('lines', frame.get('BGR'))
+        except Exception as e:
+            logger.error(f"OCR list failed: {e}")
+            return []
+
+        # Group the lines into rows, by the vertical centre of each line
+        rows = []
+        for text, score, box in sorted(lines, key=lambda ln: (ln[2][1] + ln[2][3]) / 2):
+            y_mid = (box[1] + box[3]) / 2
+            if len(rows) > 0:
+                row = rows[-1]
+                row_top, row_bot = row['box'][1], row['box'][3]
+                if abs(y_mid - (row_top + row_bot) / 2) < (row_bot - row_top) / 2:
+                    row['lines'].append((text, score, box))
+                    row['box'] = [min(row['box'][0], box[0]), min(row_top, box[1]), max(row['box'][2], box[2]),
+                                  max(row_bot, box[3])]
+                    continue
+            rows.append({'lines': [(text, score, box)], 'box': list(box)})
+
+        results = []
+        img_h, img_w = frame.height, frame.width
+        for row in rows:
+            row_lines = sorted(row['lines'], key=lambda ln: ln[2][0])
+            text = ' '.join(ln[0] for ln in row_lines)
+            score = min(ln[1] for ln in row_lines)
+            x1, y1, x2, y2 = row['box']
+            q = Quad.from_rect([x1 / img_w, y1 / img_h, x2 / img_w, y2 / img_h])
+            results.append((text, score, q))
+        return results
+
+    def submit(self, image, kind: str = 'simple', priority: int = PRIORITY_BACKGROUND) -> Future:
+        """ Queue OCR of an image to run in the background, so the caller can continue and poll the result.
+        @param image: The image (or Frame) to check.
+        @param kind: 'simple' for the result of image_simple_ocr, or 'rec' for the result of image_rec_ocr.
+        @param priority: PRIORITY_CONTROL or PRIORITY_BACKGROUND. Control requests run before waiting
+        background requests.
+        @return: A Future of the result.
+        """
+        # Return the last result if the image has not changed
+        fingerprint = None
+        if self.cache.enabled:
+            fingerprint = image_fingerprint(image)
+            cached = self.cache.get(kind, fingerprint)
+            if cached is not None:
+                future = Future()
+                future.set_result(list(cached) if kind == 'simple' else (list(cached[0]), cached[1]))
+                return future
+
+        # Remove Alpha channel if it exists
+        image2 = as_frame(image).get('BGR')
+        future = self.service.submit(image2, kind, priority)
+
+        def _cache_result(f: Future):
+            if fingerprint is None or f.cancelled() or f.exception() is not None:
+                return
+            result = f.result()
+            if kind == 'simple' and result is not None:
+                self.cache.put(kind, fingerprint, list(result))
+            elif kind == 'rec' and result[0] is not None and result[1] >= self.rec_min_score:
+                self.cache.put(kind, fingerprint, (list(result[0]), result[1]))
+
+        future.add_done_callback(_cache_result)
+        return future
+
+    def image_line_ocr(self, image, name='') -> list[str] | None:
+        """ Perform OCR of a single line of text that has already been isolated (i.e. a highlighted item).
+        Uses recognition only OCR if enabled, falling back to the full pipeline (image_simple_ocr) if the
+        recognition confidence is low.
+        @param name:
+        @param image: The image (or Frame) to check.
+        'ocr_textlist' is returned in the following format, or None:
+        ['SIRIUS ATMOSPHERICS']
+        """
+        if image is None:
             return None
 
+        if self.rec_only:
+            ocr_textlist, score = self.image_rec_ocr(image, name)
+            if ocr_textlist is not None and score >= self.rec_min_score:
+                return ocr_textlist
+
+        return self.image_simple_ocr(image, name)
+
     def get_highlighted_item_data(self, image, min_w, min_h, name=''):
         """ Attempts to find a selected item in an image. The selected item is identified by being solid orange or blue
             rectangle with dark text, instead of orange/blue text on a dark background.
-            The OCR daya of the first item matching the criteria is returned, otherwise None.
+            The OCR daya of the first item matching the criteria is returned, otherwise None. If recognition only
+            OCR is enabled, the OCR data is None when the recognition result is used.
             @param name:
             @param image: The image to check.
             @param min_h: Minimum height in percent of the input image.
@@ -170,6 +452,12 @@ class OCR:
         if img_selected is not None:
             # cv2.imshow("img", img_selected)
 
+            # The selected item is a single line, so try recognition only first
+            if self.rec_only:
+                ocr_textlist, score = self.image_rec_ocr(img_selected, name)
+                if ocr_textlist is not None and score >= self.rec_min_score:
+                    return img_selected, None, ocr_textlist, quad
+
             ocr_data, ocr_textlist = self.image_ocr(img_selected, name)
 
             if ocr_data is not None:
@@ -180,55 +468,58 @@ class OCR:
         else:
             return None, None, None, None
 
-    @staticmethod
-    def get_highlighted_item_in_image(image, min_w, min_h) -> (MatLike, Quad):
+    def get_highlighted_item_in_image(self, image, min_w, min_h) -> (MatLike, Quad):
         """ Attempts to find a selected item in an image. The selected item is identified by being solid orange or blue
         rectangle with dark text, instead of orange/blue text on a dark background.
         The image of the first item matching the criteria and minimum width and height is returned
         with x and y co-ordinates, otherwise None.
-        @param image: The image to check.
+        @param image: The image (or Frame) to check.
         @param min_h: Minimum height in percent of the input image.
         @param min_w: Minimum width in percent of the input image.
         @return: The highlighted image and the matching Quad position in percentage of the image size, or (None, None)
         """
+        frame = as_frame(image)
+        image = frame.image
+
         # Existing size
         img_h, img_w, _ = image.shape
 
         # The input image
-        cv2.imwrite('test/nav-panel/out/1-input.png', image)
+        self.ap.debug_sink.write('ocr', '1-input', image, DEBUG_STEPS)
 
         # Perform HSV mask
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        hsv = frame.get('HSV')
         lower_range = np.array([0, 100, 180])
         upper_range = np.array([255, 255, 255])
         mask = cv2.inRange(hsv, lower_range, upper_range)
         masked_image = cv2.bitwise_and(image, image, mask=mask)
-        cv2.imwrite('test/nav-panel/out/2-masked.png', masked_image)
+        self.ap.debug_sink.write('ocr', '2-masked', masked_image, DEBUG_STEPS)
 
         # Convert to gray scale and invert
         gray = cv2.cvtColor(masked_image, cv2.COLOR_BGR2GRAY)
-        cv2.imwrite('test/nav-panel/out/3-gray.png', gray)
+        self.ap.debug_sink.write('ocr', '3-gray', gray, DEBUG_STEPS)
 
         # Convert to B&W to allow FindContours to find rectangles.
         ret, thresh1 = cv2.threshold(gray, 0, 255, cv2.THRESH_OTSU)  # | cv2.THRESH_BINARY_INV)
-        cv2.imwrite('test/nav-panel/out/4-thresh1.png', thresh1)
+        self.ap.debug_sink.write('ocr', '4-thresh1', thresh1, DEBUG_STEPS)
 
         # Perform opening. Opening  is just another name of erosion followed by dilation. This will remove specs and
         # edges and then embolden the remaining edges. This works to remove text and stray lines.
         k = int(min(img_w * min_w, img_h * min_h) / 10)  # Make kernel 10% of the smallest image side
         kernel = np.ones((k, k), np.uint8)
         opening = cv2.morphologyEx(thresh1, cv2.MORPH_OPEN, kernel)
-        cv2.imwrite('test/nav-panel/out/5-opened.png', opening)
+        self.ap.debug_sink.write('ocr', '5-opened', opening, DEBUG_STEPS)
 
         # Finding contours in B&W image. White are the areas detected
         contours, hierarchy = cv2.findContours(opening, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-        output = image
-        cv2.drawContours(output, contours, -1, (0, 255, 0), 2)
-        cv2.imwrite('test/nav-panel/out/6-contours.png', output)
+        if self.ap.debug_sink.enabled('ocr', DEBUG_STEPS):
+            # Draw on a copy, the input may be a read only screen frame
+            output = image.copy()
+            cv2.drawContours(output, contours, -1, (0, 255, 0), 2)
+            self.ap.debug_sink.write('ocr', '6-contours', output, DEBUG_STEPS)
 
         # bounds = image
-        cropped = image
         for cnt in contours:
             x, y, w, h = cv2.boundingRect(cnt)
             # Check the item is greater than 85% of the minimum width or height. Which allows for some variation.
@@ -239,11 +530,12 @@ class OCR:
                 # Drawing a rectangle on the copied image
                 # bounds = cv2.rectangle(bounds, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
-                # Crop to leave only the contour (the selected rectangle)
-                cropped = image[y:y + h, x:x + w]
+                # Crop to leave only the contour (the selected rectangle). A copy, as the input may be a read only
+                # screen frame.
+                cropped = image[y:y + h, x:x + w].copy()
 
                 # cv2.imshow("cropped", cropped)
-                cv2.imwrite('test/nav-panel/out/7-selected_item.png', cropped)
+                self.ap.debug_sink.write('ocr', '7-selected_item', cropped, DEBUG_STEPS)
                 q = Quad.from_rect([x / img_w, y / img_h, (x + w) / img_w, (y + h) / img_h])
                 return cropped, q
 
@@ -274,7 +566,7 @@ class OCR:
             logger.debug(f"Did not find a selected item in the region.")
             return None
 
-        found, results = self.is_text_in_image(text, img_selected, name)
+        found, results = self.is_text_in_image(text, img_selected, name, single_line=True)
         return found, results
 
     def is_text_in_region(self, text, region) -> (bool, str):
@@ -291,20 +583,24 @@ class OCR:
         found, results = self.is_text_in_image(text, img)
         return found, results
 
-    def is_text_in_image(self, text, image, name='') -> (bool, str):
+    def is_text_in_image(self, text, image, name='', single_line=False) -> (bool, str):
         """ Does the image include the text being checked for. The image does not need
         to include highlighted areas.
         Checks if text exists in an image using OCR.
         Return True if found, False if not and None if no item was selected.
         @param text: The text to check for.
         @param image: The image to check.
+        @param single_line: True if the image is a single isolated line of text (i.e. a highlighted item).
         @return: True with the string of results, or False with the string of results.
         """
         if image is None:
             logger.debug(f"is_text_in_image: No image supplied.")
             return None, ""
 
-        ocr_textlist = self.image_simple_ocr(image, name)
+        if single_line:
+            ocr_textlist = self.image_line_ocr(image, name)
+        else:
+            ocr_textlist = self.image_simple_ocr(image, name)
         # print(str(ocr_textlist))
 
         # PaddleOCR has difficulty detecting spaces, so strip out spaces for the compare
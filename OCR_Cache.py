@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+from Screen_Frame import as_frame
+
+"""
+File:OCR_Cache.py
+
+Description:
+  Cache of OCR results keyed by a perceptual fingerprint of the image, so the same (or nearly the same) UI crop
+  is not passed through PaddleOCR again, i.e. when polling for a screen to appear or checking a selected row
+  repeatedly.
+"""
+
+
+def image_fingerprint(image, max_w: int = 256, max_h: int = 32):
+    """ Returns the perceptual fingerprint of an image: its size and a gray thumbnail shrunk to fit
+    max_w x max_h, keeping enough detail that different text gives a different thumbnail.
+    @param image: The image (or Frame).
+    @return: ((width, height), thumbnail)
+    """
+    gray = as_frame(image).get('GRAY')
+    h, w = gray.shape[:2]
+    scale = min(max_w / w, max_h / h, 1.0)
+    small_w = max(1, round(w * scale))
+    small_h = max(1, round(h * scale))
+    if (small_w, small_h) != (w, h):
+        gray = cv2.resize(gray, (small_w, small_h), interpolation=cv2.INTER_AREA)
+    else:
+        gray = gray.copy()  # May be the caller's image
+    return (w, h), gray
+
+
+class OCRCache:
+    """ LRU cache of OCR results with a max age. An image matches a cached result if it is the same size and its
+    thumbnail differs by no more than the tolerance at any pixel, so noise and small changes in brightness still
+    match but a changed character does not. Thread safe, as OCR is called from the AP thread and the monitoring
+    threads.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 5.0, tolerance: int = 16):
+        """
+        @param max_entries: The max number of results kept, 0 to disable the cache.
+        @param ttl: The max age of a result in seconds.
+        @param tolerance: The max difference (0 - 255) of any thumbnail pixel for images to match.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (kind, size, thumbnail, time, result) by id, least recently used first
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, kind: str, fingerprint):
+        """ Returns the cached result for an image, or None if not cached or expired.
+        @param kind: The kind of OCR (i.e. 'simple' or 'full').
+        @param fingerprint: The image fingerprint, from image_fingerprint().
+        """
+        size, thumb = fingerprint
+        now = time.monotonic()
+        with self._lock:
+            for entry_id, (e_kind, e_size, e_thumb, e_time, result) in reversed(self._entries.items()):
+                if e_kind != kind or e_size != size:
+                    continue
+                if now - e_time > self.ttl:
+                    continue
+                if cv2.absdiff(thumb, e_thumb).max() <= self.tolerance:
+                    self._entries.move_to_end(entry_id)
+                    self.hits = self.hits + 1
+                    return result
+            self.misses = self.misses + 1
+            return None
+
+    def put(self, kind: str, fingerprint, result):
+        """ Adds a result, removing expired results and the least recently used if full. """
+        size, thumb = fingerprint
+        now = time.monotonic()
+        with self._lock:
+            for entry_id in [k for k, e in self._entries.items() if now - e[3] > self.ttl]:
+                del self._entries[entry_id]
+            self._entries[next(self._ids)] = (kind, size, thumb, now, result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """ Returns the hit and miss counts, the hit rate (0.0 - 1.0) and the number of results cached. """
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0,
+                    'size': len(self._entries)}
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+
+"""
+File:OCR_Matcher.py
+
+Description:
+  Fuzzy matching of OCR text against a known vocabulary (i.e. the locale labels, or the rows read from a
+  list). The vocabulary is normalised once and held in a BK-tree, so the best match for an OCR
+  result is found in one lookup that only compares against the candidates that could score above the minimum.
+"""
+
+# Removes the list formatting of str(ocr_textlist) (brackets, quotes and separators), the '<' and '>' OCR reads
+# around some text, and spaces
+NORMALISE_TABLE = str.maketrans('', '', "[]'\"<>, ")
+
+
+def normalise_text(text) -> str:
+    """ Returns the text in upper case without the characters OCR gets wrong or adds.
+    @param text: A string, or a list of strings (an OCR text list) which are joined.
+    """
+    if not isinstance(text, str):
+        text = ''.join(text)
+    return text.upper().translate(NORMALISE_TABLE)
+
+
+def levenshtein(s1: str, s2: str) -> int:
+    """ Returns the Levenshtein (edit) distance between two strings. """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+
+    previous = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1, 1):
+        current = [i]
+        for j, c2 in enumerate(s2, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (c1 != c2)))
+        previous = current
+    return previous[-1]
+
+
+def _similarity(s1: str, s2: str, dist: int) -> float:
+    """ The normalised Levenshtein similarity of two normalised strings with a known distance. """
+    length = max(len(s1), len(s2))
+    return 1.0 - dist / length if length > 0 else 1.0
+
+
+def text_similarity(s1, s2) -> float:
+    """ Returns the similarity of two texts from 0.0 (no match) to 1.0 (identical), after normalising both.
+    @param s1: A string or OCR text list.
+    @param s2: A string or OCR text list.
+    """
+    n1 = normalise_text(s1)
+    n2 = normalise_text(s2)
+    return _similarity(n1, n2, levenshtein(n1, n2))
+
+
+class TextMatcher:
+    """ A BK-tree of normalised candidate texts. Finds the candidate most similar to a text, skipping the
+    branches of the tree that cannot score above the best found so far.
+    """
+
+    def __init__(self, candidates=None):
+        """
+        @param candidates: The candidate texts. Candidates that normalise the same as an earlier one are ignored.
+        """
+        self._root = None  # [normalised text, original text, {distance: child node}]
+        self._count = 0
+        self._max_len = 0
+        for candidate in candidates or []:
+            self.add(candidate)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, candidate: str):
+        """ Adds a candidate text. """
+        key = normalise_text(candidate)
+        node = [key, candidate, {}]
+        if self._root is None:
+            self._root = node
+        else:
+            parent = self._root
+            while True:
+                dist = levenshtein(key, parent[0])
+                if dist == 0:
+                    return
+                child = parent[2].get(dist)
+                if child is None:
+                    parent[2][dist] = node
+                    break
+                parent = child
+        self._count = self._count + 1
+        self._max_len = max(self._max_len, len(key))
+
+    def best(self, text, min_score: float = 0.0) -> (str | None, float):
+        """ Finds the candidate most similar to a text.
+        @param text: A string or OCR text list.
+        @param min_score: The min similarity (0.0 - 1.0) for a candidate to match.
+        @return: The best candidate (as added) and its similarity, or (None, 0.0) if none scores min_score.
+        """
+        if self._root is None:
+            return None, 0.0
+
+        key = normalise_text(text)
+        best_candidate = None
+        best_score = min_score
+        # The max distance a candidate may have to score at least best_score
+        max_len = max(len(key), self._max_len)
+        max_dist = math.floor((1.0 - best_score) * max_len)
+
+        nodes = [self._root]
+        while nodes:
+            node_key, candidate, children = nodes.pop()
+            dist = levenshtein(key, node_key)
+            score = _similarity(key, node_key, dist)
+            if score > best_score or (best_candidate is None and score >= best_score):
+                best_candidate = candidate
+                best_score = score
+                max_dist = math.floor((1.0 - best_score) * max_len)
+                if best_score >= 1.0:
+                    break  # Exact match
+            # By the triangle inequality, only children this far from the node can be within max_dist
+            for child_dist, child in children.items():
+                if dist - max_dist <= child_dist <= dist + max_dist:
+                    nodes.append(child)
+
+        if best_candidate is None:
+            return None, 0.0
+        return best_candidate, best_score
+
+
+def locale_labels(folder: str = 'locales') -> list[str]:
+    """ Returns the labels of all the languages in the locales folder. """
+    labels = []
+    for file in sorted(os.listdir(folder)):
+        if file.endswith(".json"):
+            with open(os.path.join(folder, file), 'r', encoding='utf-8') as f:
+                labels.extend(v for v in json.load(f).values() if isinstance(v, str))
+    return labels
+
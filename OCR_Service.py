@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future
+
+from EDlogger import logger
+from OCR_Worker import worker_main
+
+"""
+File:OCR_Service.py
+
+Description:
+  Runs OCR requests on worker processes (see OCR_Worker) that hold the PaddleOCR models, so inference does not run on (or hold
+  the GIL of) the AP threads. Requests are submitted with a priority and return a Future, so a caller can fire
+  a request and poll for the result later.
+"""
+
+PRIORITY_CONTROL = 0  # Needed by the AP to continue, i.e. reading a menu
+PRIORITY_BACKGROUND = 1  # Monitoring, i.e. the disengage check
+
+
+class OCRService:
+    """ A pool of OCR workers fed from a priority queue. Each worker takes the next request only when it is free,
+    so a control request is run before any background requests already waiting.
+    """
+
+    def __init__(self, workers: int = 1, rec_model_name: str = "PP-OCRv5_server_rec", run_fn=None):
+        """
+        @param workers: The number of worker processes.
+        @param rec_model_name: The recognition only model (for 'rec' requests).
+        @param run_fn: A function(kind, image) returning the result, to run the requests on worker threads in this
+        process instead of worker processes.
+        """
+        self.workers = workers
+        self.rec_model_name = rec_model_name
+        self.run_fn = run_fn
+        self.ready = threading.Event()  # Set when a worker has loaded the models
+        self._jobs = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._threads = []
+        self._stopped = False
+        self._alive = 0  # Workers running
+        self._lock = threading.Lock()
+
+    def start(self):
+        """ Starts the workers. The models load in the background, requests wait until loaded. """
+        ctx = multiprocessing.get_context('spawn')  # No fork, the AP has threads running
+        self._alive = self.workers
+        for i in range(self.workers):
+            conn = None
+            process = None
+            if self.run_fn is None:
+                conn, child_conn = ctx.Pipe()
+                process = ctx.Process(target=worker_main, args=(child_conn, self.rec_model_name),
+                                      name=f"OCRWorker-{i}", daemon=True)
+                process.start()
+                child_conn.close()
+            thread = threading.Thread(target=self._dispatch_loop, args=(conn, process), name=f"OCRService-{i}",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, image, kind: str = 'simple', priority: int = PRIORITY_CONTROL) -> Future:
+        """ Queues an OCR request.
+        @param image: The BGR image, or a list of images for the batch requests.
+        @param kind: 'simple' for the text list (as OCR.image_simple_ocr), 'rec' for recognition only of a
+        single line (as OCR.image_rec_ocr), 'simple_batch' or 'rec_batch' for a list of images
+        (as OCR.image_ocr_batch), or 'lines' for the lines of text (as OCR.image_list_ocr).
+        @param priority: PRIORITY_CONTROL or PRIORITY_BACKGROUND.
+        @return: A Future of the result.
+        """
+        future = Future()
+        if self._stopped:
+            future.set_exception(RuntimeError("OCR service is stopped."))
+            return future
+        self._jobs.put((priority, next(self._seq), future, kind, image))
+        return future
+
+    def stop(self):
+        """ Stops the workers. Requests still waiting are cancelled. """
+        if self._stopped:
+            return
+        self._stopped = True
+        for _ in self._threads:
+            self._jobs.put((PRIORITY_BACKGROUND + 1, next(self._seq), None, None, None))
+        for thread in self._threads:
+            thread.join(5.0)
+        self._threads = []
+
+    def _worker_lost(self):
+        """ Fails the waiting requests if no workers are left to run them. """
+        with self._lock:
+            self._alive = self._alive - 1
+            if self._alive > 0:
+                return
+            self._stopped = True
+        while True:
+            try:
+                priority, seq, future, kind, image = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("No OCR workers running."))
+
+    @staticmethod
+    def _recv(conn):
+        """ Receives the next reply from a worker, writing any log messages sent before it to the log. """
+        while True:
+            reply = conn.recv()
+            if reply[0] != 'log':
+                return reply
+            _, level, message = reply
+            getattr(logger, level)(message)
+
+    def _dispatch_loop(self, conn, process):
+        try:
+            if conn is not None:
+                status, load_time = self._recv(conn)
+                logger.info(f"OCR worker ready in {load_time:.2f} secs.")
+            self.ready.set()
+
+            while True:
+                priority, seq, future, kind, image = self._jobs.get()
+                if future is None:
+                    break
+                if self._stopped:
+                    future.cancel()
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    if conn is None:
+                        future.set_result(self.run_fn(kind, image))
+                        continue
+                    conn.send((kind, image))
+                    status, result = self._recv(conn)
+                    if status == 'ok':
+                        future.set_result(result)
+                    else:
+                        future.set_exception(RuntimeError(result))
+                except (EOFError, OSError) as e:
+                    future.set_exception(e)
+                    raise
+                except Exception as e:
+                    future.set_exception(e)
+
+        except (EOFError, OSError) as e:
+            logger.error(f"OCR worker stopped: {e}")
+            self._worker_lost()
+        finally:
+            if conn is not None:
+                try:
+                    conn.send(None)
+                except (EOFError, OSError):
+                    pass
+                conn.close()
+                process.join(5.0)
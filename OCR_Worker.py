@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import time
+
+"""
+File:OCR_Worker.py
+
+Description:
+  The OCR worker process of OCR_Service, and the PaddleOCR helpers it shares with OCR. A spawned worker imports
+  this module to run worker_main, so it imports nothing from the app (i.e. EDlogger, which renames the log file
+  on import). The worker logs through its pipe, the service writes the messages to the app log.
+"""
+
+# The PaddleOCR pipeline options used by OCR and the workers
+PADDLEOCR_ARGS = {
+    'use_doc_orientation_classify': False,
+    'use_doc_unwarping': False,
+    'use_textline_orientation': False,
+}
+
+
+def simple_textlist(ocr_data) -> list[str] | None:
+    """ Returns the list of text found in the PaddleOCR pipeline results, or None. """
+    if ocr_data is None:
+        return None
+    ocr_textlist = []
+    for res in ocr_data:
+        if res is None:
+            return None
+        ocr_textlist.extend(res['rec_texts'])
+    return ocr_textlist
+
+
+def rec_textlist(res) -> (list[str], float):
+    """ Returns the text (as a list like simple_textlist) and the confidence of a recognition only result. """
+    text = res['rec_text'].strip()
+    return [text] if text != '' else [], float(res['rec_score'])
+
+
+def run_simple_batch(paddleocr, images) -> list:
+    """ Runs the PaddleOCR pipeline on a list of images in one call.
+    @return: The (text list, mean confidence) of each image, (None, 0.0) if it failed.
+    """
+    results = []
+    for res in paddleocr.predict(images):
+        if res is None:
+            results.append((None, 0.0))
+            continue
+        scores = res['rec_scores']
+        results.append((list(res['rec_texts']), float(sum(scores) / len(scores)) if len(scores) else 0.0))
+    return results
+
+
+def run_rec_batch(text_recognition, images) -> list:
+    """ Runs the recognition only model on a list of single line images in one call.
+    @return: The (text list, confidence) of each image.
+    """
+    return [rec_textlist(res) for res in text_recognition.predict(images, batch_size=len(images))]
+
+
+def run_lines(paddleocr, image) -> list:
+    """ Runs the PaddleOCR pipeline on an image and returns every line of text found.
+    @return: A list of (text, confidence, [x1, y1, x2, y2]) in pixels.
+    """
+    lines = []
+    for res in paddleocr.predict(image):
+        if res is None:
+            continue
+        for text, score, box in zip(res['rec_texts'], res['rec_scores'], res['rec_boxes']):
+            lines.append((text, float(score), [int(v) for v in box]))
+    return lines
+
+
+def worker_main(conn, rec_model_name: str):
+    """ The worker process. Loads the models, then runs (kind, image) requests until sent None.
+    Replies with ('ready', load time), then ('ok', result) or ('error', message) for each request. Log messages
+    are sent as ('log', level, message) at any time, i.e. ('log', 'error', message) before exiting if the models
+    cannot be loaded. """
+    try:
+        from paddleocr import PaddleOCR, TextRecognition
+
+        start = time.perf_counter()
+        paddleocr = PaddleOCR(**PADDLEOCR_ARGS)
+    except Exception as e:
+        conn.send(('log', 'error', f"OCR worker could not load the models: {e}"))
+        conn.close()
+        return
+    text_recognition = None
+    conn.send(('ready', time.perf_counter() - start))
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+
+        kind, image = request
+        try:
+            if kind in ('rec', 'rec_batch') and text_recognition is None:
+                start = time.perf_counter()
+                text_recognition = TextRecognition(model_name=rec_model_name)
+                load_time = time.perf_counter() - start
+                conn.send(('log', 'info', f"OCR worker loaded {rec_model_name} in {load_time:.2f} secs."))
+
+            if kind == 'simple':
+                result = simple_textlist(paddleocr.predict(image))
+            elif kind == 'rec':
+                rec_data = text_recognition.predict(image, batch_size=1)
+                result = rec_textlist(rec_data[0]) if rec_data else (None, 0.0)
+            elif kind == 'simple_batch':
+                result = run_simple_batch(paddleocr, image)
+            elif kind == 'rec_batch':
+                result = run_rec_batch(text_recognition, image)
+            elif kind == 'lines':
+                result = run_lines(paddleocr, image)
+            else:
+                raise ValueError(f"Unknown OCR request '{kind}'.")
+            conn.send(('ok', result))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
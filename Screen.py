@@ -1,15 +1,25 @@
 from __future__ import annotations
+import threading
+import time
 import typing
 from copy import copy
 
-import cv2
-import win32con
-import win32gui
 from numpy import array
 import mss
 import json
 
 from EDlogger import logger
+from Screen_Capture import CaptureService
+from Screen_Frame import Frame
+from Screen_FrameSource import FrameSource, MssFrameSource
+
+try:
+    import win32con
+    import win32gui
+except ImportError:
+    # Not on Windows. Only the replay frame sources (images, video, recorded session) can be used.
+    win32con = None
+    win32gui = None
 from Screen_Regions import Quad
 
 """
@@ -34,6 +44,8 @@ def set_focus_elite_window():
     """ set focus to the ED window, if ED does not have focus then the keystrokes will go to the window
     that does have focus. """
     ed_title = "Elite - Dangerous (CLIENT)"
+    if win32gui is None:
+        return
 
     # TODO - determine if GetWindowText is faster than FindWindow if ED is in foreground
     if win32gui.GetWindowText(win32gui.GetForegroundWindow()) == ed_title:
@@ -74,11 +86,18 @@ def crop_image_pix(image, quad: Quad):
 
 
 class Screen:
-    def __init__(self, cb):
+    def __init__(self, cb, source: FrameSource | None = None):
+        """
+        @param cb: The AP callback.
+        @param source: The frame source to use instead of the screen (see Screen_FrameSource.py). If None,
+        the monitor Elite Dangerous is on is grabbed. Replay sources do not need Elite Dangerous or Windows.
+        """
         self.ap_ckb = cb
-        self.mss = mss.mss()
+        self.mss = None
+        self.source = source
         self.using_screen = True  # True to use screen, false to use an image. Set screen_image to the image
         self._screen_image = None  # Screen image captured from screen, or loaded by user for testing.
+        self._screen_image_frame = None  # Frame wrapping the user image
         self.screen_width = 0
         self.screen_height = 0
         self.screen_left = 0
@@ -87,55 +106,23 @@ class Screen:
         self.aspect_ratio = 0
         self.mon = None
 
-        # Find ED window position to determine which monitor it is on
-        ed_rect = self.get_elite_window_rect()
-        if ed_rect is None:
-            msg = f"Could not find window '{elite_dangerous_window}'. Once Elite Dangerous is running, restart EDAP."
-            self.ap_ckb('log', f"ERROR: {msg}")
-            logger.error(msg)
+        # Frame cache. The whole monitor is grabbed once and all regions are sliced from that frame, so all the
+        # detectors called within a control tick see the same image. The frame is re-grabbed when it is older
+        # than frame_max_age or when grab_frame() is called at the start of a new tick.
+        self.frame_max_age = 0.1  # Max age of the cached frame in seconds
+        self._frame = None  # The cached Frame (BGRA, read only)
+        self._frame_time = 0.0  # time.monotonic() timestamp of the cached frame
+        self._frame_lock = threading.Lock()  # The AP and SCO threads both capture
+        self.capture = None  # Optional background capture service, see start_capture()
+        self.recorder = None  # Optional SessionRecorder, records the frames used
+
+        if self.source is None:
+            self._find_elite_monitor()
+            self.source = MssFrameSource(self.mss, self.mon, self.monitor_number)
         else:
-            logger.debug(f'Found Elite Dangerous window position: {ed_rect}')
-
-        # Examine all monitors to determine match with ED
-        self.mons = self.mss.monitors
-        mon_num = 0
-        default = True
-        for item in self.mons:
-            logger.debug(f'Found monitor {mon_num} with details: {item}')
-            if mon_num > 0:  # ignore monitor 0 as it is the complete desktop (dims of all monitors)
-                if ed_rect is not None:
-                    if item['left'] == ed_rect[0] and item['top'] == ed_rect[1]:
-                        # Get information of monitor
-                        self.monitor_number = mon_num
-                        self.mon = self.mss.monitors[self.monitor_number]
-                        self.screen_width = item['width']
-                        self.screen_height = item['height']
-                        self.aspect_ratio = self.screen_width / self.screen_height
-                        self.screen_left = item['left']
-                        self.screen_top = item['top']
-                        logger.debug(f'Elite Dangerous is on monitor {mon_num}.')
-                        default = False
-                        break
-
-            # Store the first monitor incase we need it as default
-            if mon_num == 1:
-                self.monitor_number = mon_num
-                self.mon = self.mss.monitors[self.monitor_number]
-                self.screen_width = item['width']
-                self.screen_height = item['height']
-                self.aspect_ratio = self.screen_width / self.screen_height
-                self.screen_left = item['left']
-                self.screen_top = item['top']
-
-            # Next monitor
-            mon_num = mon_num + 1
-
-        # Check if ED was found on a monitor, or if we are using the default monitor
-        if default:
-            msg = (f"Elite Dangerous could not be located on any monitor. Check Elite Dangerous is not minimized and "
-                   f"is visible on screen.")
-            self.ap_ckb('log', f"ERROR: {msg}")
-            logger.error(msg)
+            self.screen_width, self.screen_height = self.source.get_size()
+            self.aspect_ratio = self.screen_width / self.screen_height
+            logger.debug(f'Using frame source {type(self.source).__name__}.')
 
         # Add new screen resolutions here with tested scale factors
         # this table will be default, overwritten when loading resolution.json file
@@ -185,11 +172,67 @@ class Screen:
         logger.debug('screen position: x='+str(self.screen_left)+" y="+str(self.screen_top))
         logger.debug('Default scale X, Y: '+str(self.scaleX)+", "+str(self.scaleY))
 
+    def _find_elite_monitor(self):
+        """ Finds the monitor Elite Dangerous is on, or defaults to the first monitor. """
+        self.mss = mss.mss()
+
+        # Find ED window position to determine which monitor it is on
+        ed_rect = self.get_elite_window_rect()
+        if ed_rect is None:
+            msg = f"Could not find window '{elite_dangerous_window}'. Once Elite Dangerous is running, restart EDAP."
+            self.ap_ckb('log', f"ERROR: {msg}")
+            logger.error(msg)
+        else:
+            logger.debug(f'Found Elite Dangerous window position: {ed_rect}')
+
+        # Examine all monitors to determine match with ED
+        self.mons = self.mss.monitors
+        mon_num = 0
+        default = True
+        for item in self.mons:
+            logger.debug(f'Found monitor {mon_num} with details: {item}')
+            if mon_num > 0:  # ignore monitor 0 as it is the complete desktop (dims of all monitors)
+                if ed_rect is not None:
+                    if item['left'] == ed_rect[0] and item['top'] == ed_rect[1]:
+                        # Get information of monitor
+                        self.monitor_number = mon_num
+                        self.mon = self.mss.monitors[self.monitor_number]
+                        self.screen_width = item['width']
+                        self.screen_height = item['height']
+                        self.aspect_ratio = self.screen_width / self.screen_height
+                        self.screen_left = item['left']
+                        self.screen_top = item['top']
+                        logger.debug(f'Elite Dangerous is on monitor {mon_num}.')
+                        default = False
+                        break
+
+            # Store the first monitor incase we need it as default
+            if mon_num == 1:
+                self.monitor_number = mon_num
+                self.mon = self.mss.monitors[self.monitor_number]
+                self.screen_width = item['width']
+                self.screen_height = item['height']
+                self.aspect_ratio = self.screen_width / self.screen_height
+                self.screen_left = item['left']
+                self.screen_top = item['top']
+
+            # Next monitor
+            mon_num = mon_num + 1
+
+        # Check if ED was found on a monitor, or if we are using the default monitor
+        if default:
+            msg = (f"Elite Dangerous could not be located on any monitor. Check Elite Dangerous is not minimized and "
+                   f"is visible on screen.")
+            self.ap_ckb('log', f"ERROR: {msg}")
+            logger.error(msg)
+
     @staticmethod
     def get_elite_window_rect() -> typing.Tuple[int, int, int, int] | None:
         """ Gets the ED window rectangle.
         Returns (left, top, right, bottom) or None.
         """
+        if win32gui is None:
+            return None
         hwnd = win32gui.FindWindow(None, elite_dangerous_window)
         if hwnd:
             rect = win32gui.GetWindowRect(hwnd)
@@ -201,6 +244,8 @@ class Screen:
     def elite_window_exists() -> bool:
         """ Does the ED Client Window exist (i.e. is ED running)
         """
+        if win32gui is None:
+            return False
         hwnd = win32gui.FindWindow(None, elite_dangerous_window)
         if hwnd:
             return True
@@ -226,25 +271,146 @@ class Screen:
 
         return s
 
+    def grab_frame(self):
+        """ Grabs the whole monitor in a single capture and stores it as the current frame.
+        Call at the start of a control tick so that all detectors in the tick use the same image.
+        @return: The Frame (or a Frame of the user image if not using the screen).
+        """
+        if not self.using_screen:
+            return self._screen_image_frame
+
+        with self._frame_lock:
+            return self._grab_frame()
+
+    def grab_frame_after(self, delay: float, timeout: float = 1.0):
+        """ Gets the first frame captured at least delay seconds from now and stores it as the current frame.
+        Use after a manoeuvre to get a frame of the result. With the capture thread running, the frame is
+        taken from the ring buffer as soon as it is captured, otherwise this waits for the delay and grabs.
+        @param delay: The time in seconds to wait for the picture to settle.
+        @param timeout: The max time to wait for the capture thread after the delay.
+        @return: The Frame (or a Frame of the user image if not using the screen).
+        """
+        if not self.using_screen:
+            return self._screen_image_frame
+
+        if self.capture is not None and self.capture.is_running():
+            frame = self.capture.wait_newer_than(time.monotonic() + delay, delay + timeout)
+            if frame is not None:
+                with self._frame_lock:
+                    self._frame = frame
+                    self._frame_time = frame.timestamp
+                if self.recorder is not None:
+                    self.recorder.add_frame(frame)
+                return frame
+            logger.warning("grab_frame_after: no frame from the capture thread.")
+        else:
+            time.sleep(delay)
+
+        return self.grab_frame()
+
+    def start_capture(self, rate: float = 30.0, size: int = 8):
+        """ Starts grabbing frames on a background thread. Frames are then taken from the capture thread
+        instead of being grabbed when requested.
+        @param rate: The capture rate in frames per second.
+        @param size: The number of frames kept in the ring buffer.
+        """
+        self.stop_capture()
+        self.capture = CaptureService(self.source, rate, size)
+        self.capture.start()
+
+    def stop_capture(self):
+        """ Stops the background capture thread (if running). """
+        if self.capture is not None:
+            self.capture.stop()
+            self.capture = None
+
+    def get_frame(self):
+        """ Gets the current frame, grabbing a new one if there is no frame or it is older than frame_max_age.
+        @return: The Frame (or a Frame of the user image if not using the screen).
+        """
+        if not self.using_screen:
+            return self._screen_image_frame
+
+        with self._frame_lock:
+            if self._frame is None or (time.monotonic() - self._frame_time) > self.frame_max_age:
+                self._grab_frame()
+            return self._frame
+
+    def get_frame_time(self) -> float:
+        """ Returns the time.monotonic() timestamp of the current frame, or 0.0 if no frame was grabbed. """
+        return self._frame_time
+
+    def invalidate_frame(self):
+        """ Discards the current frame, so the next request will grab a new one. """
+        with self._frame_lock:
+            self._frame = None
+
+    def _grab_frame(self):
+        """ Grabs the next frame from the frame source (or the latest frame from the capture thread) into the
+        frame cache. Must be called with the frame lock held. """
+        if self.capture is not None and self.capture.is_running():
+            frame = self.capture.latest()
+            if frame is None:
+                # Capture thread just started
+                frame = self.capture.wait_newer_than(0.0)
+            if frame is not None:
+                self._frame = frame
+                self._frame_time = frame.timestamp
+        else:
+            self._frame = self.source.grab()
+            self._frame_time = time.monotonic()
+
+        if self.recorder is not None:
+            self.recorder.add_frame(self._frame)
+        return self._frame
+
+    def set_frame_source(self, source: FrameSource):
+        """ Changes the frame source, i.e. to replay a recorded session. The screen size is set to the size of
+        the source frames. Regions and templates scaled for the old size must be recreated by the caller.
+        @param source: The new frame source.
+        """
+        capture = self.capture
+        self.stop_capture()
+        with self._frame_lock:
+            self.source = source
+            self._frame = None
+            self.using_screen = True
+            self.screen_width, self.screen_height = source.get_size()
+            self.aspect_ratio = self.screen_width / self.screen_height
+        if capture is not None:
+            self.start_capture(capture.rate, capture.size)
+
+    def get_frame_region(self, reg) -> Frame | None:
+        """ Gets a region of the current frame as a Frame. The same region requested again from the same frame
+        returns the same Frame, so its colour conversions are shared between the detectors using it.
+        @param reg: A rect array ([L, T, R, B]) in pixels.
+        """
+        frame = self.get_frame()
+        if frame is None:
+            return None
+
+        left = int(reg[0])
+        top = int(reg[1])
+        return frame.region(left, top, left + int(reg[2] - reg[0]), top + int(reg[3] - reg[1]))
+
     # reg defines a box as a percentage of screen width and height
     def get_screen_region(self, reg, rgb=True):
         image = self.get_screen(int(reg[0]), int(reg[1]), int(reg[2]), int(reg[3]), rgb)
         return image
 
     def get_screen(self, x_left, y_top, x_right, y_bot, rgb=True):    # if absolute need to scale??
-        """ Get screen from co-ords in pixels."""
-        monitor = {
-            "top": self.mon["top"] + int(y_top),
-            "left": self.mon["left"] + int(x_left),
-            "width": int(x_right - x_left),
-            "height": int(y_bot - y_top),
-            "mon": self.monitor_number,
-        }
-        image = array(self.mss.grab(monitor))
-        # TODO - mss.grab returns the image in BGR format, so no need to convert to RGB2BGR
+        """ Get screen from co-ords in pixels.
+        The image is sliced from the current frame and is read only, so copy it before drawing on it.
+        With rgb=False it is the frame itself (BGRA). With rgb=True it is red/blue swapped, which is what
+        the region filters were tuned on.
+        """
+        region = self.get_frame_region([x_left, y_top, x_right, y_bot])
+        if region is None:
+            return None
+
         if rgb:
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        return image
+            return region.get('RGB')
+        return region.image
         
     def get_screen_rect_pct(self, rect):
         """ Grabs a screenshot and returns the selected region as an image.
@@ -252,11 +418,10 @@ class Screen:
         @return: An image defined by the region.
         """
         if self.using_screen:
-            abs_rect = self.screen_rect_to_abs(rect)
-            image = self.get_screen(abs_rect[0], abs_rect[1], abs_rect[2], abs_rect[3])
-            # TODO delete this line when COLOR_RGB2BGR is removed from get_screen()
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            return image
+            region = self.get_frame_region(self.screen_rect_to_abs(rect))
+            if region is None:
+                return None
+            return region.get('BGR')
         else:
             if self._screen_image is None:
                 return None
@@ -287,10 +452,10 @@ class Screen:
         """ Grabs a full screenshot and returns the image.
         """
         if self.using_screen:
-            image = self.get_screen(0, 0, self.screen_width, self.screen_height)
-            # TODO delete this line when COLOR_RGB2BGR is removed from get_screen()
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            return image
+            frame = self.get_frame()
+            if frame is None:
+                return None
+            return frame.get('BGR')
         else:
             if self._screen_image is None:
                 return None
@@ -304,6 +469,7 @@ class Screen:
         """
         self.using_screen = False
         self._screen_image = image
+        self._screen_image_frame = Frame.from_image(image)
 
         # Existing size
         h, w, ch = image.shape
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from EDlogger import logger
+from Screen_Frame import Frame
+from Screen_FrameSource import FrameSource
+
+
+class CaptureService:
+    """ Grabs frames from a frame source on a background thread at a fixed rate, into a ring buffer of the
+    latest frames. Consumers take the latest frame, or the first frame newer than a given time, without waiting
+    for a grab.
+    The frame sources return a new read only image for each grab, so the ring holds those images and hands them
+    out without copying. A frame stays valid however long it is kept.
+    """
+
+    def __init__(self, source: FrameSource, rate: float = 30.0, size: int = 8):
+        """
+        @param source: The frame source to grab from.
+        @param rate: The capture rate in frames per second.
+        @param size: The number of frames kept in the ring buffer.
+        """
+        self.source = source
+        self.rate = rate
+        self.size = size
+        self._frames = [None] * size  # The frames in the ring, by slot
+        self._count = 0  # The number of frames captured
+        self._cond = threading.Condition()
+        self._thread = None
+        self._run = False
+
+    def start(self):
+        """ Starts the capture thread. """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._run = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+        logger.debug(f"Capture thread started at {self.rate} fps with {self.size} frames.")
+
+    def stop(self):
+        """ Stops the capture thread. """
+        self._run = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _capture_loop(self):
+        period = 1.0 / self.rate
+        next_time = time.monotonic()
+        while self._run:
+            start_time = time.monotonic()
+            try:
+                frame = self.source.grab()
+                if frame is not None:
+                    self._store(frame, start_time)
+            except Exception as e:
+                logger.error(f"Capture failed: {e}")
+
+            next_time = next_time + period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Running behind, do not try to catch up
+                next_time = time.monotonic()
+
+    def _store(self, frame: Frame, timestamp: float):
+        """ Puts the frame in the next slot of the ring.
+        @param timestamp: The time.monotonic() time the grab started, so the image is no older than this.
+        """
+        image = frame.image
+        if image.flags.writeable:
+            image = image.view()
+            image.flags.writeable = False
+        new_frame = Frame(image, frame.color_space, timestamp)
+
+        with self._cond:
+            self._frames[self._count % self.size] = new_frame
+            self._count = self._count + 1
+            self._cond.notify_all()
+
+    def latest(self) -> Frame | None:
+        """ Returns the latest frame, or None if no frame has been captured yet. """
+        with self._cond:
+            if self._count == 0:
+                return None
+            return self._frames[(self._count - 1) % self.size]
+
+    def first_newer_than(self, t: float) -> Frame | None:
+        """ Returns the oldest frame in the ring captured after time t, or None if there is none yet.
+        @param t: A time.monotonic() time.
+        """
+        with self._cond:
+            return self._first_newer_than(t)
+
+    def _first_newer_than(self, t: float) -> Frame | None:
+        for i in range(max(0, self._count - self.size), self._count):
+            frame = self._frames[i % self.size]
+            if frame is not None and frame.timestamp > t:
+                return frame
+        return None
+
+    def wait_newer_than(self, t: float, timeout: float = 1.0) -> Frame | None:
+        """ Waits for a frame captured after time t.
+        @param t: A time.monotonic() time.
+        @param timeout: The max time to wait in seconds.
+        @return: The oldest frame captured after t, or None on timeout.
+        """
+        with self._cond:
+            frame = self._first_newer_than(t)
+            end_time = time.monotonic() + timeout
+            while frame is None:
+                remaining = end_time - time.monotonic()
+                if remaining <= 0 or not self._run:
+                    return None
+                self._cond.wait(remaining)
+                frame = self._first_newer_than(t)
+            return frame
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import cv2
+import numpy as np
+
+
+# Conversions from the colour space of the image to the wanted colour space. Each entry holds the cv2 code
+# for the normal case and for the case where the red and blue channels are swapped first. None means the
+# image is already in the wanted format.
+_CONVERSIONS = {
+    ('BGRA', 'BGRA'): (None, cv2.COLOR_BGRA2RGBA),
+    ('BGRA', 'BGR'): (cv2.COLOR_BGRA2BGR, cv2.COLOR_BGRA2RGB),
+    ('BGRA', 'RGB'): (cv2.COLOR_BGRA2RGB, cv2.COLOR_BGRA2BGR),
+    ('BGRA', 'HSV'): (cv2.COLOR_BGR2HSV, cv2.COLOR_RGB2HSV),
+    ('BGRA', 'GRAY'): (cv2.COLOR_BGRA2GRAY, cv2.COLOR_RGBA2GRAY),
+    ('BGR', 'BGR'): (None, cv2.COLOR_BGR2RGB),
+    ('BGR', 'BGRA'): (cv2.COLOR_BGR2BGRA, cv2.COLOR_RGB2BGRA),
+    ('BGR', 'RGB'): (cv2.COLOR_BGR2RGB, None),
+    ('BGR', 'HSV'): (cv2.COLOR_BGR2HSV, cv2.COLOR_RGB2HSV),
+    ('BGR', 'GRAY'): (cv2.COLOR_BGR2GRAY, cv2.COLOR_RGB2GRAY),
+    ('GRAY', 'BGR'): (cv2.COLOR_GRAY2BGR, cv2.COLOR_GRAY2BGR),
+    ('GRAY', 'BGRA'): (cv2.COLOR_GRAY2BGRA, cv2.COLOR_GRAY2BGRA),
+    ('GRAY', 'RGB'): (cv2.COLOR_GRAY2RGB, cv2.COLOR_GRAY2RGB),
+}
+
+
+class Frame:
+    """ An image (a screen grab or a region of one) that knows its colour space.
+    Conversions to other colour spaces are made on first use and kept, so all the consumers of a frame
+    (filters, template matching, OCR) share one HSV, gray or BGR image instead of each converting it.
+    Images held by the frame are shared, so treat them as read only and copy before drawing on them.
+    """
+
+    def __init__(self, image, color_space: str = 'BGRA', timestamp: float = 0.0, swap_rb: bool = False):
+        """
+        @param image: The image.
+        @param color_space: The colour space of the image, 'BGRA', 'BGR' or 'GRAY'.
+        @param timestamp: The time.monotonic() time the image was captured.
+        @param swap_rb: Swap the red and blue channels before converting. The region filters were tuned
+        on the red/blue swapped image returned by Screen.get_screen(rgb=True), this reproduces it.
+        """
+        self.image = image
+        self.color_space = color_space
+        self.timestamp = timestamp
+        self.swap_rb = swap_rb
+        self._converted = {}  # Converted images by (colour space, swap_rb). Shared with views.
+        self._regions = {}  # Region frames by rect
+
+    @classmethod
+    def from_image(cls, image, timestamp: float = 0.0) -> Frame:
+        """ Creates a frame from an image, working out the colour space from the number of channels. """
+        if image.ndim == 2:
+            return cls(image, 'GRAY', timestamp)
+        elif image.shape[2] == 4:
+            return cls(image, 'BGRA', timestamp)
+        else:
+            return cls(image, 'BGR', timestamp)
+
+    @property
+    def width(self) -> int:
+        return self.image.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.image.shape[0]
+
+    def get(self, color_space: str, swap_rb: bool | None = None):
+        """ Returns the image in the given colour space, converting it on first use.
+        @param color_space: 'BGRA', 'BGR', 'RGB', 'HSV' or 'GRAY'.
+        @param swap_rb: Swap red and blue before converting. If None, the frame setting is used.
+        @return: The (read only) image.
+        """
+        if swap_rb is None:
+            swap_rb = self.swap_rb
+
+        key = (color_space, swap_rb)
+        image = self._converted.get(key)
+        if image is not None:
+            return image
+
+        if color_space == self.color_space and (not swap_rb or color_space == 'GRAY'):
+            return self.image
+
+        codes = _CONVERSIONS.get((self.color_space, color_space))
+        if codes is None:
+            # No direct conversion (i.e. GRAY to HSV), so go through BGR.
+            if self.color_space == 'GRAY':
+                image = cv2.cvtColor(self.get('BGR'), _CONVERSIONS[('BGR', color_space)][0])
+            else:
+                raise ValueError(f"Cannot convert a {self.color_space} frame to {color_space}.")
+        else:
+            code = codes[1] if swap_rb else codes[0]
+            if code is None:
+                return self.image
+            image = cv2.cvtColor(self.image, code)
+
+        image.flags.writeable = False
+        self._converted[key] = image
+        return image
+
+    def get_channels(self, color_space: str, swap_rb: bool | None = None) -> tuple:
+        """ Returns the separate channels of the image in the given colour space (i.e. H, S and V).
+        The split is done on first use and kept with the converted image.
+        """
+        if swap_rb is None:
+            swap_rb = self.swap_rb
+
+        key = (color_space + '_split', swap_rb)
+        channels = self._converted.get(key)
+        if channels is None:
+            channels = tuple(cv2.split(self.get(color_space, swap_rb)))
+            self._converted[key] = channels
+        return channels
+
+    def view(self, swap_rb: bool) -> Frame:
+        """ Returns a frame of the same image with a different red/blue swap setting.
+        The view shares the converted images with this frame. """
+        if swap_rb == self.swap_rb:
+            return self
+        view = Frame(self.image, self.color_space, self.timestamp, swap_rb)
+        view._converted = self._converted
+        view._regions = self._regions
+        return view
+
+    def region(self, x_left: int, y_top: int, x_right: int, y_bot: int) -> Frame:
+        """ Returns a frame of a region of this frame, without copying the image. The region frames are kept,
+        so the same region requested by different detectors shares its converted images.
+        @param x_left: Left in pixels.
+        @param y_top: Top in pixels.
+        @param x_right: Right in pixels.
+        @param y_bot: Bottom in pixels.
+        """
+        key = (x_left, y_top, x_right, y_bot)
+        reg = self._regions.get(key)
+        if reg is None:
+            reg = Frame(self.image[y_top:y_bot, x_left:x_right], self.color_space, self.timestamp)
+            self._regions[key] = reg
+        return reg.view(self.swap_rb)
+
+
+def as_frame(image) -> Frame | None:
+    """ Returns the image as a frame. Frames are returned unchanged, numpy images are wrapped. """
+    if image is None or isinstance(image, Frame):
+        return image
+    return Frame.from_image(np.asarray(image))
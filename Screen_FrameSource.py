@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from EDlogger import logger
+from Screen_Frame import Frame
+
+
+class FrameSource:
+    """ Where Screen gets its frames from. The live source grabs the Elite Dangerous monitor, the others
+    replay images, videos or recorded sessions so the vision code can be run and benchmarked without the game.
+    """
+
+    def get_size(self) -> (int, int):
+        """ Returns the (width, height) of the frames in pixels. """
+        raise NotImplementedError
+
+    def grab(self) -> Frame | None:
+        """ Returns the next frame. The image is read only and is not written by later grabs, so it can be kept. """
+        raise NotImplementedError
+
+    def close(self):
+        """ Releases any resources held by the source. """
+        pass
+
+
+class MssFrameSource(FrameSource):
+    """ Grabs a monitor using mss. """
+
+    def __init__(self, sct, monitor: dict, monitor_number: int):
+        """
+        @param sct: The mss instance.
+        @param monitor: The mss monitor dict (left, top, width, height).
+        @param monitor_number: The mss monitor number.
+        """
+        self.sct = sct
+        self.monitor = {
+            "top": monitor["top"],
+            "left": monitor["left"],
+            "width": int(monitor["width"]),
+            "height": int(monitor["height"]),
+            "mon": monitor_number,
+        }
+
+    def get_size(self) -> (int, int):
+        return self.monitor["width"], self.monitor["height"]
+
+    def grab(self) -> Frame | None:
+        shot = self.sct.grab(self.monitor)
+        # Wrap the raw BGRA buffer without copying. Read only as slices of it are shared between detectors.
+        image = np.frombuffer(shot.raw, dtype=np.uint8).reshape((shot.height, shot.width, 4))
+        image.flags.writeable = False
+        return Frame(image, 'BGRA', time.monotonic())
+
+
+class ImageFolderFrameSource(FrameSource):
+    """ Replays the images (png/jpg) in a folder in name order. All the images should be the same
+    resolution (see rescale_screenshots in Test_Routines.py). """
+
+    def __init__(self, path: str, loop: bool = True):
+        """
+        @param path: The folder of images.
+        @param loop: True to restart from the first image after the last, False to hold the last image.
+        """
+        self.files = sorted(glob.glob(os.path.join(path, '*.png')) + glob.glob(os.path.join(path, '*.jpg')))
+        if len(self.files) == 0:
+            raise ValueError(f"No images found in '{path}'.")
+        self.loop = loop
+        self.finished = False
+        self._index = 0
+        self._last = None
+        first = cv2.imread(self.files[0], cv2.IMREAD_COLOR)
+        self._size = (first.shape[1], first.shape[0])
+
+    def get_size(self) -> (int, int):
+        return self._size
+
+    def grab(self) -> Frame | None:
+        if self._index >= len(self.files):
+            if not self.loop:
+                self.finished = True
+                return self._last
+            self._index = 0
+
+        image = cv2.imread(self.files[self._index], cv2.IMREAD_COLOR)
+        self._index = self._index + 1
+        if image is None:
+            logger.warning(f"Could not read image '{self.files[self._index - 1]}'.")
+            return self._last
+
+        image.flags.writeable = False
+        self._last = Frame(image, 'BGR', time.monotonic())
+        return self._last
+
+
+class VideoFrameSource(FrameSource):
+    """ Replays a video file (any format OpenCV can read). """
+
+    def __init__(self, path: str, loop: bool = True):
+        """
+        @param path: The video file.
+        @param loop: True to restart from the first frame after the last, False to hold the last frame.
+        """
+        self.path = path
+        self.loop = loop
+        self.finished = False
+        self._last = None
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video '{path}'.")
+        self._size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def get_size(self) -> (int, int):
+        return self._size
+
+    def grab(self) -> Frame | None:
+        ret, image = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, image = self.cap.read()
+        if not ret:
+            self.finished = True
+            return self._last
+
+        image.flags.writeable = False
+        self._last = Frame(image, 'BGR', self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+        return self._last
+
+    def close(self):
+        self.cap.release()
+
+
+class RecordedSessionFrameSource(FrameSource):
+    """ Replays the frames of a recorded session, one frame per grab, as fast as they are requested.
+    A session is a folder holding:
+      session.json - {"width", "height", "color_space", "rect", "scale", "chunk_size"}. The screen size, the
+        rect [L, T, R, B] (in pixels) of the screen that was recorded and the scale it was stored at.
+      frames_NNNNN.npy - chunks of frames as (n, h, w, channels) uint8 arrays, memory mapped when read.
+      index.jsonl - one json record per line. Frame records are {"type": "frame", "time": t, "frame": n}
+        where n is the frame number across all chunks. The other records (status, journal and keys, written by
+        SessionRecorder) are kept in 'records' for tests and benchmarks to compare against.
+    """
+
+    def __init__(self, path: str):
+        """
+        @param path: The session folder.
+        """
+        self.path = path
+        self.finished = False
+        with open(os.path.join(path, 'session.json'), 'r') as fp:
+            self.header = json.load(fp)
+        self._size = (int(self.header['width']), int(self.header['height']))
+        self.color_space = self.header.get('color_space', 'BGRA')
+        self.rect = self.header.get('rect', [0, 0, self._size[0], self._size[1]])
+        self.chunk_size = int(self.header['chunk_size'])
+
+        self.frame_times = []
+        self.records = []
+        with open(os.path.join(path, 'index.jsonl'), 'r') as fp:
+            for line in fp:
+                rec = json.loads(line)
+                if rec.get('type') == 'frame':
+                    self.frame_times.append((rec['frame'], rec['time']))
+                else:
+                    self.records.append(rec)
+        if len(self.frame_times) == 0:
+            raise ValueError(f"No frames found in session '{path}'.")
+
+        self._chunks = {}  # Memory mapped chunks by chunk number
+        self._index = 0
+        self._last = None
+
+    def get_size(self) -> (int, int):
+        return self._size
+
+    def _get_chunk(self, chunk_num: int):
+        chunk = self._chunks.get(chunk_num)
+        if chunk is None:
+            chunk = np.load(os.path.join(self.path, f'frames_{chunk_num:05d}.npy'), mmap_mode='r')
+            self._chunks[chunk_num] = chunk
+        return chunk
+
+    def grab(self) -> Frame | None:
+        if self._index >= len(self.frame_times):
+            self.finished = True
+            return self._last
+
+        frame_num, frame_time = self.frame_times[self._index]
+        self._index = self._index + 1
+        image = self._get_chunk(frame_num // self.chunk_size)[frame_num % self.chunk_size]
+
+        # Place the recorded rect back on a full screen image at full size
+        left, top, right, bot = self.rect
+        if image.shape[1] != right - left or image.shape[0] != bot - top:
+            image = cv2.resize(image, (right - left, bot - top), interpolation=cv2.INTER_LINEAR)
+        if [left, top, right, bot] != [0, 0, self._size[0], self._size[1]]:
+            full = np.zeros((self._size[1], self._size[0]) + image.shape[2:], dtype=np.uint8)
+            full[top:bot, left:right] = image
+            image = full
+
+        image = np.ascontiguousarray(image)
+        image.flags.writeable = False
+        self._last = Frame(image, self.color_space, frame_time)
+        return self._last
+
+    def seek(self, t: float):
+        """ Moves the replay to the first frame recorded at or after time t. """
+        self._index = len(self.frame_times)
+        for i, (frame_num, frame_time) in enumerate(self.frame_times):
+            if frame_time >= t:
+                self._index = i
+                break
+        self.finished = False
+
+
+def create_frame_source(kind: str, path: str = '') -> FrameSource | None:
+    """ Creates a frame source from its config name.
+    @param kind: 'live', 'images', 'video' or 'session'.
+    @param path: The folder or file for the non-live sources.
+    @return: The frame source, or None for 'live' as Screen creates that itself once it has found the ED monitor.
+    """
+    kind = kind.lower()
+    if kind == 'live':
+        return None
+    elif kind == 'images':
+        return ImageFolderFrameSource(path)
+    elif kind == 'video':
+        return VideoFrameSource(path)
+    elif kind == 'session':
+        return RecordedSessionFrameSource(path)
+    else:
+        raise ValueError(f"Unknown frame source '{kind}'. Use 'live', 'images', 'video' or 'session'.")
@@ -1,3 +1,4 @@
+import threading
 from copy import copy
 
 import numpy as np
@@ -5,6 +6,8 @@ from numpy import array, sum
 import cv2
 from datetime import datetime
 
+from Screen_Frame import as_frame
+
 """
 File:Screen_Regions.py    
 
@@ -67,6 +70,126 @@ class Screen_Regions:
             self.reg[key]['width']  = self.reg[key]['rect'][2] - self.reg[key]['rect'][0]
             self.reg[key]['height'] = self.reg[key]['rect'][3] - self.reg[key]['rect'][1]
 
+        # Temporal ROI tracking. For these (region, template) pairs, the next match first searches a small window
+        # around the last match and only searches the whole region if the match in the window is below threshold.
+        self.roi_pad = 0.5  # Window padding each side, as a fraction of the template width/height
+        self.roi_tracking = {}  # Threshold by (region name, template name)
+        self._roi_last = {}  # Last match location and template size by (region name, template name)
+        self.set_roi_tracking('compass', 'compass', self.compass_match_thresh)
+        self.set_roi_tracking('target', 'target', self.target_thresh)
+        self.set_roi_tracking('target_occluded', 'target_occluded', self.target_occluded_thresh)
+
+        # Adaptive channel selection for the x3 matches. For these templates, only the channel that has been winning
+        # is matched while its match clears the threshold. All three are matched on a miss or every audit period.
+        self.channel_audit_period = 20  # Match all channels every n matches of a template
+        self.channel_thresh = {  # Threshold by template name
+            'compass': self.compass_match_thresh,
+            'navpoint': self.navpoint_match_thresh,
+            'navpoint-behind': self.navpoint_match_thresh,
+        }
+        self.channel_stats = {}  # Channel wins (decaying, in H, S, V order), match and single channel counts by template
+
+        # The region filters, compiled on first use (see RegionFilter)
+        self._filters = {}  # RegionFilter by region name
+        self._local = threading.local()  # The CLAHE object of equalize(), per thread as CLAHE is not thread safe
+        self.color_lut_regions = set()  # Regions whose colour filter uses a lookup table (see ColorLut)
+
+        # Pyramid matching. For these regions, a search of the whole region matches a downsampled region and
+        # template to find a candidate, then matches at full resolution in a small window around it.
+        self.pyramid_levels = {}  # Levels (each halves the resolution) by region name, none by default
+
+    def set_pyramid_levels(self, region_name, levels: int):
+        """ Set the pyramid levels for searching a region (0 to search at full resolution only).
+        See pyramid_matching_benchmark in Test_Routines.py for the speed and accuracy on the test images. """
+        self.pyramid_levels[region_name] = levels
+
+    def set_roi_tracking(self, region_name, templ_name, thresh):
+        """ Enable ROI tracking of a template in a region.
+        @param thresh: The match threshold (0.0 - 1.0) to accept a match in the window around the last match.
+        """
+        self.roi_tracking[(region_name, templ_name)] = thresh
+
+    def clear_roi_tracking(self):
+        """ Forget the last match locations, so the next matches search the whole regions. """
+        self._roi_last.clear()
+
+    def _match_tracked(self, region_name, templ_name, images, templ, match_fn):
+        """ Match a template, first in a window around the last match if the pair is ROI tracked.
+        @param images: The region images to match in (one image, or the H, S and V channels).
+        @param templ: The template image.
+        @param match_fn: Function matching a template in a list of images, match_fn(images, templ), returning the
+        detail of match (minVal, maxVal, minLoc, maxLoc) and the match mask.
+        Returns the detail of match in region coordinates and the match mask (of the window if matched there).
+        """
+        key = (region_name, templ_name)
+        thresh = self.roi_tracking.get(key)
+        if thresh is None:
+            return self._match_full(region_name, images, templ, match_fn)
+
+        templ_hgt, templ_wid = templ.shape[:2]
+        last = self._roi_last.get(key)
+        if last is not None and last[1] == (templ_hgt, templ_wid):
+            # Search a window around the last match
+            (x, y) = last[0]
+            img_hgt, img_wid = images[0].shape[:2]
+            pad_x = max(int(templ_wid * self.roi_pad), 4)
+            pad_y = max(int(templ_hgt * self.roi_pad), 4)
+            left = max(0, x - pad_x)
+            top = max(0, y - pad_y)
+            right = min(img_wid, x + templ_wid + pad_x)
+            bot = min(img_hgt, y + templ_hgt + pad_y)
+            match_result, match = self.match_window(images, templ, match_fn, (left, top, right, bot))
+            if match_result[1] >= thresh:
+                self._roi_last[key] = (match_result[3], (templ_hgt, templ_wid))
+                return match_result, match
+
+        # Search the whole region
+        match_result, match = self._match_full(region_name, images, templ, match_fn)
+        if match_result[1] >= thresh:
+            self._roi_last[key] = (match_result[3], (templ_hgt, templ_wid))
+        else:
+            self._roi_last.pop(key, None)
+        return match_result, match
+
+    def _match_full(self, region_name, images, templ, match_fn):
+        """ Match a template in the whole region, using a pyramid if set for the region. """
+        levels = self.pyramid_levels.get(region_name, 0)
+        if levels > 0:
+            return self.match_pyramid(images, templ, match_fn, levels)
+        return match_fn(images, templ)
+
+    @staticmethod
+    def match_window(images, templ, match_fn, window):
+        """ Match a template in a window of the images.
+        @param window: The window [L, T, R, B] in pixels.
+        Returns the detail of match in image coordinates and the match mask of the window. """
+        left, top, right, bot = window
+        (minVal, maxVal, minLoc, maxLoc), match = match_fn([img[top:bot, left:right] for img in images], templ)
+        return (minVal, maxVal, (minLoc[0] + left, minLoc[1] + top), (maxLoc[0] + left, maxLoc[1] + top)), match
+
+    @staticmethod
+    def match_pyramid(images, templ, match_fn, levels: int):
+        """ Match a template coarse to fine. The images and template are downsampled by 2^levels and matched to
+        find a candidate, which is then refined at full resolution in a window of 2^levels pixels around it.
+        Returns the detail of match in image coordinates and the match mask of the window. """
+        factor = 2 ** levels
+        templ_hgt, templ_wid = templ.shape[:2]
+        if min(templ_hgt, templ_wid) // factor < 8:
+            # Too little of the template left to match
+            return match_fn(images, templ)
+
+        small_images = [cv2.resize(img, (0, 0), fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+                        for img in images]
+        small_templ = cv2.resize(templ, (0, 0), fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+        (minVal, maxVal, minLoc, maxLoc), match = match_fn(small_images, small_templ)
+
+        img_hgt, img_wid = images[0].shape[:2]
+        left = max(0, maxLoc[0] * factor - factor)
+        top = max(0, maxLoc[1] * factor - factor)
+        right = min(img_wid, maxLoc[0] * factor + templ_wid + factor)
+        bot = min(img_hgt, maxLoc[1] * factor + templ_hgt + factor)
+        return Screen_Regions.match_window(images, templ, match_fn, (left, top, right, bot))
+
     def capture_region(self, screen, region_name):
         """ Just grab the screen based on the region name/rect.
         Returns an unfiltered image. """
@@ -74,14 +197,36 @@ class Screen_Regions:
 
     def capture_region_filtered(self, screen, region_name, inv_col=True):
         """ Grab screen region and call its filter routine.
+        The region is passed to the filter as a Frame, so regions sharing a rect also share the colour conversion.
+        @param inv_col: True to swap red and blue before filtering, which is what the filter ranges were tuned on.
         Returns the filtered image. """
-        scr = screen.get_screen_region(self.reg[region_name]['rect'], inv_col)
+        region = screen.get_frame_region(self.reg[region_name]['rect'])
+        if region is None:
+            return None
         if self.reg[region_name]['filterCB'] is None:
-            # return the screen region untouched in BGRA format.
-            return scr
+            # return the screen region untouched in BGRA format (or RGB if inv_col).
+            return region.get('RGB') if inv_col else region.image
         else:
             # return the screen region in the format returned by the filter.
-            return self.reg[region_name]['filterCB'](scr, self.reg[region_name]['filter'])
+            return self.get_region_filter(region_name).apply(region.view(inv_col))
+
+    def get_region_filter(self, region_name):
+        """ Returns the compiled filter of a region, compiling it again if the region's filter has changed. """
+        reg = self.reg[region_name]
+        use_lut = region_name in self.color_lut_regions
+        region_filter = self._filters.get(region_name)
+        if region_filter is None or not region_filter.is_for(reg['filterCB'], reg['filter'], use_lut):
+            region_filter = RegionFilter(self, reg['filterCB'], reg['filter'], use_lut)
+            self._filters[region_name] = region_filter
+        return region_filter
+
+    def set_color_lut(self, region_name, enabled: bool):
+        """ Use a lookup table for the region's colour filter instead of converting to HSV.
+        See color_lut_benchmark in Test_Routines.py for the speed and accuracy on the test images. """
+        if enabled:
+            self.color_lut_regions.add(region_name)
+        else:
+            self.color_lut_regions.discard(region_name)
 
     def match_template_in_region(self, region_name, templ_name, inv_col=True):
         """ Attempt to match the given template in the given region which is filtered using the region filter.
@@ -94,42 +239,73 @@ class Screen_Regions:
         # cv2.imwrite(f'test/match/{templ_name} {x} region.png', img_region)
         # cv2.imwrite(f'test/match/{templ_name} {x} templ.png', img_templ)
 
-        match = cv2.matchTemplate(img_region, img_templ, cv2.TM_CCOEFF_NORMED)
-        (minVal, maxVal, minLoc, maxLoc) = cv2.minMaxLoc(match)
-        return img_region, (minVal, maxVal, minLoc, maxLoc), match
+        match_result, match = self._match_tracked(region_name, templ_name, [img_region], img_templ, self.match_image)
+        return img_region, match_result, match
+
+    def capture_regions_filtered(self, region_names, inv_cols):
+        """ Grab several regions sharing the same rect and apply each region's filter, converting to HSV once.
+        The colour filters of regions with inv_col are applied to the normal HSV image with their hue ranges
+        mirrored (see swap_rb_hsv_range), rather than converting the red/blue swapped image as well.
+        @param region_names: The region names.
+        @param inv_cols: The inv_col setting for each region, as capture_region_filtered.
+        Returns the filtered images, in region order. """
+        rect = self.reg[region_names[0]]['rect']
+        region = self.screen.get_frame_region(rect)
+        if region is None:
+            return [None] * len(region_names)
+
+        images = []
+        for region_name, inv_col in zip(region_names, inv_cols):
+            reg = self.reg[region_name]
+            if reg['rect'] != rect or reg['filterCB'] != self.filter_by_color or region_name in self.color_lut_regions:
+                images.append(self.capture_region_filtered(self.screen, region_name, inv_col))
+                continue
+
+            images.append(self.get_region_filter(region_name).apply_hsv(region.get('HSV', swap_rb=False), inv_col))
+        return images
+
+    def match_templates_in_region(self, region_names, templ_names, inv_cols):
+        """ Match templates in several regions sharing the same rect, from one grab and one HSV conversion
+        (see capture_regions_filtered). Each match is as match_template_in_region.
+        Returns a list of the filtered image, detail of match and the match mask, in region order. """
+        img_regions = self.capture_regions_filtered(region_names, inv_cols)
+        results = []
+        for region_name, templ_name, img_region in zip(region_names, templ_names, img_regions):
+            img_templ = self.templates.template[templ_name]['image']
+            match_result, match = self._match_tracked(region_name, templ_name, [img_region], img_templ, self.match_image)
+            results.append((img_region, match_result, match))
+        return results
+
+    @staticmethod
+    def swap_rb_hsv_range(color_range):
+        """ Converts an HSV colour range tuned on the red/blue swapped image to ranges for the normal image.
+        Swapping red and blue mirrors the hue (h -> 240 - h deg, or 120 - H in OpenCV's 0-180 hue), while
+        saturation and value do not change. The mirrored range is split in two if it wraps past 0.
+        @param color_range: [low, high] HSV arrays.
+        Returns a list of [low, high] HSV arrays. """
+        low, high = color_range
+        h_low = 120 - int(high[0])
+        h_high = 120 - int(low[0])
+        if h_low < 0 and h_high < 0:
+            h_low = h_low + 180
+            h_high = h_high + 180
+        if h_low >= 0:
+            return [[array([h_low, low[1], low[2]]), array([h_high, high[1], high[2]])]]
+        return [[array([h_low + 180, low[1], low[2]]), array([179, high[1], high[2]])],
+                [array([0, low[1], low[2]]), array([h_high, high[1], high[2]])]]
 
     def match_template_in_region_x3(self, region_name, templ_name, inv_col=True):
         """ Attempt to match the given template in the given region which is unfiltered.
         The region's image is split into separate HSV channels, each channel tested and the best result kept.
         Returns the image, detail of match and the match mask. """
-        img_region = self.screen.get_screen_region(self.reg[region_name]['rect'], rgb=False)
+        region = self.screen.get_frame_region(self.reg[region_name]['rect'])
         templ = self.templates.template[templ_name]['image']
 
-        # Convert to HSV and split.
-        img_hsv = cv2.cvtColor(img_region, cv2.COLOR_BGR2HSV)
-        h, s, v = cv2.split(img_hsv)
-        # hsv_comb = np.concatenate((h, s, v), axis=1)  # Combine 3 images
-        # cv2.imshow("Split HSV", hsv_comb)
-
-        # Perform matches
-        match_h = cv2.matchTemplate(h, templ, cv2.TM_CCOEFF_NORMED)
-        match_s = cv2.matchTemplate(s, templ, cv2.TM_CCOEFF_NORMED)
-        match_v = cv2.matchTemplate(v, templ, cv2.TM_CCOEFF_NORMED)
-        (minVal_h, maxVal_h, minLoc_h, maxLoc_h) = cv2.minMaxLoc(match_h)
-        (minVal_s, maxVal_s, minLoc_s, maxLoc_s) = cv2.minMaxLoc(match_s)
-        (minVal_v, maxVal_v, minLoc_v, maxLoc_v) = cv2.minMaxLoc(match_v)
-        # match_comb = np.concatenate((match_h, match_s, match_v), axis=1)  # Combine 3 images
-        # cv2.imshow("Split Matches", match_comb)
-
-        # Get best result
-        # V is likely the best match, so check it first
-        if maxVal_v > maxVal_s and maxVal_v > maxVal_h:
-            return img_region, (minVal_v, maxVal_v, minLoc_v, maxLoc_v), match_v
-        # S is likely the 2nd best match, so check it
-        if maxVal_s > maxVal_h:
-            return img_region, (minVal_s, maxVal_s, minLoc_s, maxLoc_s), match_s
-        # H must be the best match
-        return img_region, (minVal_h, maxVal_h, minLoc_h, maxLoc_h), match_h
+        # Convert to HSV and split (shared with other matches on this region of the frame).
+        channels = region.get_channels('HSV', swap_rb=False)
+        match_result, match = self._match_tracked(region_name, templ_name, channels, templ,
+                                                  lambda images, t: self.match_channels_adaptive(templ_name, images, t))
+        return region.image, match_result, match
 
     def match_template_in_image(self, image, template):
         """ Attempt to match the given template in the (unfiltered) image.
@@ -141,12 +317,112 @@ class Screen_Regions:
     def match_template_in_image_x3(self, image, templ_name):
         """ Attempt to match the given template in the (unfiltered) image.
         The image is split into separate HSV channels, each channel tested and the best result kept.
+        @param image: The image, or a Frame to share the HSV conversion between several templates.
         Returns the original image, detail of match and the match mask. """
         templ = self.templates.template[templ_name]['image']
 
         # Convert to HSV and split.
-        img_hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        h, s, v = cv2.split(img_hsv)
+        channels = as_frame(image).get_channels('HSV')
+        match_result, match = self.match_channels_adaptive(templ_name, channels, templ)
+        return image, match_result, match
+
+    def match_channels_adaptive(self, templ_name, channels, templ):
+        """ Match the template in the H, S and V channels like match_channels_x3, but if the template has a
+        channel threshold, first match only the channel that has been winning. The other channels are matched if
+        that is below the threshold, or every channel_audit_period matches to keep the statistics current.
+        @param templ_name: The template name, for the statistics.
+        @param channels: The (h, s, v) channel images.
+        @param templ: The template image.
+        Returns the detail of match (minVal, maxVal, minLoc, maxLoc) and the match mask. """
+        thresh = self.channel_thresh.get(templ_name)
+        if thresh is None:
+            return self.match_channels_x3(channels, templ)
+
+        stats = self.channel_stats.setdefault(templ_name, {'wins': [0.0, 0.0, 0.0], 'count': 0, 'single': 0})
+        stats['count'] = stats['count'] + 1
+        wins = stats['wins']
+        results = [None, None, None]
+        if sum(wins) > 0 and stats['count'] % self.channel_audit_period != 0:
+            # Match the dominant channel only (V, then S, then H on equal wins)
+            dominant = max((2, 1, 0), key=lambda i: wins[i])
+            results[dominant] = self.match_image([channels[dominant]], templ)
+            if results[dominant][0][1] >= thresh:
+                stats['single'] = stats['single'] + 1
+                return results[dominant]
+
+        # Match the remaining channels and keep the best, as match_channels_x3
+        for i in range(3):
+            if results[i] is None:
+                results[i] = self.match_image([channels[i]], templ)
+        max_h, max_s, max_v = [res[0][1] for res in results]
+        if max_v > max_s and max_v > max_h:
+            best = 2
+        elif max_s > max_h:
+            best = 1
+        else:
+            best = 0
+
+        # Older wins count for less, so the dominant channel follows changes in lighting and HUD colour
+        for i in range(3):
+            wins[i] = wins[i] * 0.9
+        wins[best] = wins[best] + 1.0
+        return results[best]
+
+    @staticmethod
+    def subpixel_peak(match, loc) -> (float, float):
+        """ Refine the location of a match peak to sub-pixel accuracy by fitting a parabola through the peak and
+        its neighbours, in x and in y.
+        @param match: The match mask.
+        @param loc: The (x, y) of the peak in the mask (i.e. maxLoc).
+        Returns the refined (x, y). Peaks on the edge of the mask are not refined in that direction. """
+        x, y = loc
+        dx = 0.0
+        dy = 0.0
+        if 0 < x < match.shape[1] - 1:
+            left, center, right = float(match[y, x - 1]), float(match[y, x]), float(match[y, x + 1])
+            den = left - 2 * center + right
+            if den < 0:
+                dx = max(min(0.5 * (left - right) / den, 0.5), -0.5)
+        if 0 < y < match.shape[0] - 1:
+            top, center, bot = float(match[y - 1, x]), float(match[y, x]), float(match[y + 1, x])
+            den = top - 2 * center + bot
+            if den < 0:
+                dy = max(min(0.5 * (top - bot) / den, 0.5), -0.5)
+        return x + dx, y + dy
+
+    @staticmethod
+    def refine_match_loc(image, templ, loc) -> (float, float):
+        """ Refine a match location to sub-pixel accuracy, by matching the template at the location and its
+        neighbours only (so it does not need the match mask, which may be of a window or a pyramid level).
+        @param image: The image the template was matched in.
+        @param templ: The template image.
+        @param loc: The (x, y) of the match in the image (i.e. maxLoc).
+        Returns the refined (x, y). """
+        x, y = loc
+        templ_hgt, templ_wid = templ.shape[:2]
+        left = max(0, x - 1)
+        top = max(0, y - 1)
+        right = min(image.shape[1], x + templ_wid + 1)
+        bot = min(image.shape[0], y + templ_hgt + 1)
+        match = cv2.matchTemplate(image[top:bot, left:right], templ, cv2.TM_CCOEFF_NORMED)
+        sx, sy = Screen_Regions.subpixel_peak(match, (x - left, y - top))
+        return sx + left, sy + top
+
+    @staticmethod
+    def match_image(images, templ):
+        """ Match the template in a single image.
+        @param images: A list holding the image.
+        Returns the detail of match (minVal, maxVal, minLoc, maxLoc) and the match mask. """
+        match = cv2.matchTemplate(images[0], templ, cv2.TM_CCOEFF_NORMED)
+        return cv2.minMaxLoc(match), match
+
+    @staticmethod
+    def match_channels_x3(channels, templ):
+        """ Match the template in each of the H, S and V channels and keep the best result.
+        @param channels: The (h, s, v) channel images.
+        @param templ: The template image.
+        Returns the detail of match (minVal, maxVal, minLoc, maxLoc) and the match mask. """
+        h, s, v = channels
         # hsv_comb = np.concatenate((h, s, v), axis=1)  # Combine 3 images
         # cv2.imshow("Split HSV", hsv_comb)
 
@@ -163,18 +439,21 @@ class Screen_Regions:
         # Get best result
         # V is likely the best match, so check it first
         if maxVal_v > maxVal_s and maxVal_v > maxVal_h:
-            return image, (minVal_v, maxVal_v, minLoc_v, maxLoc_v), match_v
+            return (minVal_v, maxVal_v, minLoc_v, maxLoc_v), match_v
         # S is likely the 2nd best match, so check it
         if maxVal_s > maxVal_h:
-            return image, (minVal_s, maxVal_s, minLoc_s, maxLoc_s), match_s
+            return (minVal_s, maxVal_s, minLoc_s, maxLoc_s), match_s
         # H must be the best match
-        return image, (minVal_h, maxVal_h, minLoc_h, maxLoc_h), match_h
+        return (minVal_h, maxVal_h, minLoc_h, maxLoc_h), match_h
 
     def equalize(self, image=None, noOp=None):
         # Load the image in greyscale
-        img_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        # create a CLAHE object (Arguments are optional).  Histogram equalization, improves constrast
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        img_gray = as_frame(image).get('GRAY')
+        # CLAHE (created once a thread). Histogram equalization, improves constrast
+        clahe = getattr(self._local, 'clahe', None)
+        if clahe is None:
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            self._local.clahe = clahe
         img_out = clahe.apply(img_gray)
 
         return img_out
@@ -184,7 +463,7 @@ class Screen_Regions:
         Returns the filtered image. Pixels within the color range are returned
         their original color, otherwise black."""
         # converting from BGR to HSV color space
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        hsv = as_frame(image).get('HSV')
         # filter passed in color low, high
         filtered = cv2.inRange(hsv, color_range[0], color_range[1])
 
@@ -204,7 +483,7 @@ class Screen_Regions:
 
     # need to compare filter_sun with filter_bright
     def filter_sun(self, image=None, noOp=None):
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        hsv = as_frame(image).get('GRAY')
         
         # set low end of filter to 25 to pick up the dull red Class L stars
         (thresh, blackAndWhiteImage) = cv2.threshold(hsv, self.sun_threshold, 255, cv2.THRESH_BINARY)
@@ -214,15 +493,170 @@ class Screen_Regions:
     # percent the image is white
     def sun_percent(self, screen):
         blackAndWhiteImage = self.capture_region_filtered(screen, 'sun')
- 
-        wht = sum(blackAndWhiteImage == 255)     
-        blk = sum(blackAndWhiteImage != 255)
 
-        result = int((wht / (wht+blk))*100)
+        result = int(RegionFilter.percent(blackAndWhiteImage))
 
         return result
 
 
+class RegionFilter:
+    """ A region's filter (filterCB and filter) compiled into a reusable object. It holds its CLAHE object and
+    colour ranges and writes into its own output buffers, so filtering a region every tick does not allocate.
+    The buffers and CLAHE object are per thread (i.e. the AP and SCO monitoring threads), so a filter used on
+    two threads does not mix the results. The returned image is overwritten by the next call for the region on
+    the same thread, so copy it to keep it.
+    Filters other than equalize, filter_by_color and filter_sun are called as before.
+    """
+
+    def __init__(self, screen_regions, filter_cb, filter_param, use_lut: bool = False):
+        """
+        @param screen_regions: The Screen_Regions (for the sun threshold).
+        @param filter_cb: The region filterCB.
+        @param filter_param: The region filter (i.e. the colour range).
+        @param use_lut: For a colour filter, use a ColorLut instead of converting to HSV.
+        """
+        self.screen_regions = screen_regions
+        self.filter_cb = filter_cb
+        self.filter_param = filter_param
+        self.use_lut = use_lut
+        self._local = threading.local()  # The output buffers (and CLAHE object) of each thread
+
+        if filter_cb == screen_regions.equalize:
+            self.kind = 'equalize'
+        elif filter_cb == screen_regions.filter_by_color:
+            self.kind = 'color'
+            self.ranges = [filter_param]
+            # The ranges for the normal image when the filter is for the red/blue swapped image
+            self.swapped_ranges = Screen_Regions.swap_rb_hsv_range(filter_param)
+        elif filter_cb == screen_regions.filter_sun:
+            self.kind = 'sun'
+        else:
+            self.kind = 'callback'
+
+    def is_for(self, filter_cb, filter_param, use_lut: bool) -> bool:
+        return self.filter_cb == filter_cb and self.filter_param is filter_param and self.use_lut == use_lut
+
+    @property
+    def _buffers(self) -> dict:
+        """ The output buffers of this thread by name. """
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = {}
+            self._local.buffers = buffers
+        return buffers
+
+    def _buffer(self, name, shape):
+        """ Returns the named output buffer of this thread, (re)allocated if the shape has changed. """
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self._buffers[name] = buf
+        return buf
+
+    def apply(self, frame):
+        """ Filter the region.
+        @param frame: The region Frame (or image).
+        Returns the filtered image. """
+        if self.kind == 'equalize':
+            gray = as_frame(frame).get('GRAY')
+            clahe = self._buffers.get('clahe')
+            if clahe is None:
+                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+                self._buffers['clahe'] = clahe
+            return clahe.apply(gray, self._buffer('out', gray.shape))
+        elif self.kind == 'color' and self.use_lut:
+            frame = as_frame(frame)
+            lut = ColorLut.get(self.ranges, frame.swap_rb)
+            return ColorLut.apply(frame.image, lut, self._buffer('out', frame.image.shape[:2]),
+                                  self._buffers.setdefault('lut', {}))
+        elif self.kind == 'color':
+            return self._in_ranges(as_frame(frame).get('HSV'), self.ranges)
+        elif self.kind == 'sun':
+            gray = as_frame(frame).get('GRAY')
+            out = self._buffer('out', gray.shape)
+            cv2.threshold(gray, self.screen_regions.sun_threshold, 255, cv2.THRESH_BINARY, out)
+            return out
+        else:
+            return self.filter_cb(frame, self.filter_param)
+
+    def apply_hsv(self, hsv, swapped: bool):
+        """ Apply a colour filter to the normal (not red/blue swapped) HSV image of the region.
+        @param swapped: True if the filter is for the red/blue swapped image.
+        Returns the filtered image. """
+        return self._in_ranges(hsv, self.swapped_ranges if swapped else self.ranges)
+
+    def _in_ranges(self, hsv, ranges):
+        out = self._buffer('out', hsv.shape[:2])
+        cv2.inRange(hsv, ranges[0][0], ranges[0][1], out)
+        if len(ranges) > 1:
+            tmp = self._buffer('tmp', hsv.shape[:2])
+            for color_range in ranges[1:]:
+                cv2.inRange(hsv, color_range[0], color_range[1], tmp)
+                cv2.bitwise_or(out, tmp, out)
+        return out
+
+    @staticmethod
+    def percent(image) -> float:
+        """ Returns the percent (0 - 100) of the (filtered) image that is not black. """
+        return cv2.countNonZero(image) * 100.0 / image.size
+
+
+class ColorLut:
+    """ HSV colour ranges precompiled into a lookup table indexed by the BGR colour quantised to 32 levels a
+    channel (32x32x32), so a mask is one gather over the pixels instead of an HSV conversion and inRange.
+    Each table cell holds the result for the centre colour of the cell, so pixels within 4 levels of a range
+    boundary may differ from the HSV filter.
+    """
+    _luts = {}  # Tables by (ranges, swap_rb), built once
+
+    @classmethod
+    def get(cls, ranges, swap_rb: bool):
+        """ Returns the table for the HSV ranges, building it on first use.
+        @param ranges: A list of [low, high] HSV ranges, a colour passes if it is in any of them.
+        @param swap_rb: True if the ranges are for the red/blue swapped image.
+        """
+        key = (tuple(tuple(int(v) for v in np.concatenate(r)) for r in ranges), swap_rb)
+        lut = cls._luts.get(key)
+        if lut is None:
+            # The centre colour of each cell, in index order (B, G, R)
+            levels = np.arange(32, dtype=np.uint8) * 8 + 4
+            b, g, r = np.meshgrid(levels, levels, levels, indexing='ij')
+            colors = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=1).reshape(-1, 1, 3)
+            hsv = cv2.cvtColor(colors, cv2.COLOR_RGB2HSV if swap_rb else cv2.COLOR_BGR2HSV)
+            lut = np.zeros((32768, 1), dtype=np.uint8)
+            for low, high in ranges:
+                lut = cv2.bitwise_or(lut, cv2.inRange(hsv, low, high))
+            lut = lut.ravel()
+            cls._luts[key] = lut
+        return lut
+
+    @staticmethod
+    def apply(image, lut, out=None, buffers=None):
+        """ Returns the mask (255 where the colour passes) of a BGR or BGRA image.
+        @param out: The output buffer, or None to allocate one.
+        @param buffers: A dict to keep the index buffers in between calls, or None to allocate them.
+        """
+        shape = image.shape[:2]
+        if buffers is None:
+            buffers = {}
+        idx = buffers.get('idx')
+        if idx is None or idx.shape != shape:
+            idx = np.empty(shape, dtype=np.uint16)
+            buffers['idx'] = idx
+            buffers['tmp'] = np.empty(shape, dtype=np.uint16)
+        tmp = buffers['tmp']
+
+        # idx = (B >> 3) << 10 | (G >> 3) << 5 | (R >> 3)
+        np.right_shift(image[..., 0], 3, out=idx, casting='unsafe')
+        np.left_shift(idx, 10, out=idx)
+        np.right_shift(image[..., 1], 3, out=tmp, casting='unsafe')
+        np.left_shift(tmp, 5, out=tmp)
+        np.bitwise_or(idx, tmp, out=idx)
+        np.right_shift(image[..., 2], 3, out=tmp, casting='unsafe')
+        np.bitwise_or(idx, tmp, out=idx)
+        return np.take(lut, idx, out=out)
+
+
 class Point:
     """Creates a point on a coordinate plane with values x and y."""
     def __init__(self, x, y):
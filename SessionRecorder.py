@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from EDlogger import logger
+from Screen_Frame import Frame
+
+
+class SessionRecorder:
+    """ Records the frames used by the AP, along with the Status.json data, the journal lines and the keys sent,
+    to a session folder (see Screen_FrameSource.py for the folder format). The frames can be replayed with
+    RecordedSessionFrameSource. The other records are only kept to compare runs against, they are not fed back
+    to StatusParser or EDJournal on replay.
+    Frames are cropped and scaled on the calling thread, everything else is written to disk on a background
+    thread so recording does not slow down the AP. If the writer falls behind, frames are dropped. The small
+    records are never dropped and never wait for the writer.
+    """
+
+    def __init__(self, path: str, screen_width: int, screen_height: int, rect=None, scale: float = 0.5,
+                 max_rate: float = 10.0, chunk_size: int = 100, queue_size: int = 30):
+        """
+        @param path: The session folder to create.
+        @param screen_width: The screen width in pixels.
+        @param screen_height: The screen height in pixels.
+        @param rect: The part of the screen to record as [L, T, R, B] in percent (0.0 - 1.0), or None for all.
+        @param scale: The scale the frames are stored at.
+        @param max_rate: The max frames per second to record.
+        @param chunk_size: The number of frames in each chunk file.
+        @param queue_size: The number of frames waiting to be written before frames are dropped.
+        """
+        self.path = path
+        self.screen_width = int(screen_width)
+        self.screen_height = int(screen_height)
+        if rect is None:
+            rect = [0.0, 0.0, 1.0, 1.0]
+        self.rect = [int(rect[0] * screen_width), int(rect[1] * screen_height),
+                     int(rect[2] * screen_width), int(rect[3] * screen_height)]
+        self.scale = scale
+        self.min_period = 1.0 / max_rate
+        self.chunk_size = chunk_size
+
+        self.frame_count = 0  # Frames written
+        self.dropped_count = 0  # Frames dropped because the writer was behind
+        self.queue_size = queue_size
+        self._queue = queue.Queue()  # Unbounded, the frames waiting are limited by queue_size instead
+        self._frames_waiting = 0
+        self._lock = threading.Lock()
+        self._start_time = time.monotonic()
+        self._last_frame = None
+        self._last_frame_time = 0.0
+        self._chunk = None
+        self._chunk_len = 0
+        self._chunk_num = 0
+        self._index_file = None
+        self._thread = None
+
+    def start(self):
+        """ Creates the session folder and starts the writer thread. """
+        os.makedirs(self.path, exist_ok=True)
+        header = {
+            'width': self.screen_width,
+            'height': self.screen_height,
+            'color_space': 'BGR',
+            'rect': self.rect,
+            'scale': self.scale,
+            'chunk_size': self.chunk_size,
+            'created': datetime.now().isoformat(),
+        }
+        with open(os.path.join(self.path, 'session.json'), 'w') as fp:
+            json.dump(header, fp, indent=4)
+        self._index_file = open(os.path.join(self.path, 'index.jsonl'), 'w')
+
+        self._start_time = time.monotonic()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+        logger.info(f"Recording session to '{self.path}'.")
+
+    def stop(self):
+        """ Writes the remaining records and stops the writer thread. """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        logger.info(f"Recorded {self.frame_count} frames to '{self.path}' ({self.dropped_count} dropped).")
+
+    def _time(self) -> float:
+        return round(time.monotonic() - self._start_time, 4)
+
+    def add_frame(self, frame: Frame):
+        """ Records a frame, unless it was already recorded or is within the max rate of the last one. """
+        if frame is None or frame is self._last_frame or self._thread is None:
+            return
+        if frame.timestamp - self._last_frame_time < self.min_period:
+            return
+        self._last_frame = frame
+        self._last_frame_time = frame.timestamp
+
+        # Crop and scale here, as the frame image may be reused by the capture thread
+        left, top, right, bot = self.rect
+        image = frame.image[top:bot, left:right]
+        if self.scale != 1.0:
+            image = cv2.resize(image, (0, 0), fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        image = Frame(image, frame.color_space).get('BGR')
+        if np.shares_memory(image, frame.image):
+            image = image.copy()
+
+        record = {'type': 'frame', 'time': round(frame.timestamp - self._start_time, 4)}
+        with self._lock:
+            if self._frames_waiting >= self.queue_size:
+                self.dropped_count = self.dropped_count + 1
+                return
+            self._frames_waiting = self._frames_waiting + 1
+        self._queue.put((record, image))
+
+    def add_status(self, data: dict):
+        """ Records the Status.json data (as cleaned by StatusParser). """
+        self._put({'type': 'status', 'time': self._time(), 'data': data})
+
+    def add_journal(self, line: str):
+        """ Records a journal line. """
+        self._put({'type': 'journal', 'time': self._time(), 'line': line.rstrip('\n')})
+
+    def add_keys(self, key_binding: str, hold=None, repeat=1, state=None):
+        """ Records a key sent by EDKeys. """
+        self._put({'type': 'keys', 'time': self._time(), 'key': key_binding, 'hold': hold, 'repeat': repeat,
+                   'state': state})
+
+    def _put(self, record: dict):
+        if self._thread is None:
+            return
+        # Status, journal and keys records are small and must not be lost. The queue is unbounded, so this
+        # does not wait for the writer (i.e. in EDKeys.send).
+        self._queue.put((record, None))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            record, image = item
+            try:
+                if image is not None:
+                    with self._lock:
+                        self._frames_waiting = self._frames_waiting - 1
+                    record['frame'] = self._write_frame(image)
+                self._index_file.write(json.dumps(record, default=str) + '\n')
+            except Exception as e:
+                logger.error(f"Session recorder write failed: {e}")
+
+        self._save_chunk()
+        self._index_file.close()
+
+    def _write_frame(self, image) -> int:
+        """ Adds the image to the current chunk, saving the chunk when it is full.
+        @return: The frame number.
+        """
+        if self._chunk is None or self._chunk.shape[1:] != image.shape:
+            self._save_chunk()
+            self._chunk = np.empty((self.chunk_size,) + image.shape, dtype=np.uint8)
+
+        self._chunk[self._chunk_len] = image
+        self._chunk_len = self._chunk_len + 1
+        frame_num = self._chunk_num * self.chunk_size + self._chunk_len - 1
+        self.frame_count = self.frame_count + 1
+        if self._chunk_len == self.chunk_size:
+            self._save_chunk()
+        return frame_num
+
+    def _save_chunk(self):
+        if self._chunk is None or self._chunk_len == 0:
+            return
+        np.save(os.path.join(self.path, f'frames_{self._chunk_num:05d}.npy'), self._chunk[:self._chunk_len])
+        self._index_file.flush()
+        self._chunk_num = self._chunk_num + 1
+        self._chunk_len = 0
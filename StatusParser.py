@@ -25,6 +25,7 @@ class StatusParser:
             self.file_path = file_path if file_path else (get_path(FOLDERID.SavedGames, UserHandle.current)
                                                           + "/Frontier Developments/Elite Dangerous/Status.json")
         self.last_mod_time = None
+        self.recorder = None  # Optional SessionRecorder, records the status data read
 
         # Read json file data
         self.current_data = None
@@ -282,6 +283,8 @@ class StatusParser:
         self.last_data = self.current_data
         self.current_data = cleaned_data
         self.last_mod_time = self.get_file_modified_time()
+        if self.recorder is not None:
+            self.recorder.add_status(cleaned_data)
         #logger.debug(f'Status.json mod timestamp {self.last_mod_time} updated.')
         # print(f'Status.json mod timestamp {self.last_mod_time} updated.')
         # print(json.dumps(data, indent=4))
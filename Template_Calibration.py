@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from EDlogger import logger
+from Screen_Frame import Frame
+from Screen_Regions import Screen_Regions
+
+_pool = None  # Shared pool of match workers, created on first use
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """ Returns the shared pool of match workers. Threads are used as OpenCV releases the GIL while matching,
+    so the matches run in parallel without copying the frame and templates to other processes. """
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=max(2, (os.cpu_count() or 2) - 1),
+                                   thread_name_prefix="TemplateCalibration")
+    return _pool
+
+
+def score_scale(channels, templ_image) -> (float, (int, int)):
+    """ Match a template in the HSV channels of a region.
+    @return: The best match value and location, or (-1.0, (0, 0)) if the template is larger than the region.
+    """
+    if templ_image.shape[0] > channels[0].shape[0] or templ_image.shape[1] > channels[0].shape[1]:
+        return -1.0, (0, 0)
+    (minVal, maxVal, minLoc, maxLoc), match = Screen_Regions.match_channels_x3(channels, templ_image)
+    return maxVal, maxLoc
+
+
+def find_best_scale(region: Frame, templates, templ_name: str, scale_low: float, scale_high: float,
+                    scale_step: float, coarse_count: int = 16) -> (float, float, (int, int)):
+    """ Find the template scale that best matches the region, using a single frame.
+    The scale range is searched coarse to fine: a grid of scales is matched (in parallel), then a finer grid
+    around the best scales, and so on until the step is down to scale_step.
+    @param region: The region frame to match in (i.e. from Screen.get_frame_region()).
+    @param templates: The Image_Templates.
+    @param templ_name: The template name (i.e. 'compass').
+    @param scale_low: The lowest scale (i.e. 0.5 for 50%).
+    @param scale_high: The highest scale.
+    @param scale_step: The resolution of the result.
+    @param coarse_count: The number of scales matched in each pass.
+    @return: The best scale, its match value and location. The scale is 0.0 if nothing matched.
+    """
+    channels = region.get_channels('HSV', swap_rb=False)
+    pool = _get_pool()
+
+    scores = {}  # Match value and location by scale
+    step = max((scale_high - scale_low) / coarse_count, scale_step)
+    scales = np.arange(scale_low, scale_high + step / 2, step)
+    while True:
+        scales = sorted(set(round(float(sc), 4) for sc in scales) - set(scores))
+
+        # Scale the templates here, as the template cache is not thread safe
+        templ_images = [templates.get_template(templ_name, sc)['image'] for sc in scales]
+        results = pool.map(lambda templ_image: score_scale(channels, templ_image), templ_images)
+        scores.update(zip(scales, results))
+
+        ranked = sorted(scores, key=lambda sc: scores[sc][0], reverse=True)
+        if step <= scale_step or scores[ranked[0]][0] < 0:
+            break
+
+        # Next pass around the best scales. The match score is not smooth, so the first pass refines the best
+        # three to avoid settling on a local peak.
+        centers = ranked[:3] if len(scores) <= coarse_count + 1 else ranked[:1]
+        next_step = max(step / 4, scale_step)
+        scales = []
+        for center in centers:
+            low = max(scale_low, center - step)
+            high = min(scale_high, center + step)
+            scales.extend(np.arange(low, high + next_step / 2, next_step))
+        step = next_step
+
+    best_scale = ranked[0]
+    best_val, best_loc = scores[best_scale]
+    if best_val < 0:
+        return 0.0, 0.0, (0, 0)
+    return best_scale, best_val, best_loc
+
+
+class ScaleTracker:
+    """ Keeps the scale of a template calibrated from the match scores the AP computes anyway (i.e. in
+    get_nav_offset), instead of a calibration sweep before every use. While the score stays within a band of
+    its running average nothing is done. When it drops below the band, the neighbouring scales are matched in
+    the same region and the scale moves towards the best of them, one step at a time.
+    """
+
+    def __init__(self, templates, templ_name: str, scale: float, step: float = 0.005, band: float = 0.05,
+                 max_steps: int = 10):
+        """
+        @param templates: The Image_Templates.
+        @param templ_name: The template name (i.e. 'compass').
+        @param scale: The starting scale (i.e. 1.0 for 100%).
+        @param step: The scale step between neighbours.
+        @param band: How far (0.0 - 1.0) the score may fall below its running average before neighbours are checked.
+        @param max_steps: The max steps moved on one update.
+        """
+        self.templates = templates
+        self.templ_name = templ_name
+        self.step = step
+        self.band = band
+        self.max_steps = max_steps
+        self.smoothing = 0.2  # Weight of a new score in the running average
+        self.min_gain = 0.005  # Score gain needed to move to a neighbouring scale
+        self.scale = scale
+        self.score_avg = None  # Running average of the match score
+        self.calibrated = False  # True once the scale is from a calibration (now or saved)
+        self.changed = False  # True when the scale has moved since it was last saved
+        self.probe_count = 0  # Number of times the neighbours were checked
+
+    def reset(self, scale: float, calibrated: bool = True):
+        """ Restart tracking from a new scale (i.e. after a calibration or a ship change). """
+        self.scale = scale
+        self.score_avg = None
+        self.calibrated = calibrated
+        self.changed = False
+
+    def update(self, score: float, score_fn) -> bool:
+        """ Add the match score of the current scale.
+        @param score: The match score (0.0 - 1.0) at the current scale.
+        @param score_fn: Function returning the match score of a template image in the same region, called
+        only if the neighbouring scales are checked. The current scale is scored with it too before comparing, as
+        the score passed may come from a different match (i.e. only the dominant channel, or the tracked ROI).
+        @return: True if the scale has changed, so the templates need reloading.
+        """
+        if self.score_avg is None or score >= self.score_avg - self.band:
+            # Within the band, just follow the score
+            if self.score_avg is None:
+                self.score_avg = score
+            else:
+                self.score_avg = self.score_avg + self.smoothing * (score - self.score_avg)
+            return False
+
+        # Below the band, check the neighbouring scales and move towards the best
+        self.probe_count = self.probe_count + 1
+        best_scale = round(self.scale, 4)
+        best_score = score_fn(self.templates.get_template(self.templ_name, best_scale)['image'])
+        scores = {best_scale: best_score}
+        for _ in range(self.max_steps):
+            center = best_scale
+            for sc in (round(center - self.step, 4), round(center + self.step, 4)):
+                if sc not in scores:
+                    templ_image = self.templates.get_template(self.templ_name, sc)['image']
+                    scores[sc] = score_fn(templ_image)
+                if scores[sc] > best_score + self.min_gain:
+                    best_scale = sc
+                    best_score = scores[sc]
+            if best_scale == center:
+                break
+
+        # Re-centre the band, so a dimmer (but matching) compass does not keep probing. The band follows the
+        # scores passed in, so after a move it restarts from the next score at the new scale.
+        if best_scale == round(self.scale, 4):
+            self.score_avg = score
+            return False
+        self.score_avg = None
+
+        logger.debug(f"Scale tracker: {self.templ_name} scale {self.scale:5.4f} -> {best_scale:5.4f}, "
+                     f"match {score:5.4f} -> {best_score:5.4f}")
+        self.scale = best_scale
+        self.changed = True
+        return True
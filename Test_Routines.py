@@ -7,7 +7,9 @@ from Screen_Regions import *
 from Overlay import *
 from Screen import *
 from Image_Templates import *
-from time import sleep
+from Screen_Frame import Frame
+from Screen_FrameSource import create_frame_source
+from time import sleep, perf_counter
 import numpy as np
 
 """
@@ -43,6 +45,33 @@ def main():
     # template_matching_test('target', 'target')
     template_matching_test('target_occluded', 'target_occluded')
 
+    # As above, but replaying full screen images, a video or a recorded session.
+    # Does NOT require Elite Dangerous to be running.
+    # ===============================================
+    # template_matching_test('compass', 'compass', create_frame_source('images', 'test/full-screen'))
+    # template_matching_test('target', 'target', create_frame_source('session', 'recordings/session1'))
+
+    # Compares the speed and accuracy of pyramid matching against full resolution matching
+    # on the test images (see Screen_Regions.set_pyramid_levels).
+    # Does NOT require Elite Dangerous to be running.
+    # ===============================================
+    # pyramid_matching_benchmark(1)
+    # pyramid_matching_benchmark(2)
+
+    # Compares the speed and accuracy of the lookup table colour filters against the HSV
+    # colour filters on the test images (see Screen_Regions.set_color_lut).
+    # Does NOT require Elite Dangerous to be running.
+    # ===============================================
+    # color_lut_benchmark()
+
+    # Compares the per row time of the full OCR pipeline against recognition only OCR of the
+    # highlighted item in an image (see OCR.image_line_ocr). The test/ocr images are drawn
+    # (not screenshots) at the nav panel location list and tab bar item sizes.
+    # Does NOT require Elite Dangerous to be running.
+    # ===============================================
+    # ocr_line_benchmark('test/ocr/nav_panel_location_panel.png', 1.0, 0.08)
+    # ocr_line_benchmark('test/ocr/tab_bar.png', 0.23, 0.7)
+
     # More complicated specific test cases...
     # =======================================
     # Requires Elite Dangerous to be running.
@@ -137,13 +166,14 @@ def compass_test():
             break
 
 
-def template_matching_test(region_name, template):
+def template_matching_test(region_name, template, source=None):
     """ To test the template matching. Using the provided region and template.
     :param region_name: The name of the region with the required filter to apply to the image.
-    :param template: The name of the template to find in each file being tested. """
+    :param template: The name of the template to find in each file being tested.
+    :param source: The frame source to use instead of the screen (see Screen_FrameSource.py). """
     #ed_ap = EDAutopilot(cb=None)
     #scr = ed_ap.scr
-    scr = Screen(cb=None)
+    scr = Screen(cb=None, source=source)
 
     templ = Image_Templates(scr.scaleX, scr.scaleY, scr.scaleX)
 
@@ -161,6 +191,121 @@ def template_matching_test(region_name, template):
             break
 
 
+def pyramid_matching_benchmark(levels, repeat=20):
+    """ Times full resolution and pyramid template matching on the test images and shows the match differences.
+    The test images are at the default 3440x1440 scaling, so the templates are not scaled.
+    :param levels: The pyramid levels (each halves the resolution).
+    :param repeat: The number of times to repeat each match for the timing. """
+    scr = Screen(cb=None, source=create_frame_source('images', 'test/target'))
+    templ = Image_Templates(1.0, 1.0, 1.0, 1.0)
+    scr_reg = Screen_Regions(scr, templ)
+
+    # Region, template, test image folder and if matched on the x3 HSV channels
+    tests = [('compass', 'compass', 'test/compass', True),
+             ('target', 'target', 'test/target', False),
+             ('disengage', 'disengage', 'test/disengage', False)]
+
+    for region_name, template, folder, x3 in tests:
+        templ_image = templ.template[template]['image']
+        for file in sorted(os.listdir(folder)):
+            frame = Frame.from_image(cv2.imread(os.path.join(folder, file)))
+            if x3:
+                images = frame.get_channels('HSV')
+                match_fn = Screen_Regions.match_channels_x3
+            else:
+                reg = scr_reg.reg[region_name]
+                images = [reg['filterCB'](frame.view(True), reg['filter'])]
+                match_fn = Screen_Regions.match_image
+
+            start = perf_counter()
+            for i in range(repeat):
+                (minVal, maxVal, minLoc, maxLoc), match = match_fn(images, templ_image)
+            full_time = (perf_counter() - start) / repeat
+
+            start = perf_counter()
+            for i in range(repeat):
+                (p_minVal, p_maxVal, p_minLoc, p_maxLoc), match = Screen_Regions.match_pyramid(images, templ_image, match_fn, levels)
+            pyr_time = (perf_counter() - start) / repeat
+
+            print(f"{region_name}/{template} '{file}': "
+                  f"full {full_time * 1000:.2f}ms match {maxVal:5.4f} at {maxLoc}, "
+                  f"pyramid x{levels} {pyr_time * 1000:.2f}ms match {p_maxVal:5.4f} at {p_maxLoc}, "
+                  f"speed up {full_time / pyr_time:.1f}x")
+
+
+def color_lut_benchmark(repeat=20):
+    """ Times the HSV (cvtColor and inRange) and lookup table colour filters on the test images and shows
+    the percent of pixels where the masks differ.
+    :param repeat: The number of times to repeat each filter for the timing. """
+    scr = Screen(cb=None, source=create_frame_source('images', 'test/target'))
+    templ = Image_Templates(1.0, 1.0, 1.0, 1.0)
+    scr_reg = Screen_Regions(scr, templ)
+
+    # Region, test image folder and inv_col (as used by the AP)
+    tests = [('target', 'test/target', True),
+             ('target_occluded', 'test/target', False),
+             ('disengage', 'test/disengage', True),
+             ('sco', 'test/disengage', True)]
+
+    for region_name, folder, inv_col in tests:
+        reg = scr_reg.reg[region_name]
+        for file in sorted(os.listdir(folder)):
+            image = cv2.imread(os.path.join(folder, file))
+
+            start = perf_counter()
+            for i in range(repeat):
+                # A new frame each time, so the HSV conversion is not reused
+                hsv_mask = scr_reg.filter_by_color(Frame.from_image(image).view(inv_col), reg['filter'])
+            hsv_time = (perf_counter() - start) / repeat
+
+            lut = ColorLut.get([reg['filter']], inv_col)
+            lut_mask = np.empty(image.shape[:2], dtype=np.uint8)
+            buffers = {}
+            start = perf_counter()
+            for i in range(repeat):
+                ColorLut.apply(image, lut, lut_mask, buffers)
+            lut_time = (perf_counter() - start) / repeat
+
+            diff_pct = np.count_nonzero(hsv_mask != lut_mask) * 100.0 / hsv_mask.size
+            print(f"{region_name} '{file}': hsv {hsv_time * 1000:.2f}ms, lut {lut_time * 1000:.2f}ms, "
+                  f"speed up {hsv_time / lut_time:.1f}x, mask difference {diff_pct:.3f}% of pixels")
+
+
+def ocr_line_benchmark(image_path, min_w, min_h, repeat=10):
+    """ Times the full OCR pipeline and recognition only OCR of the highlighted item in an image.
+    :param image_path: The image with a highlighted item (i.e. a nav panel location list).
+    :param min_w: Minimum width of the item in percent of the image.
+    :param min_h: Minimum height of the item in percent of the image.
+    :param repeat: The number of times to repeat each OCR for the timing. """
+    ed_ap = EDAutopilot(cb=None)
+    ocr = ed_ap.ocr
+    ocr.cache.max_entries = 0  # Time the OCR, not the cache
+
+    image = cv2.imread(image_path)
+    item, _ = ocr.get_highlighted_item_in_image(image, min_w, min_h)
+    if item is None:
+        print(f"No highlighted item found in '{image_path}'.")
+        return
+
+    # Load the models and warm up before timing
+    full_text = ocr.image_simple_ocr(item)
+    rec_text, score = ocr.image_rec_ocr(item)
+
+    start = perf_counter()
+    for i in range(repeat):
+        ocr.image_simple_ocr(item)
+    full_time = (perf_counter() - start) / repeat
+
+    start = perf_counter()
+    for i in range(repeat):
+        ocr.image_rec_ocr(item)
+    rec_time = (perf_counter() - start) / repeat
+
+    print(f"full pipeline {full_time * 1000:.1f}ms per row {full_text}")
+    print(f"recognition only {rec_time * 1000:.1f}ms per row {rec_text} ({score:.3f}), "
+          f"speed up {full_time / rec_time:.1f}x")
+
+
 def show_regions(region_names):
     """ Draw a rectangle indicating the given region on the Elite Dangerous window.
         :param region_names: An array names of the regions to indicate on screen (i.e. ["compass", "target"])."""
@@ -0,0 +1,53 @@
+import unittest
+
+import cv2
+
+from Compass_Locator import CompassLocator
+from Screen_Frame import Frame
+
+
+def load_frame(path):
+    return Frame(cv2.imread(path), 'BGR')
+
+
+class CompassLocatorTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. """
+
+    def test_compass_region(self):
+        """ In the compass region the compass is found with the default radii, and the nav point is ahead. """
+        locator = CompassLocator()
+        frame = load_frame('test/compass/Screenshot 2024-07-04 20-01-49.png')
+        compass = locator.locate_compass(frame)
+        self.assertIsNotNone(compass)
+        x, y, radius, score = compass
+        self.assertAlmostEqual(x, 171, delta=3)
+        self.assertAlmostEqual(y, 164, delta=3)
+        self.assertAlmostEqual(radius, 39, delta=3)
+
+        navpoint = locator.locate_navpoint(frame, x, y, radius)
+        self.assertIsNotNone(navpoint)
+        self.assertAlmostEqual(navpoint[0], 167, delta=3)
+        self.assertAlmostEqual(navpoint[1], 194, delta=3)
+        self.assertEqual(navpoint[2], 1.0)
+
+    def test_compass_crop(self):
+        """ In crops of the compass itself the radii are passed, as the compass fills the crop (radius about 40% of
+        its height). The nav point is ahead (cyan) or behind (white). """
+        locator = CompassLocator()
+        for path, expected in [('test/navpoint/Screenshot 2024-07-04 20-02-01.png', (78, 55, 1.0)),
+                               ('test/navpoint-behind/Screenshot 2024-07-04 20-01-33.png', (46, 26, -1.0))]:
+            frame = load_frame(path)
+            compass = locator.locate_compass(frame, min_radius=frame.height * 0.3, max_radius=frame.height * 0.6)
+            self.assertIsNotNone(compass, path)
+            x, y, radius, score = compass
+            self.assertAlmostEqual(radius, 39, delta=3, msg=path)
+
+            navpoint = locator.locate_navpoint(frame, x, y, radius)
+            self.assertIsNotNone(navpoint, path)
+            self.assertAlmostEqual(navpoint[0], expected[0], delta=3, msg=path)
+            self.assertAlmostEqual(navpoint[1], expected[1], delta=3, msg=path)
+            self.assertEqual(navpoint[2], expected[2], path)
+
+
+if __name__ == '__main__':
+    unittest.main()
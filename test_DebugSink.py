@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from DebugSink import DebugSink, DEBUG_KEY, DEBUG_STEPS
+
+
+class DebugSinkTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. """
+
+    def test_levels(self):
+        """ Images are only written for channels enabled at the image level. """
+        with tempfile.TemporaryDirectory() as path:
+            sink = DebugSink(path, DEBUG_KEY, {'ocr': DEBUG_STEPS})
+            image = np.zeros((10, 10, 3), dtype=np.uint8)
+            sink.write('ocr', 'step', image, DEBUG_STEPS)
+            sink.write('nav_panel', 'step', image, DEBUG_STEPS)
+            sink.write('nav_panel', 'key', image)
+            sink.stop()
+
+            self.assertTrue(os.path.exists(os.path.join(path, 'ocr', 'step.png')))
+            self.assertFalse(os.path.exists(os.path.join(path, 'nav_panel', 'step.png')))
+            self.assertTrue(os.path.exists(os.path.join(path, 'nav_panel', 'key.png')))
+            self.assertEqual(sink.write_count, 2)
+
+    def test_quota(self):
+        """ The oldest files are deleted to stay within the quota. """
+        with tempfile.TemporaryDirectory() as path:
+            sink = DebugSink(path, DEBUG_KEY, quota_mb=0.05)
+            image = np.random.default_rng(0).integers(0, 256, (100, 100, 3), dtype=np.uint8)  # ~30kB as png
+            for i in range(5):
+                sink.write('ocr', f'image{i}', image)
+                sink.flush()
+            sink.stop()
+
+            files = sorted(os.listdir(os.path.join(path, 'ocr')))
+            self.assertEqual(files, ['image4.png'])
+            self.assertEqual(sink.deleted_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from Screen_Capture import CaptureService
+from Screen_FrameSource import ImageFolderFrameSource, RecordedSessionFrameSource, create_frame_source
+from SessionRecorder import SessionRecorder
+
+
+def dummy_cb(msg, body=None):
+    pass
+
+
+class FrameSourceTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. """
+
+    def test_image_folder(self):
+        """ The image folder source returns the images in turn and loops. """
+        source = ImageFolderFrameSource('test/compass')
+        image = cv2.imread(source.files[0])
+        self.assertEqual(source.get_size(), (image.shape[1], image.shape[0]))
+
+        for i in range(len(source.files) + 1):
+            frame = source.grab()
+            self.assertEqual(frame.color_space, 'BGR')
+        self.assertTrue(np.array_equal(frame.image, image))
+
+    def test_recorded_session(self):
+        """ A recorded rect of the screen is replayed in place on a full size frame. """
+        with tempfile.TemporaryDirectory() as path:
+            frames = np.random.default_rng(0).integers(0, 256, (3, 20, 30, 4), dtype=np.uint8)
+            np.save(os.path.join(path, 'frames_00000.npy'), frames)
+            header = {'width': 100, 'height': 80, 'color_space': 'BGRA', 'rect': [10, 20, 40, 40], 'scale': 1.0,
+                      'chunk_size': 3}
+            with open(os.path.join(path, 'session.json'), 'w') as fp:
+                json.dump(header, fp)
+            with open(os.path.join(path, 'index.jsonl'), 'w') as fp:
+                for i in range(3):
+                    fp.write(json.dumps({'type': 'frame', 'time': i * 0.1, 'frame': i}) + '\n')
+                    fp.write(json.dumps({'type': 'keys', 'time': i * 0.1, 'key': 'UI_Up'}) + '\n')
+
+            source = create_frame_source('session', path)
+            self.assertEqual(source.get_size(), (100, 80))
+            source.seek(0.15)
+            frame = source.grab()
+            self.assertEqual(frame.timestamp, 0.2)
+            self.assertTrue(np.array_equal(frame.image[20:40, 10:40], frames[2]))
+            self.assertFalse(source.finished)
+            source.grab()
+            self.assertTrue(source.finished)
+            del frame, source  # Release the memory mapped chunk before the folder is deleted
+
+    def test_screen_from_images(self):
+        """ The screen can be created from images without Elite Dangerous (or Windows). """
+        from Screen import Screen
+        scr = Screen(dummy_cb, ImageFolderFrameSource('test/target'))
+        image = cv2.imread(scr.source.files[0])
+
+        self.assertEqual(scr.screen_width, image.shape[1])
+        self.assertTrue(np.array_equal(scr.get_screen_full(), image))
+        self.assertTrue(np.array_equal(scr.get_screen(10, 20, 50, 60, rgb=False), image[20:60, 10:50]))
+
+    def test_capture_service(self):
+        """ The capture thread fills the ring buffer and returns frames captured after a given time. """
+        capture = CaptureService(ImageFolderFrameSource('test/compass'), rate=50, size=4)
+        capture.start()
+        try:
+            t = time.monotonic() + 0.1
+            frame = capture.wait_newer_than(t, 1.0)
+            self.assertIsNotNone(frame)
+            self.assertGreater(frame.timestamp, t)
+            self.assertFalse(frame.image.flags.writeable)
+            self.assertGreaterEqual(capture.latest().timestamp, frame.timestamp)
+            self.assertIsNone(capture.first_newer_than(time.monotonic() + 10.0))
+
+            # The frame is not overwritten when its ring slot is reused
+            image = frame.image.copy()
+            self.assertIsNotNone(capture.wait_newer_than(time.monotonic() + 6 / capture.rate, 1.0))
+            self.assertTrue(np.array_equal(frame.image, image))
+        finally:
+            capture.stop()
+
+    def test_record_and_replay(self):
+        """ A recorded session replays the recorded frames and keeps the other records. """
+        source = ImageFolderFrameSource('test/target')
+        width, height = source.get_size()
+        with tempfile.TemporaryDirectory() as path:
+            recorder = SessionRecorder(path, width, height, [0.0, 0.5, 1.0, 1.0], scale=1.0, max_rate=1000,
+                                       chunk_size=2)
+            recorder.start()
+            images = []
+            for i in range(3):
+                frame = source.grab()
+                images.append(frame.image)
+                recorder.add_frame(frame)
+                recorder.add_keys('UI_Down', repeat=i + 1)
+                time.sleep(0.01)
+            recorder.stop()
+            self.assertEqual(recorder.frame_count, 3)
+
+            replay = RecordedSessionFrameSource(path)
+            self.assertEqual(replay.get_size(), (width, height))
+            for image in images:
+                frame = replay.grab()
+                self.assertTrue(np.array_equal(frame.image[height // 2:], image[height // 2:]))
+            self.assertEqual([rec['repeat'] for rec in replay.records if rec['type'] == 'keys'], [1, 2, 3])
+            del frame, replay  # Release the memory mapped chunks before the folder is deleted
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+
+import numpy as np
+
+from EDNavigationPanel import EDNavigationPanel
+from OCR_Matcher import text_similarity
+from Screen_Regions import Quad
+
+
+def dummy_cb(msg, body=None):
+    pass
+
+
+class FakeList:
+    """ A Nav Panel location list showing a page of rows. The selection wraps from the last row to the first and
+    from the first to the last. """
+
+    def __init__(self, items, page_rows, miss_selected=False):
+        self.items = items
+        self.page_rows = min(page_rows, len(items))
+        self.miss_selected = miss_selected  # The list OCR does not read the dark text of the selected row
+        self.sel = 0
+        self.top = 0
+
+    def move(self, step):
+        self.sel = (self.sel + step) % len(self.items)
+        if self.sel < self.top:
+            self.top = self.sel
+        elif self.sel >= self.top + self.page_rows:
+            self.top = self.sel - self.page_rows + 1
+
+    def row_quad(self, row):
+        h = 1.0 / self.page_rows
+        return Quad.from_rect([0.0, row * h, 1.0, (row + 1) * h])
+
+
+class FakeKeys:
+    def __init__(self, fake_list):
+        self.list = fake_list
+
+    def send(self, key_binding, hold=None, repeat=1, repeat_delay=None, state=None):
+        if state is not None:
+            return
+        for _ in range(repeat):
+            self.list.move(1 if key_binding == "UI_Down" else -1)
+
+
+class FakeOCR:
+    rec_min_score = 0.5
+
+    def __init__(self, fake_list):
+        self.list = fake_list
+        self.selected_image = np.zeros((10, 100, 3), dtype=np.uint8)
+
+    def get_highlighted_item_in_image(self, image, min_w, min_h):
+        return self.selected_image, self.list.row_quad(self.list.sel - self.list.top)
+
+    def image_list_ocr(self, image, name=''):
+        rows = []
+        for row in range(self.list.page_rows):
+            index = self.list.top + row
+            if self.list.miss_selected and index == self.list.sel:
+                continue
+            rows.append((self.list.items[index], 0.9, self.list.row_quad(row)))
+        return rows
+
+    def image_ocr_batch(self, images, single_line=True, name=''):
+        return [([self.list.items[self.list.sel]], 0.9) if image is self.selected_image else (None, 0.0)
+                for image in images]
+
+    def image_line_ocr(self, image, name=''):
+        return [self.list.items[self.list.sel]]
+
+    def string_similarity(self, s1, s2):
+        return text_similarity(s1, s2)
+
+
+class FakeAP:
+    def __init__(self, fake_list):
+        self.ocr = FakeOCR(fake_list)
+
+
+def nav_panel(fake_list) -> EDNavigationPanel:
+    # Not created with __init__, which reads the game's Status.json
+    nav_pnl = EDNavigationPanel.__new__(EDNavigationPanel)
+    nav_pnl.ap = FakeAP(fake_list)
+    nav_pnl.keys = FakeKeys(fake_list)
+    nav_pnl.ap_ckb = dummy_cb
+    nav_pnl.sub_reg_size = {'nav_pnl_location': {"width": 1.0, "height": 0.08}}
+    nav_pnl.capture_location_panel = lambda: np.zeros((400, 800, 3), dtype=np.uint8)
+
+    def scroll_to_top_of_list():
+        fake_list.sel = 0
+        fake_list.top = 0
+        return True
+
+    nav_pnl.scroll_to_top_of_list = scroll_to_top_of_list
+    return nav_pnl
+
+
+class NavPanelListTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. """
+
+    items = ['SOL', 'ABRAHAM LINCOLN', 'LUNA', 'MARS HIGH', 'DAEDALUS', 'GALILEO', 'M.GORBACHEV', 'BURNELL STATION',
+             'LI QING JAO', 'FERDINAND MAGELLAN', 'ALTAIR', 'SIRIUS ATMOSPHERICS', 'NAV BEACON', 'JUPITER',
+             'SATURN', 'URANUS', 'NEPTUNE', 'MERCURY', 'VENUS', 'EARTH']
+
+    def test_missed_selected_row(self):
+        """ A selected row the list OCR did not read is added and read again, so the rows below it are counted. """
+        fake_list = FakeList(self.items, 8, miss_selected=True)
+        fake_list.move(2)
+        nav_pnl = nav_panel(fake_list)
+
+        rows, sel_index = nav_pnl.read_location_list()
+        self.assertEqual(sel_index, 2)
+        self.assertEqual([r[0] for r in rows], self.items[:8])
+
+        self.assertTrue(nav_pnl.jump_to_destination_in_list(self.items[6]))
+        self.assertEqual(fake_list.sel, 6)
+
+    def test_last_page(self):
+        """ A destination after the last full page is found when paging wraps past the end of the list. """
+        fake_list = FakeList(self.items, 8)
+        nav_pnl = nav_panel(fake_list)
+
+        self.assertTrue(nav_pnl.jump_to_destination_in_list(self.items[18]))
+        self.assertEqual(fake_list.sel, 18)
+
+    def test_wrap(self):
+        """ A list that fits on one page wraps when paged, and a missing destination is reported as not found. """
+        fake_list = FakeList(self.items[:5], 8)
+        fake_list.move(3)
+        nav_pnl = nav_panel(fake_list)
+
+        self.assertIs(nav_pnl.jump_to_destination_in_list('NOT A STATION'), False)
+        self.assertTrue(nav_pnl.jump_to_destination_in_list(self.items[1]))
+        self.assertEqual(fake_list.sel, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
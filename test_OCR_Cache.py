@@ -0,0 +1,46 @@
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from OCR_Cache import OCRCache, image_fingerprint
+
+
+class OCRCacheTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. """
+
+    def test_near_match(self):
+        """ Images differing only by noise match, a changed character or size does not. """
+        image = np.zeros((30, 300, 3), dtype=np.uint8)
+        cv2.putText(image, 'SIRIUS ATMOSPHERICS', (2, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 128, 255), 2)
+        other = np.zeros_like(image)
+        cv2.putText(other, 'SIRIUS ATMOSPHERICA', (2, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 128, 255), 2)
+        noise = np.random.default_rng(0).integers(0, 4, image.shape, dtype=np.uint8)
+
+        cache = OCRCache()
+        cache.put('simple', image_fingerprint(image), ['SIRIUS ATMOSPHERICS'])
+        self.assertEqual(cache.get('simple', image_fingerprint(cv2.add(image, noise))), ['SIRIUS ATMOSPHERICS'])
+        self.assertIsNone(cache.get('simple', image_fingerprint(other)))
+        self.assertIsNone(cache.get('simple', image_fingerprint(image[:, :290])))
+        self.assertIsNone(cache.get('full', image_fingerprint(image)))
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_lru_and_ttl(self):
+        """ The least recently used result is removed when full, and old results expire. """
+        images = [np.full((10, 10), i * 50, dtype=np.uint8) for i in range(3)]
+        cache = OCRCache(max_entries=2, ttl=0.2)
+        cache.put('simple', image_fingerprint(images[0]), ['A'])
+        cache.put('simple', image_fingerprint(images[1]), ['B'])
+        self.assertEqual(cache.get('simple', image_fingerprint(images[0])), ['A'])
+        cache.put('simple', image_fingerprint(images[2]), ['C'])
+        self.assertIsNone(cache.get('simple', image_fingerprint(images[1])))
+        self.assertEqual(cache.get('simple', image_fingerprint(images[2])), ['C'])
+
+        time.sleep(0.25)
+        self.assertIsNone(cache.get('simple', image_fingerprint(images[0])))
+        self.assertEqual(cache.stats()['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
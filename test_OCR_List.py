@@ -0,0 +1,102 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from OCR import OCR
+
+
+class FakeDebugSink:
+    def enabled(self, channel, level=1):
+        return False
+
+    def write(self, *args, **kwargs):
+        pass
+
+
+class FakeAP:
+    def __init__(self):
+        self.config = {'OCRCacheSize': 256, 'OCRCacheTTL': 5.0, 'OCRRecognitionOnly': True, 'OCRService': False,
+                       'OCRServiceWorkers': 1}
+        self.debug_ocr = False
+        self.debug_sink = FakeDebugSink()
+
+
+class OCRListTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. The OCR models are not used. """
+
+    def setUp(self):
+        self.ocr = OCR(FakeAP(), screen=None)
+
+    def tearDown(self):
+        self.ocr.stop()
+
+    def test_row_grouping(self):
+        """ Lines on the same row are joined from the left, rows are returned from the top. """
+        lines = [('LUNA', 0.95, [20, 50, 80, 70]),
+                 ('0 LS', 0.97, [300, 12, 350, 28]),
+                 ('MARS HIGH', 0.90, [20, 90, 150, 110]),
+                 ('7.4 LY', 0.80, [300, 52, 360, 68]),
+                 ('SOL', 0.99, [20, 10, 80, 30])]
+        self.ocr._run_batch = lambda kind, image: lines
+
+        rows = self.ocr.image_list_ocr(np.zeros((200, 400, 3), dtype=np.uint8))
+        self.assertEqual([r[0] for r in rows], ['SOL 0 LS', 'LUNA 7.4 LY', 'MARS HIGH'])
+        self.assertEqual([r[1] for r in rows], [0.97, 0.80, 0.90])
+        q = rows[1][2]
+        self.assertAlmostEqual(q.get_left(), 20 / 400)
+        self.assertAlmostEqual(q.get_top(), 50 / 200)
+        self.assertAlmostEqual(q.get_right(), 360 / 400)
+        self.assertAlmostEqual(q.get_bottom(), 70 / 200)
+
+    def test_highlighted_item(self):
+        """ The highlighted item is cut from the input image, unmarked. """
+        image = cv2.imread('test/ocr/nav_panel_location_panel.png')
+        image.flags.writeable = False
+        item, q = self.ocr.get_highlighted_item_in_image(image, 1.0, 0.08)
+        self.assertIsNotNone(item)
+        y = int(round(q.get_top() * image.shape[0]))
+        self.assertTrue(np.array_equal(item, image[y:y + item.shape[0], :item.shape[1]]))
+        self.assertTrue(item.flags.writeable)
+
+    def test_rec_cache(self):
+        """ Recognition results below the min confidence are not cached. """
+        calls = []
+
+        def rec_ocr(image, name=''):
+            calls.append(image)
+            return ['SOL'], score
+
+        self.ocr._rec_ocr = rec_ocr
+        image = np.zeros((30, 300, 3), dtype=np.uint8)
+        score = self.ocr.rec_min_score - 0.1
+        self.ocr.image_rec_ocr(image)
+        self.ocr.image_rec_ocr(image)
+        self.assertEqual(len(calls), 2)
+
+        score = self.ocr.rec_min_score + 0.1
+        self.ocr.image_rec_ocr(image)
+        self.assertEqual(self.ocr.image_rec_ocr(image), (['SOL'], score))
+        self.assertEqual(len(calls), 3)
+
+    def test_batch_cache(self):
+        """ Images recognition could not read are read by the full pipeline once, then from the cache. """
+        calls = []
+
+        def run_batch(kind, images):
+            calls.append(kind)
+            if kind == 'rec_batch':
+                return [(['SOL'], 0.9), (['LUNA'], 0.1)]
+            return [(['LUNA'], 0.8)]
+
+        self.ocr._run_batch = run_batch
+        images = [np.zeros((30, 300, 3), dtype=np.uint8), np.full((30, 300, 3), 128, dtype=np.uint8)]
+        expected = [(['SOL'], 0.9), (['LUNA'], 0.8)]
+        self.assertEqual(self.ocr.image_ocr_batch(images), expected)
+        self.assertEqual(calls, ['rec_batch', 'simple_batch'])
+        self.assertEqual(self.ocr.image_ocr_batch(images), expected)
+        self.assertEqual(calls, ['rec_batch', 'simple_batch'])
+
+
+if __name__ == '__main__':
+    unittest.main()
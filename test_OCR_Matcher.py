@@ -0,0 +1,32 @@
+import unittest
+
+from OCR_Matcher import TextMatcher, locale_labels, normalise_text, text_similarity
+
+
+class OCRMatcherTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. """
+
+    def test_normalise(self):
+        """ OCR text lists and strings normalise the same. """
+        self.assertEqual(normalise_text(['<STAR BLAZE V2V-65W>']), normalise_text("['STAR BLAZE V2V-65W']"))
+        self.assertGreater(text_similarity("['NAV BEACON']", ['<NAVBEACON>']), 0.99)
+
+    def test_best(self):
+        """ The best candidate is the same as comparing against every candidate. """
+        candidates = locale_labels()
+        matcher = TextMatcher(candidates)
+        for text in ['NAVIGATOIN', ['CONTACTS'], 'FIRE GRUPS', 'INVENTAR', 'XYZ']:
+            expected = max(text_similarity(text, c) for c in candidates)
+            candidate, score = matcher.best(text)
+            self.assertAlmostEqual(score, expected)
+            self.assertAlmostEqual(text_similarity(text, candidate), expected)
+
+    def test_min_score(self):
+        """ No candidate is returned if none scores the min score. """
+        matcher = TextMatcher(['NAVIGATION', 'TRANSACTIONS', 'CONTACTS', 'TARGET'])
+        self.assertEqual(matcher.best('NAVIGATON', 0.8)[0], 'NAVIGATION')
+        self.assertEqual(matcher.best('MODULES', 0.8), (None, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
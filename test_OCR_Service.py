@@ -0,0 +1,67 @@
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from OCR_Service import OCRService, PRIORITY_BACKGROUND, PRIORITY_CONTROL
+
+
+class OCRServiceTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. """
+
+    def test_priority(self):
+        """ Control requests run before background requests already waiting. """
+        release = threading.Event()
+        order = []
+
+        def run(kind, image):
+            if image == 'first':
+                release.wait(5.0)
+            order.append(image)
+            return [image]
+
+        service = OCRService(workers=1, run_fn=run)
+        service.start()
+        try:
+            first = service.submit('first', priority=PRIORITY_BACKGROUND)
+            while not first.running():
+                time.sleep(0.01)
+            background = service.submit('background', priority=PRIORITY_BACKGROUND)
+            control = service.submit('control', priority=PRIORITY_CONTROL)
+            self.assertFalse(background.done())
+            release.set()
+
+            self.assertEqual(background.result(5.0), ['background'])
+            self.assertEqual(control.result(5.0), ['control'])
+            self.assertEqual(first.result(5.0), ['first'])
+            self.assertEqual(order, ['first', 'control', 'background'])
+        finally:
+            service.stop()
+
+    def test_errors(self):
+        """ A failed request raises from its future, the service keeps running. """
+        def run(kind, image):
+            if kind == 'bad':
+                raise ValueError('bad request')
+            return [image]
+
+        service = OCRService(workers=2, run_fn=run)
+        service.start()
+        try:
+            with self.assertRaises(ValueError):
+                service.submit('x', 'bad').result(5.0)
+            self.assertEqual(service.submit('y').result(5.0), ['y'])
+        finally:
+            service.stop()
+        self.assertRaises(RuntimeError, service.submit('z').result, 5.0)
+
+    def test_worker_imports(self):
+        """ The worker module imports nothing from the app, so a spawned worker does not set up the app log. """
+        out = subprocess.run([sys.executable, '-c', "import sys, OCR_Worker; print('EDlogger' in sys.modules)"],
+                             capture_output=True, text=True, timeout=60)
+        self.assertEqual(out.stdout.strip(), 'False', out.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from Template_Calibration import ScaleTracker
+
+
+class FakeTemplates:
+    """ Returns the scale as the template 'image', so the score function can score by scale. """
+
+    def get_template(self, name, scale_x, scale_y=None):
+        return {'image': scale_x}
+
+
+class ScaleTrackerTestCase(unittest.TestCase):
+    """ These tests do not require Elite Dangerous to be running. """
+
+    def test_scores_current_scale_with_score_fn(self):
+        """ A neighbour does not win only because the score passed in came from a weaker match. """
+        tracker = ScaleTracker(FakeTemplates(), 'compass', 1.0)
+        tracker.update(0.8, None)
+        moved = tracker.update(0.5, lambda scale: 0.9 if scale == 1.0 else 0.88)
+        self.assertFalse(moved)
+        self.assertEqual(tracker.scale, 1.0)
+
+    def test_moves_to_better_scale(self):
+        """ The scale moves towards the best scoring neighbour. """
+        tracker = ScaleTracker(FakeTemplates(), 'compass', 1.0)
+        tracker.update(0.8, None)
+        moved = tracker.update(0.5, lambda scale: 0.9 - 2 * abs(scale - 1.02))
+        self.assertTrue(moved)
+        self.assertAlmostEqual(tracker.scale, 1.02)
+
+
+if __name__ == '__main__':
+    unittest.main()